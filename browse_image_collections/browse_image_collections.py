@@ -1,7 +1,6 @@
 import argparse
 import json
 import os
-import requests
 import traceback
 import logging
 from datetime import datetime
@@ -10,11 +9,15 @@ from concurrent.futures import ThreadPoolExecutor
 import cmr
 import gspread
 import pytz
-from gspread_formatting import set_column_width
+from gspread_formatting import set_column_widths
 from requests import Session
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from graphql_query import execute_graphql_query
+from cmr_pager import iter_cmr_entries
+from earthdata_auth import bearer_token
+from sheet_sync import sync_worksheet
+from graphql_query import execute_graphql_batch_query, DEFAULT_BATCH_SIZE
+from graphql_cache import GraphQLCache, DEFAULT_CACHE_FILE, DEFAULT_TTL_HOURS
 
 from podaac.hitide_backfill_tool.s3_reader import S3Reader
 from podaac.hitide_backfill_tool.cli import logger_from_args
@@ -29,18 +32,28 @@ error_list = []
 
 class BrowseImageCollections:
 
-    def __init__(self, logger: logging.Logger, env: str):
+    def __init__(self, logger: logging.Logger, env: str, graphql_cache: GraphQLCache = None,
+                 graphql_batch_size: int = DEFAULT_BATCH_SIZE):
         """Initialize HitideCollections.
         
         Args:
             logger: Logger instance for logging
             env: Environment ('ops' or 'uat')
+            graphql_cache: Optional on-disk cache for GraphQL schema and collection responses
+            graphql_batch_size: Number of collections to query per GraphQL request
         """
         self.logger: logging.Logger = logger
         self.env: str = env
+        self.graphql_cache = graphql_cache
+        self.graphql_batch_size: int = graphql_batch_size
 
         self.collections = {}
 
+        self.graphql_items = {}
+
+        # Exception of the failed GraphQL batch, per concept ID in it
+        self.graphql_errors = {}
+
         retry = Retry(connect=5, backoff_factor=0.5)
         adapter = HTTPAdapter(max_retries=retry)
         self.session = Session()
@@ -48,7 +61,7 @@ class BrowseImageCollections:
         self.session.mount('https://', adapter)
 
         # Get bearer tokens
-        token = self.bearer_token()
+        token = bearer_token(self.env, self.logger, self.session)
 
         if not token:
             self.logger.error("Could not get bearer token")
@@ -69,9 +82,9 @@ class BrowseImageCollections:
 
     def add_collections(self, umm_name, collections_query):
 
-        collections = [(a.get('id'), a.get('short_name'), a.get('data_center'), a.get("associations").get("variables") if a.get("associations") else None)
-                        for a in collections_query]
-        collections = sorted(collections, key=lambda tup: tup[1])
+        # Entries are consumed as they arrive from the pager; the worksheet is sorted when written
+        collections = ((a.get('id'), a.get('short_name'), a.get('data_center'), a.get("associations").get("variables") if a.get("associations") else None, a.get('updated'))
+                        for a in collections_query)
 
         for collection in collections:
             id = collection[0]
@@ -90,6 +103,9 @@ class BrowseImageCollections:
             if collection[3] is not None and len(collection[3]) > 0:
                 self.collections[id]['umm_v_count'] = len(collection[3])
 
+            if collection[4] is not None:
+                self.collections[id]['revision_date'] = collection[4]
+
 
     def update_associations(self, umm_name, umm_type):
 
@@ -112,18 +128,33 @@ class BrowseImageCollections:
             url = cmr.queries.CollectionQuery(
                 mode=mode).service_concept_id(concept_id)._build_url()
 
-        collections_query = self.session.get(url, headers=self.headers, params={
-                                        'page_size': 2000}).json()['feed']['entry']
-
-        self.add_collections(umm_name, collections_query)
+        self.add_collections(umm_name, iter_cmr_entries(url, self.headers, session=self.session))
 
 
     def update_collections(self):
 
+        concept_ids = list(self.collections)
+        batches = [concept_ids[i:i + self.graphql_batch_size] for i in range(0, len(concept_ids), self.graphql_batch_size)]
+
         with ThreadPoolExecutor() as executor:
+            for graphql_items in executor.map(self.query_graphql_batch, batches):
+                self.graphql_items.update(graphql_items)
+
             executor.map(self.umm_update_one_collection, self.collections.items())
 
 
+    def query_graphql_batch(self, concept_ids):
+
+        revision_dates = {concept_id: self.collections[concept_id].get('revision_date') for concept_id in concept_ids}
+
+        try:
+            return execute_graphql_batch_query(concept_ids, self.env, self.headers, self.graphql_cache, revision_dates)
+        except Exception as ex:
+            self.logger.error(f"GraphQL batch query failed for {len(concept_ids)} {self.env} collections: {ex}")
+            self.graphql_errors.update(dict.fromkeys(concept_ids, ex))
+            return {}
+
+
     def write_worksheet_collection(self):
 
         header_row = ['Collection Name']
@@ -168,20 +199,21 @@ class BrowseImageCollections:
         else:
             worksheet = workbook.worksheet("UAT")
 
-        worksheet.clear()
-        worksheet.update(records, "A1")
+        sync_worksheet(worksheet, records, self.logger)
 
-        set_column_width(worksheet, 'A', 9*max_length)
-        set_column_width(worksheet, 'B', 9*len(records[0][1]))
-        set_column_width(worksheet, 'C', 8*len(records[0][2]) + 6)
-        set_column_width(worksheet, 'D', 8*len(records[0][3]))
-        set_column_width(worksheet, 'E', 8*len(records[0][4]))
-        set_column_width(worksheet, 'F', 11*len(records[0][5]))
-        set_column_width(worksheet, 'G', 8*len(records[0][6]))
-        set_column_width(worksheet, 'H', 11*len(records[0][7]))
-        set_column_width(worksheet, 'I', 9*len(records[0][8]))
-        set_column_width(worksheet, 'J', 9*len(records[0][9]))
-        set_column_width(worksheet, 'K', 9*len(records[0][10]))
+        set_column_widths(worksheet, [
+            ('A', 9*max_length),
+            ('B', 9*len(records[0][1])),
+            ('C', 8*len(records[0][2]) + 6),
+            ('D', 8*len(records[0][3])),
+            ('E', 8*len(records[0][4])),
+            ('F', 11*len(records[0][5])),
+            ('G', 8*len(records[0][6])),
+            ('H', 11*len(records[0][7])),
+            ('I', 9*len(records[0][8])),
+            ('J', 9*len(records[0][9])),
+            ('K', 9*len(records[0][10])),
+        ])
 
 
     def umm_update_one_collection(self, item):
@@ -206,13 +238,19 @@ class BrowseImageCollections:
             except Exception as ex:
                 pass
 
-            graphql_query = execute_graphql_query(concept_id, self.env, self.headers)
+            graphql_item = self.graphql_items.get(concept_id)
 
-            granules = graphql_query.get('collections').get('items')[0].get('granules')
+            if concept_id in self.graphql_errors:
+                raise Exception(f"GraphQL batch query failed: {self.graphql_errors[concept_id]}")
+
+            if graphql_item is None:
+                raise Exception(f"{concept_id} not found in GraphQL response")
+
+            granules = graphql_item.get('granules')
 
             collection['granule_count'] = granules.get("count")
 
-            variables = graphql_query.get('collections').get('items')[0].get('variables').get('items')
+            variables = graphql_item.get('variables').get('items')
 
             if variables:
                 if any(var['name'] == 'lat' or var['name'] == 'latitude' for var in variables):
@@ -234,42 +272,6 @@ class BrowseImageCollections:
             error_list.append([f"{short_name} ({self.env.upper()})", str(e), e.__traceback__.tb_lineno])
 
 
-    def bearer_token(self):
-        tokens = []
-        headers: dict = {'Accept': 'application/json'}
-        url: str = f"https://{'uat.' if self.env == 'uat' else ''}urs.earthdata.nasa.gov/api/users"
-
-        # First just try to get a token that already exists
-        try:
-            resp = self.session.get(url + "/tokens", headers=headers,
-                                    auth=requests.auth.HTTPBasicAuth(os.environ['CMR_USER'], os.environ['CMR_PASS']))
-            response_content = json.loads(resp.content)
-
-            for x in response_content:
-                tokens.append(x['access_token'])
-
-        except Exception as ex:  # noqa E722
-            self.logger.error(ex)
-            self.logger.error(f"Error getting the {self.env} token - check user name and password")
-
-        # No tokens exist, try to create one
-        if not tokens:
-            try:
-                resp = self.session.post(url + "/token", headers=headers,
-                                            auth=requests.auth.HTTPBasicAuth(os.environ['CMR_USER'], os.environ['CMR_PASS']))
-                response_content: dict = json.loads(resp.content)
-                tokens.append(response_content['access_token'])
-            except Exception as ex:  # noqa E722
-                self.logger.error(ex)
-                self.logger.error(f"Error getting the {self.env} token - check user name and password")
-
-        # If still no token, then we can't do anything
-        if not tokens:
-            return None
-
-        return next(iter(tokens))
-
-
     def run(self):
 
         self.update_associations("IMAGENATOR-L2", "service")
@@ -278,6 +280,9 @@ class BrowseImageCollections:
         self.update_collections()
         self.write_worksheet_collection()
 
+        if self.graphql_cache is not None:
+            self.logger.info(f"GraphQL cache ({self.env}): {self.graphql_cache.summary()}")
+
 
 def parse_args():
     """
@@ -298,6 +303,20 @@ def parse_args():
     parser.add_argument("--log-level",
                         default="DEBUG")
 
+    parser.add_argument('--graphql-batch-size',
+                        help='number of collections to query per GraphQL request',
+                        type=int,
+                        default=DEFAULT_BATCH_SIZE)
+
+    parser.add_argument('--cache-file',
+                        help='SQLite file caching the GraphQL schema and collection responses',
+                        default=DEFAULT_CACHE_FILE)
+
+    parser.add_argument('--cache-ttl',
+                        help='hours cached GraphQL collection fields stay valid, granule fields are always queried (0 disables the cache)',
+                        type=float,
+                        default=DEFAULT_TTL_HOURS)
+
     args = parser.parse_args()
     return args
 
@@ -308,10 +327,12 @@ if __name__ == '__main__':
 
     logger = logger_from_args(_args)
 
-    browse_image_collections_ops = BrowseImageCollections(logger, "ops")
+    graphql_cache = GraphQLCache(_args.cache_file, _args.cache_ttl) if _args.cache_ttl > 0 else None
+
+    browse_image_collections_ops = BrowseImageCollections(logger, "ops", graphql_cache, _args.graphql_batch_size)
     browse_image_collections_ops.run()
 
-    browse_image_collections_uat = BrowseImageCollections(logger, "uat")
+    browse_image_collections_uat = BrowseImageCollections(logger, "uat", graphql_cache, _args.graphql_batch_size)
     browse_image_collections_uat.run()
 
     status_ws = workbook.worksheet("Status")
@@ -0,0 +1,47 @@
+import requests
+
+# Largest page CMR will return for a search
+CMR_PAGE_SIZE = 2000
+
+
+def iter_cmr_entries(url, headers=None, params=None, data=None, session=None, page_size=CMR_PAGE_SIZE):
+    """Yield every entry of a CMR search, one page at a time.
+
+    Pages are followed with the CMR-Search-After header, so results are not capped at a
+    single page and only the current page is held in memory.
+
+    Args:
+        url: CMR search URL, in json or umm_json format
+        headers: Request headers, e.g. the Authorization bearer token
+        params: Query parameters
+        data: Form parameters; when given the search is sent as a POST
+        session: requests Session to search with, defaults to plain requests
+        page_size: Number of entries per page
+
+    Yields:
+        dict: Feed entries (json format) or items (umm_json format)
+    """
+    session = session or requests
+    headers = dict(headers or {})
+    params = dict(params or {})
+    params['page_size'] = page_size
+
+    while True:
+        if data is not None:
+            response = session.post(url, headers=headers, params=params, data=data)
+        else:
+            response = session.get(url, headers=headers, params=params)
+
+        response.raise_for_status()
+
+        body = response.json()
+        entries = body['feed']['entry'] if 'feed' in body else body.get('items', [])
+
+        yield from entries
+
+        search_after = response.headers.get('CMR-Search-After')
+
+        if not search_after or len(entries) < page_size:
+            return
+
+        headers['CMR-Search-After'] = search_after
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_FILE = ".graphql_cache.sqlite"
+
+# Cached collection fields are reused for this long (same-day reruns), variable associations do not revise a collection
+DEFAULT_TTL_HOURS = 20
+
+# The CMR GraphQL schema changes rarely, keep the introspection result for a week
+SCHEMA_TTL_HOURS = 7 * 24
+
+
+def query_hash(query_text):
+    """Short stable hash of a query template, so changing the query invalidates cached responses."""
+
+    return hashlib.sha256(query_text.encode('utf-8')).hexdigest()[:16]
+
+
+class GraphQLCache:
+    """SQLite backed cache for GraphQL schema introspection and per-collection query responses.
+
+    Responses are keyed by env + concept ID + query hash and are served while they are younger
+    than the TTL and the collection revision date still matches the one they were stored with.
+    Callers store only fields that change with a new collection revision, not granule fields.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE, ttl_hours: float = DEFAULT_TTL_HOURS):
+        """Initialize GraphQLCache.
+
+        Args:
+            path: Path to the SQLite cache file
+            ttl_hours: Max age of a cached collection response in hours
+        """
+        self.path: str = path
+        self.ttl: float = ttl_hours * 3600
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    env TEXT NOT NULL,
+                    concept_id TEXT NOT NULL,
+                    query_hash TEXT NOT NULL,
+                    revision_date TEXT,
+                    fetched_at REAL NOT NULL,
+                    item TEXT NOT NULL,
+                    PRIMARY KEY (env, concept_id, query_hash)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS schemas (
+                    url TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    introspection TEXT NOT NULL
+                )
+            """)
+
+
+    def get(self, env, concept_id, query_hash, revision_date=None):
+        """Return the cached collection item, or None if it is missing, expired or the collection was revised."""
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision_date, fetched_at, item FROM responses WHERE env = ? AND concept_id = ? AND query_hash = ?",
+                (env, concept_id, query_hash)).fetchone()
+
+            if row is None or time.time() - row[1] > self.ttl or (revision_date is not None and row[0] != revision_date):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return json.loads(row[2])
+
+
+    def put(self, env, concept_id, query_hash, revision_date, item):
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (env, concept_id, query_hash, revision_date, time.time(), json.dumps(item)))
+
+
+    def get_schema(self, url):
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, introspection FROM schemas WHERE url = ?", (url,)).fetchone()
+
+        if row is None or time.time() - row[0] > SCHEMA_TTL_HOURS * 3600:
+            return None
+
+        return json.loads(row[1])
+
+
+    def put_schema(self, url, introspection):
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO schemas VALUES (?, ?, ?)",
+                (url, time.time(), json.dumps(introspection)))
+
+
+    def summary(self) -> str:
+
+        return f"{self.hits} hits, {self.misses} misses ({self.path})"
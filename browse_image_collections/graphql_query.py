@@ -1,49 +1,153 @@
+import json
+import threading
+
 from gql import gql, Client
 from gql.transport.requests import RequestsHTTPTransport
+from graphql import build_client_schema
 
-def execute_graphql_query(concept_id, env, headers):
+from graphql_cache import query_hash
 
-    if env == 'uat':
-        url = "https://graphql.uat.earthdata.nasa.gov/api"
-    else:
-        url = "https://graphql.earthdata.nasa.gov/api"
+# Number of collections to pull per GraphQL request in batched mode
+DEFAULT_BATCH_SIZE = 50
+
+# Connected client sessions keyed by (url, headers).  The schema is introspected when a
+# session is first connected, so it is fetched once per process instead of once per query.
+_sessions = {}
+_sessions_lock = threading.Lock()
 
-    # Select your transport with a defined url endpoint
-    transport = RequestsHTTPTransport(url=url, headers=headers, retries=10, retry_backoff_factor=0.5)
-
-    # Create a GraphQL client using the defined transport
-    client = Client(transport=transport, fetch_schema_from_transport=True)
-
-    # Provide a GraphQL query
-    query = gql(
-        """
-        query MyQuery {
-            collections(params: {conceptId: "%s"}) {
-                items {
-                    shortName
-                    conceptId
-                    granules(params: { limit: 1, sortKey: ["-start_date"] }) {
-                        count
-                        items {
-                            conceptId
-                            spatialExtent
-                            temporalExtent
-                            relatedUrls
-                        }
+COLLECTIONS_QUERY = """
+    query MyQuery {
+        collections(params: {conceptId: %s, limit: %d}) {
+            items {
+                shortName
+                conceptId
+                granules(params: { limit: 1, sortKey: ["-start_date"] }) {
+                    count
+                    items {
+                        conceptId
+                        spatialExtent
+                        temporalExtent
+                        relatedUrls
                     }
-                    variables {
-                        items {
-                            conceptId
-                            name
-                            variableType
-                            variableSubType
-                        }
+                }
+                variables {
+                    items {
+                        conceptId
+                        name
+                        variableType
+                        variableSubType
                     }
                 }
             }
         }
-    """ % concept_id
-    )
+    }
+"""
+
+# Granule count and last granule only, for collections whose other fields come from the cache
+GRANULES_QUERY = """
+    query MyQuery {
+        collections(params: {conceptId: %s, limit: %d}) {
+            items {
+                conceptId
+                granules(params: { limit: 1, sortKey: ["-start_date"] }) {
+                    count
+                    items {
+                        conceptId
+                        spatialExtent
+                        temporalExtent
+                        relatedUrls
+                    }
+                }
+            }
+        }
+    }
+"""
+
+COLLECTIONS_QUERY_HASH = query_hash(COLLECTIONS_QUERY)
+
+
+def get_graphql_session(env, headers, cache=None):
+
+    if env == 'uat':
+        url = "https://graphql.uat.earthdata.nasa.gov/api"
+    else:
+        url = "https://graphql.earthdata.nasa.gov/api"
+
+    key = (url, tuple(sorted(headers.items())))
+
+    with _sessions_lock:
+        if key not in _sessions:
+            # Select your transport with a defined url endpoint
+            transport = RequestsHTTPTransport(url=url, headers=headers, retries=10, retry_backoff_factor=0.5)
+
+            # Create a GraphQL client using the defined transport and keep it connected,
+            # reusing a cached introspection result when there is one
+            introspection = cache.get_schema(url) if cache is not None else None
+
+            if introspection is not None:
+                client = Client(transport=transport, schema=build_client_schema(introspection))
+            else:
+                client = Client(transport=transport, fetch_schema_from_transport=True)
+
+            _sessions[key] = client.connect_sync()
+
+            if introspection is None and cache is not None:
+                cache.put_schema(url, client.introspection)
+
+        return _sessions[key]
+
+
+def execute_graphql_batch_query(concept_ids, env, headers, cache=None, revision_dates=None):
+    """Query granule count, last granule and variables for several collections in one request.
+
+    Granule fields change with every ingest without a new collection revision, so only the
+    collection-level fields are cached; collections with cached fields get their granule fields
+    from a second, granules-only request.
+
+    Args:
+        concept_ids: Collection concept IDs to query
+        env: Environment ('ops' or 'uat')
+        headers: Request headers including the bearer token
+        cache: Optional GraphQLCache of the collection-level fields
+        revision_dates: Optional mapping of concept ID to collection revision date, used to invalidate the cache
+
+    Returns:
+        dict: Collection items keyed by concept ID.  Concept IDs not found in CMR are left out.
+    """
+    revision_dates = revision_dates or {}
+
+    cached = {}
+    stale_ids = []
+
+    for concept_id in concept_ids:
+        item = None
+        if cache is not None:
+            item = cache.get(env, concept_id, COLLECTIONS_QUERY_HASH, revision_dates.get(concept_id))
+
+        if item is not None:
+            cached[concept_id] = item
+        else:
+            stale_ids.append(concept_id)
+
+    session = get_graphql_session(env, headers, cache)
+    items = {}
+
+    if stale_ids:
+        result = session.execute(gql(COLLECTIONS_QUERY % (json.dumps(stale_ids), len(stale_ids))))
+
+        for item in result.get('collections').get('items'):
+            concept_id = item.get('conceptId')
+            items[concept_id] = item
+
+            if cache is not None:
+                collection_fields = {key: value for key, value in item.items() if key != 'granules'}
+                cache.put(env, concept_id, COLLECTIONS_QUERY_HASH, revision_dates.get(concept_id), collection_fields)
+
+    if cached:
+        result = session.execute(gql(GRANULES_QUERY % (json.dumps(list(cached)), len(cached))))
+
+        for item in result.get('collections').get('items'):
+            concept_id = item.get('conceptId')
+            items[concept_id] = dict(cached[concept_id], granules=item.get('granules'))
 
-    # Execute the query on the transport
-    return client.execute(query)
+    return items
@@ -0,0 +1,82 @@
+"""Micro-benchmark for the short_name + provider membership check used by add_configs and add_cumulus_footprint_image.
+
+Compares the old linear scan over the collection registry with the short_name_index.ShortNameIndex
+that HitideCollections.add_collections maintains.  Standalone so it can run without Google or AWS
+credentials:
+
+    python benchmark_short_name_index.py --collections 10000 --lookups 2000
+"""
+
+import argparse
+import random
+import timeit
+
+from short_name_index import ShortNameIndex
+
+
+def build_registry(count):
+
+    collections = {}
+    short_name_index = ShortNameIndex()
+
+    for index in range(count):
+        concept_id = f"C{1000000000 + index}-POCLOUD"
+        short_name = f"COLLECTION_{index:05d}-L2P-v1.0"
+
+        collections[concept_id] = {'short_name': short_name, 'provider': 'POCLOUD'}
+        short_name_index.add(short_name, 'POCLOUD', concept_id)
+
+    return collections, short_name_index
+
+
+def linear_scan(collections, short_names):
+
+    return sum(any(attributes.get("short_name") == short_name and attributes.get("provider") == "POCLOUD"
+                   for attributes in collections.values())
+               for short_name in short_names)
+
+
+def indexed_lookup(short_name_index, short_names):
+
+    return len(short_names) - len(short_name_index.missing(short_names))
+
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark short_name lookups against the collection registry',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument('--collections', type=int, default=10000,
+                        help='number of collections in the registry')
+
+    parser.add_argument('--lookups', type=int, default=2000,
+                        help='number of config short names to check, half of them missing')
+
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timing repeats, the best one is reported')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+
+    _args = parse_args()
+
+    collections, short_name_index = build_registry(_args.collections)
+
+    # Half of the lookups hit existing collections, half miss and force a full scan
+    short_names = [f"COLLECTION_{random.randrange(_args.collections):05d}-L2P-v1.0" for _ in range(_args.lookups // 2)]
+    short_names += [f"MISSING_{index:05d}" for index in range(_args.lookups - len(short_names))]
+    random.shuffle(short_names)
+
+    assert linear_scan(collections, short_names) == indexed_lookup(short_name_index, short_names)
+
+    scan_time = min(timeit.repeat(lambda: linear_scan(collections, short_names), number=1, repeat=_args.repeat))
+    index_time = min(timeit.repeat(lambda: indexed_lookup(short_name_index, short_names), number=1, repeat=_args.repeat))
+
+    print(f"{_args.lookups} lookups against {_args.collections} collections")
+    print(f"linear scan:    {scan_time * 1000:10.2f} ms")
+    print(f"indexed lookup: {index_time * 1000:10.2f} ms")
+    print(f"speedup:        {scan_time / index_time:10.0f}x")
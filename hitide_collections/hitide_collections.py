@@ -1,22 +1,29 @@
 import argparse
+import asyncio
 import csv
 import json
 import os
-import requests
+import threading
 import traceback
 import logging
-from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 import boto3
 import cmr
 import gspread
 import pytz
-from gspread_formatting import set_column_width
+from gspread_formatting import set_column_widths
 from requests import Session
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from graphql_query import execute_graphql_query
+from cmr_pager import iter_cmr_entries
+from earthdata_auth import bearer_token
+from sheet_sync import sync_worksheet
+from graphql_query import execute_graphql_batch_query, DEFAULT_BATCH_SIZE
+from graphql_cache import GraphQLCache, DEFAULT_CACHE_FILE, DEFAULT_TTL_HOURS
+from refresh_engine import RefreshEngine, DEFAULT_LIMITS
+from short_name_index import ShortNameIndex
 
 from podaac.hitide_backfill_tool.s3_reader import S3Reader
 from podaac.hitide_backfill_tool.cli import logger_from_args
@@ -27,7 +34,32 @@ spreadsheet_id = os.environ['SPREADSHEET_ID']
 
 workbook = gc.open_by_key(spreadsheet_id)
 
-error_list = []
+
+class ErrorCollector:
+    """Thread-safe list of [collection, message, line number] rows for the Status sheet."""
+
+    def __init__(self):
+        self._rows = []
+        self._lock = threading.Lock()
+
+
+    def append(self, row):
+
+        with self._lock:
+            self._rows.append(row)
+
+
+    def rows(self):
+
+        with self._lock:
+            return list(self._rows)
+
+
+# Shared by the OPS and UAT runs, which may run at the same time
+error_list = ErrorCollector()
+
+# Max number of concept IDs or short names resolved per CMR collection search
+CMR_BULK_SIZE = 200
 
 def read_csv_file(filename):
     data = []
@@ -39,22 +71,36 @@ def read_csv_file(filename):
 
 class HitideCollections:
 
-    def __init__(self, logger: logging.Logger, env: str, data_path: str):
+    def __init__(self, logger: logging.Logger, env: str, data_path: str, concurrency: dict = None,
+                 graphql_batch_size: int = DEFAULT_BATCH_SIZE, graphql_cache: GraphQLCache = None):
         """Initialize HitideCollections.
         
         Args:
             logger: Logger instance for logging
             env: Environment ('ops' or 'uat')
             data_path: Path to data directory
+            concurrency: Max concurrent calls per upstream ('cmr_graphql', 's3')
+            graphql_batch_size: Number of collections to query per GraphQL request
+            graphql_cache: Optional on-disk cache for GraphQL schema and collection responses
         """
         self.logger: logging.Logger = logger
         self.env: str = env
         self.data_path: str = data_path
+        self.graphql_batch_size: int = graphql_batch_size
+        self.graphql_cache = graphql_cache
 
         self.collections = {}
 
+        # Secondary index of (short_name, provider) -> concept ID, maintained by add_collections
+        self.short_name_index = ShortNameIndex()
+
+        self.engine = RefreshEngine(self.logger, concurrency)
+
         self.hitide_associations_text = []
 
+        self.l2ss_autotest_ids = set()
+        self.concise_autotest_ids = set()
+
         retry = Retry(connect=5, backoff_factor=0.5)
         adapter = HTTPAdapter(max_retries=retry)
         self.session = Session()
@@ -62,7 +108,7 @@ class HitideCollections:
         self.session.mount('https://', adapter)
 
         # Get bearer tokens
-        token = self.bearer_token()
+        token = bearer_token(self.env, self.logger, self.session)
 
         if not token:
             self.logger.error("Could not get bearer token")
@@ -82,6 +128,12 @@ class HitideCollections:
 
         self.get_association_text_collections()
 
+        try:
+            self.get_autotest_associations()
+        except Exception as ex:
+            self.logger.error(ex)
+            error_list.append([f"NA ({self.env.upper()})", str(ex), ex.__traceback__.tb_lineno])
+
         try:
             self.get_cumulus_api_workflow_choices()
         except Exception as ex:
@@ -92,9 +144,9 @@ class HitideCollections:
 
     def add_collections(self, umm_name, collections_query):
 
-        collections = [(a.get('id'), a.get('short_name'), a.get('data_center'), a.get("associations").get("variables") if a.get("associations") else None, a.get("watch_status"))
-                        for a in collections_query]
-        collections = sorted(collections, key=lambda tup: tup[1])
+        # Entries are consumed as they arrive from the pager; the worksheet is sorted when written
+        collections = ((a.get('id'), a.get('short_name'), a.get('data_center'), a.get("associations").get("variables") if a.get("associations") else None, a.get("watch_status"), a.get('updated'))
+                        for a in collections_query)
 
         for collection in collections:
             id = collection[0]
@@ -111,6 +163,7 @@ class HitideCollections:
                 self.collections[id]['hitide'] = "X"
 
             self.collections[id]['provider'] = collection[2]
+            self.short_name_index.add(collection[1], collection[2], id)
 
             if collection[3] is not None and len(collection[3]) > 0:
                 self.collections[id]['umm_v_count'] = len(collection[3])
@@ -118,6 +171,9 @@ class HitideCollections:
             if collection[4] == "Coming Soon":
                 self.collections[id]['coming_soon'] = "X"
 
+            if collection[5] is not None:
+                self.collections[id]['revision_date'] = collection[5]
+
 
     def update_associations(self, umm_name, umm_type):
 
@@ -137,16 +193,15 @@ class HitideCollections:
             url = cmr.queries.CollectionQuery(
                 mode=mode).service_concept_id(concept_id)._build_url()
 
-        collections_query = self.session.get(url, headers=self.headers, params={
-                                        'page_size': 2000}).json()['feed']['entry']
-
-        self.add_collections(umm_name, collections_query)
+        self.add_collections(umm_name, iter_cmr_entries(url, self.headers, session=self.session))
 
 
     def update_collections(self):
 
-        with ThreadPoolExecutor() as executor:
-            executor.map(self.umm_update_one_collection, self.collections.items())
+        items = list(self.collections.items())
+        batches = [items[i:i + self.graphql_batch_size] for i in range(0, len(items), self.graphql_batch_size)]
+
+        self.engine.run(self.update_batch, batches)
 
 
     def write_worksheet_collection(self):
@@ -220,34 +275,35 @@ class HitideCollections:
         else:
             worksheet = workbook.worksheet("UAT")
 
-        worksheet.clear()
-        worksheet.update(records, "A1")
-
-        set_column_width(worksheet, 'A', 7*max_length)
-        set_column_width(worksheet, 'B', 8*len(records[0][1]))
-        set_column_width(worksheet, 'C', 8*len(records[0][2]) + 6)
-        set_column_width(worksheet, 'D', 8*len(records[0][3]))
-        set_column_width(worksheet, 'E', 8*len(records[0][4]))
-        set_column_width(worksheet, 'F', 8*len(records[0][5]))
-        set_column_width(worksheet, 'G', 9*len(records[0][6]))
-        set_column_width(worksheet, 'H', 9*len(records[0][7]))
-        set_column_width(worksheet, 'I', 8*len(records[0][8]))
-        set_column_width(worksheet, 'J', 8*len(records[0][9]))
-        set_column_width(worksheet, 'K', 7*len(records[0][10]))
-        set_column_width(worksheet, 'L', 7*len(records[0][11]))
-        set_column_width(worksheet, 'M', 10*len(records[0][12]) + 6)
-        set_column_width(worksheet, 'N', 9*len(records[0][13]))
-        set_column_width(worksheet, 'O', 9*len(records[0][14]))
-        set_column_width(worksheet, 'P', 7*len(records[0][15]) + 7)
-        set_column_width(worksheet, 'Q', 7*len(records[0][16]) + 6)
-        set_column_width(worksheet, 'R', 8*len(records[0][17]))
-        set_column_width(worksheet, 'S', 7*len(records[0][18]) + 6)
-        set_column_width(worksheet, 'T', 7*len(records[0][19]) + 6)
-        set_column_width(worksheet, 'U', 7*len(records[0][20]) + 6)
-        set_column_width(worksheet, 'V', 7*len(records[0][21]) + 4)
-        set_column_width(worksheet, 'W', 8*len(records[0][22]))
-        set_column_width(worksheet, 'X', 9*len(records[0][23]))
-        set_column_width(worksheet, 'Y', 9*len(records[0][24]))
+        sync_worksheet(worksheet, records, self.logger)
+
+        set_column_widths(worksheet, [
+            ('A', 7*max_length),
+            ('B', 8*len(records[0][1])),
+            ('C', 8*len(records[0][2]) + 6),
+            ('D', 8*len(records[0][3])),
+            ('E', 8*len(records[0][4])),
+            ('F', 8*len(records[0][5])),
+            ('G', 9*len(records[0][6])),
+            ('H', 9*len(records[0][7])),
+            ('I', 8*len(records[0][8])),
+            ('J', 8*len(records[0][9])),
+            ('K', 7*len(records[0][10])),
+            ('L', 7*len(records[0][11])),
+            ('M', 10*len(records[0][12]) + 6),
+            ('N', 9*len(records[0][13])),
+            ('O', 9*len(records[0][14])),
+            ('P', 7*len(records[0][15]) + 7),
+            ('Q', 7*len(records[0][16]) + 6),
+            ('R', 8*len(records[0][17])),
+            ('S', 7*len(records[0][18]) + 6),
+            ('T', 7*len(records[0][19]) + 6),
+            ('U', 7*len(records[0][20]) + 6),
+            ('V', 7*len(records[0][21]) + 4),
+            ('W', 8*len(records[0][22])),
+            ('X', 9*len(records[0][23])),
+            ('Y', 9*len(records[0][24])),
+        ])
 
 
     def get_association_text_collections(self):
@@ -259,28 +315,21 @@ class HitideCollections:
         self.hitide_associations_text = [id_ for id_ in id_list if id_ not in (None, "")]
 
 
-    def has_l2ss_association(self, concept_id):
-
-        url = f"https://raw.githubusercontent.com/podaac/l2ss-py-autotest/main/tests/cmr/l2ss-py/{self.env}/{concept_id}"
+    def get_autotest_associations(self):
 
-        response = self.session.get(url)
+        # One directory listing per repo instead of a raw.githubusercontent.com probe per collection
+        self.l2ss_autotest_ids = set(self.list_github_files("l2ss-py-autotest", f"tests/cmr/l2ss-py/{self.env}"))
+        self.concise_autotest_ids = set(self.list_github_files("concise-autotest", f"tests/cmr/concise/{self.env}"))
 
-        if response.status_code == 200:
-            return True
-        
-        return False
 
+    def has_l2ss_association(self, concept_id):
 
-    def has_concise_association(self, concept_id):
+        return concept_id in self.l2ss_autotest_ids
 
-        url = f"https://raw.githubusercontent.com/podaac/concise-autotest/main/tests/cmr/concise/{self.env}/{concept_id}"
 
-        response = self.session.get(url)
+    def has_concise_association(self, concept_id):
 
-        if response.status_code == 200:
-            return True
-        
-        return False
+        return concept_id in self.concise_autotest_ids
 
 
     def add_cumulus_footprint_image(self):
@@ -292,29 +341,14 @@ class HitideCollections:
 
         self.logger.info(f"Found {len(cumulus_collections)} Cumulus Configs in {self.env}")
 
-        if self.env == "ops":
-            mode = cmr.queries.CMR_OPS
-        else:
-            mode = cmr.queries.CMR_UAT
-
-        for short_name in cumulus_collections:
-            if not any(attributes.get("short_name") == short_name and attributes.get("provider") == "POCLOUD" 
-                      for attributes in self.collections.values()):
-                self.logger.info(f"Adding {short_name} via Cumulus Config in {self.env}...")
-                url = cmr.queries.CollectionQuery(
-                    mode=mode).provider('POCLOUD').short_name(short_name)._build_url()
-
-                collections_query = self.session.get(url, headers=self.headers, params={
-                                                'page_size': 1}).json()['feed']['entry']
-
-                if collections_query:
-                    self.add_collections("", collections_query)
-                else:
-                    error_list.append([f"{short_name} ({self.env.upper()})", "Not found via Cumulus Config", "NA"])
+        self.add_short_names(cumulus_collections, "Cumulus Config")
 
 
     def list_github_files(self, repo: str, path: str, branch: str = "main"):
-        """List all files in a GitHub repository directory.
+        """List the names of all files in a GitHub repository directory.
+
+        Uses the git trees API, which returns the whole directory in one request
+        (the contents API stops at 1000 entries).
 
         Args:
             repo (str): Repository name.
@@ -322,48 +356,107 @@ class HitideCollections:
             branch (str, optional): Branch name. Defaults to 'main'.
 
         Returns:
-            list: A list of file URLs.
+            list: A list of file names.
         """
-        url = f"https://api.github.com/repos/podaac/{repo}/contents/{path}?ref={branch}"
+        url = f"https://api.github.com/repos/podaac/{repo}/git/trees/{branch}:{path}"
         headers = {
             "Accept": "application/vnd.github.v3+json"
         }
-        response = requests.get(url, headers=headers)
+        if os.environ.get('GITHUB_TOKEN'):
+            headers["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+
+        response = self.session.get(url, headers=headers)
 
         if response.status_code == 200:
-            files = response.json()
-            return [file["download_url"] for file in files if file["type"] == "file"]
+            tree = response.json()
+            if tree.get("truncated"):
+                self.logger.warning(f"GitHub tree listing of {repo}/{path} was truncated")
+            return [entry["path"] for entry in tree["tree"] if entry["type"] == "blob"]
         else:
             raise Exception(f"Failed to fetch files: {response.status_code}, {response.text}")
 
 
-    def add_concept_ids(self, concept_ids, source):
+    def resolve_collections(self, field, values):
+        """Look up collections in CMR in bulk, CMR_BULK_SIZE values per request.
+
+        Args:
+            field: CMR collection search parameter to match on ('concept_id' or 'short_name')
+            values: Concept IDs or short names to look up
 
+        Returns:
+            tuple: (first matching feed entry keyed by looked up value, set of values whose request failed)
+        """
         if self.env == "ops":
             mode = cmr.queries.CMR_OPS
         else:
             mode = cmr.queries.CMR_UAT
 
-        self.logger.info(f"Found {len(concept_ids)} concept_ids via {source} in {self.env}")
+        url = f"{mode}collections.json"
+
+        # CMR matches short names case-insensitively, so key short name matches on lower case
+        def match_key(value):
+            return value.lower() if field == 'short_name' else value
+
+        found = {}
+        failed = set()
+
+        values = list(dict.fromkeys(values))
+        for i in range(0, len(values), CMR_BULK_SIZE):
+            chunk = values[i:i + CMR_BULK_SIZE]
 
-        for concept_id in concept_ids:
+            params = [(f"{field}[]", value) for value in chunk]
+            if field == 'short_name':
+                params.append(('provider', 'POCLOUD'))
+
+            matches = {}
             try:
-                if concept_id not in self.collections:
-                    self.logger.info(f"Adding {concept_id} via {source} in {self.env}...")
-                    url = cmr.queries.CollectionQuery(
-                            mode=mode).concept_id(concept_id)._build_url()
-
-                    collections_query = self.session.get(url, headers=self.headers, params={
-                                                    'page_size': 1}).json()['feed']['entry']
-
-                    if collections_query:
-                        self.add_collections("", collections_query)
-                    else:
-                        error_list.append([f"{concept_id} ({self.env.upper()})", f"Not found via {source}", "NA"])
+                # POST keeps a few hundred values out of the URL
+                for entry in iter_cmr_entries(url, self.headers, data=params, session=self.session):
+                    matches.setdefault(match_key(entry.get('id') if field == 'concept_id' else entry.get('short_name')), entry)
             except Exception as ex:
-                self.logger.error(ex)
-                self.logger.error(concept_id)
-                pass
+                self.logger.error(f"Bulk {field} lookup of {len(chunk)} collections failed in {self.env}: {ex}")
+                failed.update(chunk)
+                continue
+
+            for value in chunk:
+                if match_key(value) in matches:
+                    found[value] = matches[match_key(value)]
+
+        return found, failed
+
+
+    def add_short_names(self, short_names, source):
+
+        missing = self.short_name_index.missing(short_names)
+
+        for short_name in missing:
+            self.logger.info(f"Adding {short_name} via {source} in {self.env}...")
+
+        found, failed = self.resolve_collections('short_name', missing)
+
+        self.add_collections("", found.values())
+
+        for short_name in missing:
+            if short_name not in found and short_name not in failed:
+                error_list.append([f"{short_name} ({self.env.upper()})", f"Not found via {source}", "NA"])
+
+
+    def add_concept_ids(self, concept_ids, source):
+
+        self.logger.info(f"Found {len(concept_ids)} concept_ids via {source} in {self.env}")
+
+        missing = [concept_id for concept_id in concept_ids if concept_id not in self.collections]
+
+        for concept_id in missing:
+            self.logger.info(f"Adding {concept_id} via {source} in {self.env}...")
+
+        found, failed = self.resolve_collections('concept_id', missing)
+
+        self.add_collections("", found.values())
+
+        for concept_id in missing:
+            if concept_id not in found and concept_id not in failed:
+                error_list.append([f"{concept_id} ({self.env.upper()})", f"Not found via {source}", "NA"])
 
 
     def add_configs(self):
@@ -374,77 +467,36 @@ class HitideCollections:
         forge_tig_config_files = self.s3.list_s3_keys(s3_url)
         short_names = [path.split("/")[1].rsplit(".", 1)[0] for path in forge_tig_config_files]
 
-        if self.env == "ops":
-            mode = cmr.queries.CMR_OPS
-        else:
-            mode = cmr.queries.CMR_UAT
-
         self.logger.info(f"Found {len(short_names)} forge tig configs in {self.env}")
 
-        for short_name in short_names:
-            try:
-                if not any(attributes.get("short_name") == short_name and attributes.get("provider") == "POCLOUD"
-                           for attributes in self.collections.values()):
-                    self.logger.info(f"Adding {short_name} via forge tig configs in {self.env}...")
-                    url = cmr.queries.CollectionQuery(
-                        mode=mode).provider('POCLOUD').short_name(short_name)._build_url()
-
-                    collections_query = self.session.get(url, headers=self.headers, params={
-                                                    'page_size': 1}).json()['feed']['entry']
-
-                    if collections_query:
-                        self.add_collections("", collections_query)
-                    else:
-                        error_list.append([f"{short_name} ({self.env.upper()})", f"Not found via forge tig config", "NA"])
-            except Exception as ex:
-                self.logger.error(ex)
-                self.logger.error(short_name)
-                pass
+        self.add_short_names(short_names, "forge tig config")
 
         # Add collections from hitide-ui txt associations file
         self.add_concept_ids(self.hitide_associations_text, "hitide-ui txt association")
 
         # Add collections from l2ss-py-autotest txt associations files
-        l2ss_autotest_id_files = self.list_github_files("l2ss-py-autotest", f"tests/cmr/l2ss-py/{self.env}")
-        l2ss_concept_ids = [path.split("/")[-1] for path in l2ss_autotest_id_files]
-        self.add_concept_ids(l2ss_concept_ids, "l2ss-py-autotest txt association")
+        self.add_concept_ids(sorted(self.l2ss_autotest_ids), "l2ss-py-autotest txt association")
 
         # Add collections from concise-autotest txt associations files
-        concise_autotest_id_files = self.list_github_files("concise-autotest", f"tests/cmr/concise/{self.env}")
-        concise_concept_ids = [path.split("/")[-1] for path in concise_autotest_id_files]
-        self.add_concept_ids(concise_concept_ids, "concise-autotest txt association")
+        self.add_concept_ids(sorted(self.concise_autotest_ids), "concise-autotest txt association")
 
 
     def add_watches(self):
 
         watch_collections = read_csv_file(f"{self.data_path}/watch.csv")
 
-        if self.env == "ops":
-            mode = cmr.queries.CMR_OPS
-        else:
-            mode = cmr.queries.CMR_UAT
+        found, failed = self.resolve_collections('short_name', [row[0] for row in watch_collections])
 
         for row in watch_collections:
             short_name = row[0]
 
-            try:
-                url = cmr.queries.CollectionQuery(
-                    mode=mode).provider('POCLOUD').short_name(short_name)._build_url()
-
-                collections_query = self.session.get(url, headers=self.headers, params={
-                                                'page_size': 1}).json()['feed']['entry']
-
+            if short_name in found:
                 if len(row) > 1:
-                    collections_query[0]['watch_status'] = row[1]
+                    found[short_name]['watch_status'] = row[1]
+            elif short_name not in failed:
+                error_list.append([f"{short_name} ({self.env.upper()})", f"Not found via Watch List", "NA"])
 
-                if collections_query:
-                    self.add_collections("", collections_query)
-                else:
-                    error_list.append([f"{short_name} ({self.env.upper()})", f"Not found via Watch List", "NA"])
-            except Exception as ex:
-                self.logger.error(ex)
-                self.logger.error(short_name)
-                pass
+        self.add_collections("", found.values())
 
 
     def get_cumulus_api_workflow_choices(self):
@@ -500,8 +552,35 @@ class HitideCollections:
         self.cumulus_configurations_from_api = formatted_data
 
 
-    def umm_update_one_collection(self, item):
-        
+    def read_forge_tig_config(self, short_name):
+
+        try:
+            collection_config = f"s3://podaac-services-{self.env}-hitide/dataset-configs/{short_name}.cfg"
+
+            config = self.s3.read_file_from_s3(collection_config)
+            return json.loads(config)
+        except Exception as ex:
+            return None
+
+
+    async def update_batch(self, batch):
+
+        concept_ids = [concept_id for concept_id, _ in batch]
+        revision_dates = {concept_id: collection.get('revision_date') for concept_id, collection in batch}
+
+        try:
+            graphql_items = await self.engine.call('cmr_graphql', execute_graphql_batch_query, concept_ids, self.env, self.headers,
+                                                   self.graphql_cache, revision_dates)
+        except Exception as ex:
+            self.logger.error(f"GraphQL batch query failed for {len(concept_ids)} {self.env} collections: {ex}")
+            await asyncio.gather(*(self.update_one_collection(item, None, ex) for item in batch))
+            return
+
+        await asyncio.gather(*(self.update_one_collection(item, graphql_items.get(item[0])) for item in batch))
+
+
+    async def update_one_collection(self, item, graphql_item, graphql_error=None):
+
         try:
             concept_id = item[0]
             collection = item[1]
@@ -510,130 +589,104 @@ class HitideCollections:
 
             self.logger.info(f"Updating {self.env} collection...{concept_id} ({short_name})")
 
-            try:
-                collection_config = f"s3://podaac-services-{self.env}-hitide/dataset-configs/{short_name}.cfg"
+            # The S3 read waits on its own concurrency limit and overlaps with other collections
+            forge_tig_config = await self.engine.call('s3', self.read_forge_tig_config, short_name)
 
-                config = self.s3.read_file_from_s3(collection_config)
-                forge_tig_config = json.loads(config)
+            if graphql_error is not None:
+                raise Exception(f"GraphQL batch query failed: {graphql_error}")
 
-                collection['forge_tig_config'] = "X"
+            if graphql_item is None:
+                raise Exception(f"{concept_id} not found in GraphQL response")
 
-                if forge_tig_config.get('footprint'):
-                    collection['footprint_config'] = "X"
+            self.umm_update_one_collection(item, forge_tig_config, graphql_item)
 
-                collection['thumbnail_count'] = len(forge_tig_config.get('imgVariables', []))
-            except Exception as ex:
-                pass
+        except Exception as e:
+            self.logger.error("Error: " + str(e))
 
-            cumulus_config = self.cumulus_configurations_from_api.get(short_name)
+            # Print the full traceback
+            traceback.print_exc()
 
-            if cumulus_config is not None and cumulus_config.get('footprint'):
-                collection['cumulus_footprint'] = "X"
+            error_list.append([f"{short_name} ({self.env.upper()})", str(e), e.__traceback__.tb_lineno])
 
-            if cumulus_config is not None and cumulus_config.get('image'):
-                collection['cumulus_image'] = "X"
 
-            if cumulus_config is not None and cumulus_config.get('dmrpp'):
-                collection['cumulus_dmrpp'] = "X"
+    def umm_update_one_collection(self, item, forge_tig_config, graphql_item):
 
-            collection['hitide_txt'] = "X" if concept_id in self.hitide_associations_text else ""
-            collection['l2ss_txt'] = "X" if self.has_l2ss_association(concept_id) else ""
-            collection['concise_txt'] = "X" if self.has_concise_association(concept_id) else ""
+        concept_id = item[0]
+        collection = item[1]
 
-            graphql_query = execute_graphql_query(concept_id, self.env, self.headers)
+        short_name = collection.get('short_name')
 
-            granules = graphql_query.get('collections').get('items')[0].get('granules')
+        if forge_tig_config is not None:
+            collection['forge_tig_config'] = "X"
 
-            collection['granule_count'] = granules.get("count")
+            if forge_tig_config.get('footprint'):
+                collection['footprint_config'] = "X"
 
-            variables = graphql_query.get('collections').get('items')[0].get('variables').get('items')
+            collection['thumbnail_count'] = len(forge_tig_config.get('imgVariables', []))
 
-            if len(granules.get("items")) > 0:
-                last_granule = granules.get("items")[0]
+        cumulus_config = self.cumulus_configurations_from_api.get(short_name)
 
-                geometry = last_granule.get('spatialExtent').get('horizontalSpatialDomain').get('geometry')
+        if cumulus_config is not None and cumulus_config.get('footprint'):
+            collection['cumulus_footprint'] = "X"
 
-                if geometry:
-                    if any(key.lower() == 'gpolygons' for key in geometry):
-                        collection['last_granule_gpolygon'] = "X"
+        if cumulus_config is not None and cumulus_config.get('image'):
+            collection['cumulus_image'] = "X"
 
-                    if 'boundingRectangles' in geometry:
-                        collection['last_granule_bbox'] = "X"
+        if cumulus_config is not None and cumulus_config.get('dmrpp'):
+            collection['cumulus_dmrpp'] = "X"
 
-                    if 'lines' in geometry:
-                        collection['last_granule_lines'] = "X"
-                else:
-                    #TODO: Add column for FP Orbit?
-                    orbit = last_granule.get('spatialExtent').get('horizontalSpatialDomain').get('orbit')
-                    if orbit:
-                        self.logger.info(f"Found orbit for {short_name}")
+        collection['hitide_txt'] = "X" if concept_id in self.hitide_associations_text else ""
+        collection['l2ss_txt'] = "X" if self.has_l2ss_association(concept_id) else ""
+        collection['concise_txt'] = "X" if self.has_concise_association(concept_id) else ""
 
-                collection['last_granule_date'] = last_granule.get('temporalExtent').get('rangeDateTime').get('endingDateTime')[:10]
+        granules = graphql_item.get('granules')
 
-                var_names = [var['name'] for var in variables] if variables is not None else []
+        collection['granule_count'] = granules.get("count")
 
-# TODO: Add check to make sure UMM-V has the config vars that we should generate thumbnails for
-                if 'thumbnail_count' in collection:
-                    collection['last_granule_thumbnail_count'] = sum(   any(name.replace('/', '.') in url.get('url') for name in var_names) and
-                                                                        url.get('mimeType') == "image/png" and
-                                                                        url.get('type') == "GET RELATED VISUALIZATION" and
-                                                                        url.get('subtype') == "DIRECT DOWNLOAD"
-                                                                        for url in last_granule.get('relatedUrls'))
-
-            if variables:
-                if any(var['name'] == 'lat' or var['name'] == 'latitude' for var in variables):
-                    collection['umm_v_lat'] = "X"
-                elif any(var['variableType'] == 'COORDINATE' and var['variableSubType'] == 'LATITUDE' for var in variables):
-                    collection['umm_v_lat'] = "X"
-
-                if any(var['name'] == 'lon' or var['name'] == 'longitude' for var in variables):
-                    collection['umm_v_lon'] = "X"
-                elif any(var['variableType'] == 'COORDINATE' and var['variableSubType'] == 'LONGITUDE' for var in variables):
-                    collection['umm_v_lon'] = "X"
+        variables = graphql_item.get('variables').get('items')
 
-        except Exception as e:
-            self.logger.error("Error: " + str(e))
+        if len(granules.get("items")) > 0:
+            last_granule = granules.get("items")[0]
 
-            # Print the full traceback
-            traceback.print_exc()
+            geometry = last_granule.get('spatialExtent').get('horizontalSpatialDomain').get('geometry')
 
-            error_list.append([f"{short_name} ({self.env.upper()})", str(e), e.__traceback__.tb_lineno])
+            if geometry:
+                if any(key.lower() == 'gpolygons' for key in geometry):
+                    collection['last_granule_gpolygon'] = "X"
 
+                if 'boundingRectangles' in geometry:
+                    collection['last_granule_bbox'] = "X"
 
-    def bearer_token(self):
-        tokens = []
-        headers: dict = {'Accept': 'application/json'}
-        url: str = f"https://{'uat.' if self.env == 'uat' else ''}urs.earthdata.nasa.gov/api/users"
+                if 'lines' in geometry:
+                    collection['last_granule_lines'] = "X"
+            else:
+                #TODO: Add column for FP Orbit?
+                orbit = last_granule.get('spatialExtent').get('horizontalSpatialDomain').get('orbit')
+                if orbit:
+                    self.logger.info(f"Found orbit for {short_name}")
 
-        # First just try to get a token that already exists
-        try:
-            resp = self.session.get(url + "/tokens", headers=headers,
-                                    auth=requests.auth.HTTPBasicAuth(os.environ['CMR_USER'], os.environ['CMR_PASS']))
-            response_content = json.loads(resp.content)
+            collection['last_granule_date'] = last_granule.get('temporalExtent').get('rangeDateTime').get('endingDateTime')[:10]
 
-            for x in response_content:
-                tokens.append(x['access_token'])
+            var_names = [var['name'] for var in variables] if variables is not None else []
 
-        except Exception as ex:  # noqa E722
-            self.logger.error(ex)
-            self.logger.error(f"Error getting the {self.env} token - check user name and password")
+# TODO: Add check to make sure UMM-V has the config vars that we should generate thumbnails for
+            if 'thumbnail_count' in collection:
+                collection['last_granule_thumbnail_count'] = sum(   any(name.replace('/', '.') in url.get('url') for name in var_names) and
+                                                                    url.get('mimeType') == "image/png" and
+                                                                    url.get('type') == "GET RELATED VISUALIZATION" and
+                                                                    url.get('subtype') == "DIRECT DOWNLOAD"
+                                                                    for url in last_granule.get('relatedUrls'))
 
-        # No tokens exist, try to create one
-        if not tokens:
-            try:
-                resp = self.session.post(url + "/token", headers=headers,
-                                            auth=requests.auth.HTTPBasicAuth(os.environ['CMR_USER'], os.environ['CMR_PASS']))
-                response_content: dict = json.loads(resp.content)
-                tokens.append(response_content['access_token'])
-            except Exception as ex:  # noqa E722
-                self.logger.error(ex)
-                self.logger.error(f"Error getting the {self.env} token - check user name and password")
-
-        # If still no token, then we can't do anything
-        if not tokens:
-            return None
+        if variables:
+            if any(var['name'] == 'lat' or var['name'] == 'latitude' for var in variables):
+                collection['umm_v_lat'] = "X"
+            elif any(var['variableType'] == 'COORDINATE' and var['variableSubType'] == 'LATITUDE' for var in variables):
+                collection['umm_v_lat'] = "X"
 
-        return next(iter(tokens))
+            if any(var['name'] == 'lon' or var['name'] == 'longitude' for var in variables):
+                collection['umm_v_lon'] = "X"
+            elif any(var['variableType'] == 'COORDINATE' and var['variableSubType'] == 'LONGITUDE' for var in variables):
+                collection['umm_v_lon'] = "X"
 
 
     def run(self):
@@ -648,6 +701,12 @@ class HitideCollections:
         self.update_collections()
         self.write_worksheet_collection()
 
+        self.logger.info(f"Upstream stats for {self.env}:")
+        self.engine.log_stats()
+
+        if self.graphql_cache is not None:
+            self.logger.info(f"GraphQL cache: {self.graphql_cache.summary()}")
+
 
 def parse_args():
     """
@@ -673,21 +732,45 @@ def parse_args():
                         required=True,
                         metavar='')
 
+    parser.add_argument('--sequential',
+                        help='run OPS and then UAT instead of both at the same time',
+                        action='store_true')
+
+    parser.add_argument('--graphql-concurrency',
+                        help='max concurrent CMR GraphQL requests per environment',
+                        type=int,
+                        default=DEFAULT_LIMITS['cmr_graphql'])
+
+    parser.add_argument('--graphql-batch-size',
+                        help='number of collections to query per GraphQL request',
+                        type=int,
+                        default=DEFAULT_BATCH_SIZE)
+
+    parser.add_argument('--cache-file',
+                        help='SQLite file caching the GraphQL schema and collection responses',
+                        default=DEFAULT_CACHE_FILE)
+
+    parser.add_argument('--cache-ttl',
+                        help='hours cached GraphQL collection fields stay valid, granule fields are always queried (0 disables the cache)',
+                        type=float,
+                        default=DEFAULT_TTL_HOURS)
+
+    parser.add_argument('--s3-concurrency',
+                        help='max concurrent S3 reads per environment',
+                        type=int,
+                        default=DEFAULT_LIMITS['s3'])
+
     args = parser.parse_args()
     return args
 
 
-if __name__ == '__main__':
+def run_environment(logger, env, args, concurrency, graphql_cache):
 
-    _args = parse_args()
-
-    logger = logger_from_args(_args)
+    hitide_collections = HitideCollections(logger, env, args.data, concurrency, args.graphql_batch_size, graphql_cache)
+    hitide_collections.run()
 
-    hitide_collections_ops = HitideCollections(logger, "ops", _args.data)
-    hitide_collections_ops.run()
 
-    hitide_collections_uat = HitideCollections(logger, "uat", _args.data)
-    hitide_collections_uat.run()
+def write_status(errors):
 
     status_ws = workbook.worksheet("Status")
     status_ws.clear()
@@ -704,7 +787,36 @@ if __name__ == '__main__':
 
     status_ws.update([[dt_string]], "B2", value_input_option='USER_ENTERED')
 
-    if len(error_list) > 0:
-        status_ws.update(error_list, "B5")
+    if len(errors) > 0:
+        status_ws.update(errors, "B5")
     else:
         status_ws.update([["None"]], "B5")
+
+
+if __name__ == '__main__':
+
+    _args = parse_args()
+
+    logger = logger_from_args(_args)
+
+    concurrency = {
+        'cmr_graphql': _args.graphql_concurrency,
+        's3': _args.s3_concurrency,
+    }
+
+    graphql_cache = GraphQLCache(_args.cache_file, _args.cache_ttl) if _args.cache_ttl > 0 else None
+
+    if _args.sequential:
+        run_environment(logger, "ops", _args, concurrency, graphql_cache)
+        run_environment(logger, "uat", _args, concurrency, graphql_cache)
+    else:
+        # OPS and UAT only share the error collector and the GraphQL cache, both thread-safe,
+        # and spend their time waiting on the network, so run them side by side
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            runs = [executor.submit(run_environment, logger, env, _args, concurrency, graphql_cache) for env in ("ops", "uat")]
+
+        for run in runs:
+            run.result()
+
+    # One Status sheet write with the errors from both environments
+    write_status(error_list.rows())
@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Maximum number of in-flight calls per upstream service
+DEFAULT_LIMITS = {
+    'cmr_graphql': 16,
+    's3': 32,
+}
+
+
+class UpstreamStats:
+    """Latency and throughput counters for a single upstream service."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.first_start = None
+        self.last_end = None
+
+
+    def record(self, start: float, end: float, failed: bool):
+
+        self.latencies.append(end - start)
+
+        if failed:
+            self.errors += 1
+
+        if self.first_start is None or start < self.first_start:
+            self.first_start = start
+
+        if self.last_end is None or end > self.last_end:
+            self.last_end = end
+
+
+    def summary(self) -> str:
+
+        calls = len(self.latencies)
+
+        if calls == 0:
+            return "no calls"
+
+        latencies = sorted(self.latencies)
+        mean = sum(latencies) / calls
+        p95 = latencies[min(calls - 1, int(calls * 0.95))]
+        window = self.last_end - self.first_start
+        throughput = calls / window if window > 0 else float(calls)
+
+        return (f"{calls} calls, {self.errors} errors, "
+                f"latency mean {mean:.3f}s / p95 {p95:.3f}s / max {latencies[-1]:.3f}s, "
+                f"throughput {throughput:.1f} calls/s")
+
+
+class RefreshEngine:
+    """Run collection refresh coroutines with a bounded number of in-flight calls per upstream.
+
+    Blocking clients (boto3, gql) are run on a thread pool that is sized to the
+    sum of the upstream limits, so the semaphores are the only thing throttling the refresh.
+    """
+
+    def __init__(self, logger: logging.Logger, limits: dict = None):
+        """Initialize RefreshEngine.
+
+        Args:
+            logger: Logger instance for logging
+            limits: Mapping of upstream name to max concurrent calls, merged over DEFAULT_LIMITS
+        """
+        self.logger: logging.Logger = logger
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.stats = {name: UpstreamStats() for name in self.limits}
+        self._semaphores = {}
+
+
+    async def call(self, upstream: str, func, *args, **kwargs):
+        """Call a blocking function against an upstream, waiting for a free slot first."""
+
+        async with self._semaphores[upstream]:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+                failed = False
+                return result
+            finally:
+                self.stats[upstream].record(start, time.perf_counter(), failed)
+
+
+    def run(self, worker, items):
+        """Run the coroutine function worker on every item and wait for all of them to finish."""
+
+        asyncio.run(self._run(worker, list(items)))
+
+
+    async def _run(self, worker, items):
+
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=sum(self.limits.values())))
+
+        self._semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.limits.items()}
+
+        await asyncio.gather(*(worker(item) for item in items))
+
+
+    def log_stats(self):
+
+        for name, stats in self.stats.items():
+            self.logger.info(f"{name}: {stats.summary()}")
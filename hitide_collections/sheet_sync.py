@@ -0,0 +1,97 @@
+from gspread.utils import rowcol_to_a1
+
+
+def cell_text(value):
+    """Render a record value the way the Sheets API returns it from get_all_values()."""
+
+    if value is None:
+        return ""
+
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+
+    return str(value)
+
+
+def diff_ranges(current, records):
+    """Compute the ranges of cells that differ between the current sheet values and the new records.
+
+    Consecutive changed cells in a row are grouped into one range.  Cells that are on the sheet but
+    not in the records are blanked.
+
+    Args:
+        current: Sheet values as returned by get_all_values()
+        records: New rows to write, starting at A1
+
+    Returns:
+        list: batch_update entries of the form {'range': 'B5:D5', 'values': [[...]]}
+    """
+    row_count = max(len(current), len(records))
+    col_count = max([len(row) for row in current] + [len(row) for row in records] + [0])
+
+    updates = []
+
+    for row_index in range(row_count):
+        old_row = current[row_index] if row_index < len(current) else []
+        new_row = records[row_index] if row_index < len(records) else []
+
+        old_cells = [old_row[col] if col < len(old_row) else "" for col in range(col_count)]
+        new_cells = [new_row[col] if col < len(new_row) else None for col in range(col_count)]
+
+        col = 0
+        while col < col_count:
+            if cell_text(new_cells[col]) == old_cells[col]:
+                col += 1
+                continue
+
+            start = col
+            while col < col_count and cell_text(new_cells[col]) != old_cells[col]:
+                col += 1
+
+            values = ["" if value is None else value for value in new_cells[start:col]]
+
+            updates.append({
+                'range': f"{rowcol_to_a1(row_index + 1, start + 1)}:{rowcol_to_a1(row_index + 1, col)}",
+                'values': [values],
+            })
+
+    return updates
+
+
+def sync_worksheet(worksheet, records, logger=None):
+    """Bring a worksheet in line with records, sending only the changed cells.
+
+    The sheet is read once, diffed cell by cell against the records and the changed ranges are
+    written in a single batch_update.  Unlike clear() + update() the sheet is never empty while
+    it is being refreshed.  The grid is resized to the records, so rows and columns left over from
+    a larger table are removed rather than kept as blank cells.
+
+    Args:
+        worksheet: gspread Worksheet to update
+        records: Rows to write, starting at A1
+        logger: Optional logger for a summary of the changes
+
+    Returns:
+        int: Number of ranges written
+    """
+    rows = max(len(records), 1)
+    cols = max([len(row) for row in records] + [1])
+
+    # Trailing rows and columns outside the grid are dropped with it, the rest is diffed
+    current = [row[:cols] for row in worksheet.get_all_values()[:rows]]
+
+    # Resized first, writing outside of the grid fails
+    if rows != worksheet.row_count or cols != worksheet.col_count:
+        worksheet.resize(rows=rows, cols=cols)
+
+    updates = diff_ranges(current, records)
+
+    if updates:
+        worksheet.batch_update(updates, value_input_option='RAW')
+
+    if logger is not None:
+        cells = sum(len(update['values'][0]) for update in updates)
+        logger.info(f"{worksheet.title}: {cells} cells changed in {len(updates)} ranges")
+
+    return len(updates)
+
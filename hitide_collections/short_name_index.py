@@ -0,0 +1,21 @@
+class ShortNameIndex:
+    """Concept IDs of the collections in a registry by (short_name, provider).
+
+    Lets config short names be checked against the collections already found without scanning
+    every collection, see benchmark_short_name_index.py.
+    """
+
+    def __init__(self):
+
+        self._concept_ids = {}
+
+
+    def add(self, short_name, provider, concept_id):
+
+        self._concept_ids[(short_name, provider)] = concept_id
+
+
+    def missing(self, short_names, provider="POCLOUD"):
+        """The short names with no collection from provider, in order."""
+
+        return [short_name for short_name in short_names if (short_name, provider) not in self._concept_ids]
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371
+
+# Granules whose bounding rectangles cover more than this are counted as global
+GLOBAL_BBOX_AREA_KM2 = 249_000_000
+
+BBOX_KEYS = ("WestBoundingCoordinate", "EastBoundingCoordinate", "SouthBoundingCoordinate", "NorthBoundingCoordinate")
+
+
+def bounding_rectangles(granule):
+    """BoundingRectangles of a UMM granule, or an empty tuple if it has none."""
+
+    try:
+        return granule['umm']['SpatialExtent']['HorizontalSpatialDomain']['Geometry'].get('BoundingRectangles') or ()
+    except (KeyError, TypeError, AttributeError):
+        return ()
+
+
+def rectangle_arrays(rectangles):
+    """West, east, south and north coordinate arrays, in degrees, of a list of BoundingRectangles.
+
+    Missing coordinates become NaN, which gives a NaN area.
+    """
+    return tuple(np.array([rect.get(key) for rect in rectangles], dtype=np.float64) for key in BBOX_KEYS)
+
+
+def rectangle_areas(west, east, south, north):
+    """Area in km² of latitude/longitude rectangles, given as arrays of degrees.
+
+    A rectangle whose east edge is less than its west edge crosses the antimeridian and spans
+    east - west + 360 degrees of longitude.
+    """
+    lon_span = np.asarray(east, dtype=np.float64) - np.asarray(west, dtype=np.float64)
+    lon_span = np.where(lon_span < 0, lon_span + 360.0, lon_span)
+
+    band = np.sin(np.radians(north)) - np.sin(np.radians(south))
+
+    return EARTH_RADIUS_KM**2 * band * np.radians(lon_span)
+
+
+def areas_per_granule(rectangle_lists):
+    """Total area in km² of each entry of a list of per-granule BoundingRectangles lists."""
+
+    counts = np.fromiter(map(len, rectangle_lists), dtype=np.intp, count=len(rectangle_lists))
+    areas = rectangle_areas(*rectangle_arrays([rect for rectangles in rectangle_lists for rect in rectangles]))
+    owners = np.repeat(np.arange(len(rectangle_lists)), counts)
+
+    return np.bincount(owners, weights=areas, minlength=len(rectangle_lists))
+
+
+def granule_areas(granules):
+    """Total bounding rectangle area in km² of every granule in a batch.
+
+    Granules without BoundingRectangles have an area of 0.
+    """
+    return areas_per_granule([bounding_rectangles(granule) for granule in granules])
+
+
+def global_bbox_mask(granules, threshold=GLOBAL_BBOX_AREA_KM2):
+    """Per-granule areas and a mask of the granules whose bounding rectangles exceed threshold.
+
+    Args:
+        granules (list): UMM granule dictionaries
+        threshold (float): Area in km² above which a granule is counted as global
+
+    Returns:
+        tuple: (areas, mask) arrays with one entry per granule
+    """
+    areas = granule_areas(granules)
+
+    return areas, areas > threshold
@@ -0,0 +1,134 @@
+"""Benchmark for the global-bbox check run over every granule of a month.
+
+Compares the old per-rectangle math loop with the vectorized areas in bbox_area over a synthetic
+month of granules.  Standalone so it can run without Google, AWS or CMR credentials:
+
+    python benchmark_bbox_area.py --granules 1000000
+"""
+
+import argparse
+import contextlib
+import math
+import os
+import random
+import time
+
+from bbox_area import (EARTH_RADIUS_KM, GLOBAL_BBOX_AREA_KM2, bounding_rectangles, global_bbox_mask,
+                       rectangle_areas, rectangle_arrays)
+
+
+def synthetic_granules(count, seed):
+
+    rng = random.Random(seed)
+    granules = []
+
+    for _ in range(count):
+        kind = rng.random()
+
+        if kind < 0.2:
+            # Global granule
+            rect = (-180.0, 180.0, -90.0, 90.0)
+        elif kind < 0.3:
+            # Wide swath crossing the antimeridian, east < west
+            rect = (rng.uniform(0.0, 60.0), rng.uniform(-60.0, 0.0), rng.uniform(-90.0, -60.0), rng.uniform(60.0, 90.0))
+        else:
+            west = rng.uniform(-180.0, 170.0)
+            south = rng.uniform(-90.0, 80.0)
+            rect = (west, rng.uniform(west, 180.0), south, rng.uniform(south, 90.0))
+
+        granules.append({'umm': {'SpatialExtent': {'HorizontalSpatialDomain': {'Geometry': {'BoundingRectangles': [{
+            'WestBoundingCoordinate': rect[0],
+            'EastBoundingCoordinate': rect[1],
+            'SouthBoundingCoordinate': rect[2],
+            'NorthBoundingCoordinate': rect[3],
+        }]}}}}})
+
+    return granules
+
+
+def loop_count(granules, echo=False):
+    """The previous calculate_earth_rectangle_area + get_count_global_bbox.
+
+    With echo the rectangles are printed for every granule, as the previous version did.
+    """
+
+    count = 0
+
+    for granule in granules:
+        total = 0.0
+
+        for rect in granule['umm']['SpatialExtent']['HorizontalSpatialDomain']['Geometry']['BoundingRectangles']:
+            south = math.radians(rect.get("SouthBoundingCoordinate"))
+            north = math.radians(rect.get("NorthBoundingCoordinate"))
+            west = math.radians(rect.get("WestBoundingCoordinate"))
+            east = math.radians(rect.get("EastBoundingCoordinate"))
+
+            band = 2 * math.pi * EARTH_RADIUS_KM**2 * (math.sin(north) - math.sin(south))
+            total += band * (east - west) / (2 * math.pi)
+
+        if echo:
+            print(f"Rectangles: {granule['umm']['SpatialExtent']['HorizontalSpatialDomain']['Geometry']['BoundingRectangles']}, "
+                  f"Total area: {total:,.0f} km²")
+
+        if total > GLOBAL_BBOX_AREA_KM2:
+            count += 1
+
+    return count
+
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark global-bbox detection over a synthetic month of granules',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument('--granules', type=int, default=1_000_000,
+                        help='number of granules in the synthetic month')
+
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed for the synthetic granules')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+
+    _args = parse_args()
+
+    granules = synthetic_granules(_args.granules, _args.seed)
+
+    # The previous version printed every granule's rectangles, time that with stdout discarded
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        loop_count(granules, echo=True)
+        echo_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loop_global = loop_count(granules)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, mask = global_bbox_mask(granules)
+    vector_global = int(mask.sum())
+    vector_time = time.perf_counter() - start
+
+    # Split out the area math from walking the UMM dictionaries
+    rectangles = [rect for granule in granules for rect in bounding_rectangles(granule)]
+    arrays = rectangle_arrays(rectangles)
+
+    start = time.perf_counter()
+    rectangle_areas(*arrays)
+    math_time = time.perf_counter() - start
+
+    print(f"{_args.granules} granules")
+    print(f"previous (printing): {echo_time * 1000:10.2f} ms")
+    print(f"python loop:         {loop_time * 1000:10.2f} ms, {loop_global} global")
+    print(f"vectorized:          {vector_time * 1000:10.2f} ms, {vector_global} global")
+    print(f"speedup vs previous: {echo_time / vector_time:10.1f}x")
+    print(f"speedup vs loop:     {loop_time / vector_time:10.1f}x")
+    print(f"area math only:      {math_time * 1000:10.2f} ms, the rest is reading the UMM dictionaries")
+
+    # The loop treats antimeridian swaths as negative areas, the vectorized version does not
+    if loop_global != vector_global:
+        print(f"difference:          {vector_global - loop_global} granules (antimeridian-crossing boxes)")
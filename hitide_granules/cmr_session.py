@@ -0,0 +1,79 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Kept-alive connections per host, the most requests in flight to one host without blocking
+DEFAULT_POOL_SIZE = int(os.environ.get('CMR_POOL_SIZE', 16))
+
+# Retries of connection errors and 429/5xx responses, with exponential backoff
+DEFAULT_RETRIES = int(os.environ.get('CMR_RETRIES', 5))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests sent, so connection reuse can be reported."""
+
+    def __init__(self, *args, **kwargs):
+
+        self.requests_sent = 0
+        super().__init__(*args, **kwargs)
+
+
+    def send(self, request, *args, **kwargs):
+
+        self.requests_sent += 1
+        return super().send(request, *args, **kwargs)
+
+
+    def connections_opened(self) -> int:
+        """Connections opened by the pools of the hosts this adapter is still holding."""
+
+        pools = self.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+
+def pooled_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES):
+    """requests Session with keep-alive connection pools and retry/backoff on every https and http request.
+
+    Args:
+        pool_size: Connections kept alive per host
+        retries: Retries of a failed request, sleeping 1, 2, 4... seconds between them
+
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+
+    retry = Retry(total=retries, backoff_factor=1, status_forcelist=RETRY_STATUSES)
+    adapter = CountingAdapter(max_retries=retry, pool_connections=8, pool_maxsize=pool_size)
+
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def connection_stats(session):
+    """Requests sent, connections opened and requests that reused a kept-alive connection."""
+
+    adapters = {id(adapter): adapter for adapter in session.adapters.values() if isinstance(adapter, CountingAdapter)}
+
+    sent = sum(adapter.requests_sent for adapter in adapters.values())
+    opened = sum(adapter.connections_opened() for adapter in adapters.values())
+
+    return dict(requests=sent, connections=opened, reused=max(0, sent - opened))
+
+
+def log_connection_stats(logger, session=None):
+
+    stats = connection_stats(session or cmr_session)
+
+    logger.info(f"HTTP connections: {stats['requests']} requests over {stats['connections']} connections, "
+                f"{stats['reused']} reused")
+
+
+# Shared by the module-level CMR, URS and dataset config calls of a tool
+cmr_session = pooled_session()
@@ -0,0 +1,90 @@
+from podaac.hitide_backfill_tool.cli import Backfiller
+
+from bbox_area import GLOBAL_BBOX_AREA_KM2, areas_per_granule, bounding_rectangles, global_bbox_mask
+
+# Bounding rectangles are buffered and their areas computed in batches of this many granules
+BBOX_BATCH_SIZE = 4096
+
+
+def get_count_global_bbox(granules):
+    """Count granules that have bounding boxes larger than 249,000,000 km².
+    
+    Args:
+        granules (list): List of granule metadata dictionaries containing UMM spatial extent info
+        
+    Returns:
+        int: Count of granules with bounding boxes exceeding the area threshold
+    """
+
+    return int(global_bbox_mask(granules)[1].sum())
+
+
+class GranuleAggregator:
+    """Stand-in for a month's granule list that folds granules into counters as they arrive.
+
+    No granule is kept, so memory stays flat however many granules a month holds.  Bounding
+    rectangle areas are computed with bbox_area in batches of BBOX_BATCH_SIZE granules.  len()
+    gives the granule count.
+    """
+
+    def __init__(self, granules=()):
+
+        self.count = 0
+
+        self._global_bbox = 0
+        self._pending = []
+
+        for granule in granules:
+            self.append(granule)
+
+
+    def append(self, granule):
+
+        self._pending.append(bounding_rectangles(granule))
+
+        if len(self._pending) >= BBOX_BATCH_SIZE:
+            self._flush()
+
+        self.count += 1
+
+
+    def _flush(self):
+
+        if self._pending:
+            self._global_bbox += int((areas_per_granule(self._pending) > GLOBAL_BBOX_AREA_KM2).sum())
+
+        self._pending = []
+
+
+    @property
+    def global_bbox(self):
+        """Number of granules whose bounding rectangles exceed GLOBAL_BBOX_AREA_KM2."""
+
+        self._flush()
+        return self._global_bbox
+
+
+    def __len__(self):
+
+        return self.count
+
+
+class MonthlyResults(dict):
+    """monthly_results mapping that swaps each month's 'granules' list for a GranuleAggregator."""
+
+    def __setitem__(self, month, result):
+
+        if isinstance(result.get('granules'), list):
+            result['granules'] = GranuleAggregator(result['granules'])
+
+        super().__setitem__(month, result)
+
+
+class StreamingBackfiller(Backfiller):
+    """Backfiller that keeps running per-month counters instead of every UMM granule record."""
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        self.monthly_results = MonthlyResults()
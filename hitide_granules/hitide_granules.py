@@ -1,28 +1,39 @@
-from concurrent.futures import ThreadPoolExecutor
-from multiprocessing import Lock
 import os
-import cmr
 import pytz
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-import random
 import gspread
-import math
 
 import uuid
 from retrying import retry
 
+from cmr_session import cmr_session, log_connection_stats
+from earthdata_auth import bearer_token
+from scan_worker import DEFAULT_SCAN_PROCESSES, scan_pool, scan_shard, shard_descriptor
+from shard_scheduler import DEFAULT_MAX_WORKERS, ShardScheduler
+from shard_state import ShardStateStore
+from sheet_writer import SheetBatchWriter
+from temporal_extent import TemporalResolver
+
 from podaac.hitide_backfill_tool.args import parse_args
-from podaac.hitide_backfill_tool.s3_reader import S3Reader
 from podaac.hitide_backfill_tool.cli import *
 
 
 gc = gspread.service_account()
-EARTH_RADIUS_KM = 6371
-
-lock = Lock()
 
 spreadsheet_id = os.environ['SPREADSHEET_ID']
+
+# Only rescan months whose CMR hit count changed since they were last counted
+RECONCILE = os.environ.get('HITIDE_GRANULES_RECONCILE', 'false').lower() in ('1', 'true', 'yes')
+
+# The current month is cleared once per run, the re-run attempts of a workflow run share its GITHUB_RUN_ID
+RUN_ID = os.environ.get('HITIDE_GRANULES_RUN_ID') or os.environ.get('GITHUB_RUN_ID') or str(uuid.uuid4())
+
+# 'counts' for the Monthly Counts sheet, 'last_granules' for the Last Granules sheet, 'all' for both
+MODE = os.environ.get('HITIDE_GRANULES_MODE', 'counts')
+
+# Granules per collection on the Last Granules sheet
+LAST_GRANULES = int(os.environ.get('HITIDE_GRANULES_LAST_GRANULES', 5))
 DATASET_CONFIG_URL = "https://hitide.podaac.earthdatacloud.nasa.gov/dataset-configs/"
 
 workbook = gc.open_by_key(spreadsheet_id)
@@ -69,11 +80,11 @@ class RetryError(Exception):
 
 # Retry decorator to handle exceptions and implement backoff
 @retry(wait_exponential_multiplier=1000, wait_exponential_max=30000, stop_max_attempt_number=7, retry_on_exception=lambda ex: isinstance(ex, RetryError))
-def update_sheet(worksheet, cell, data):
+def update_sheet(worksheet, cell, data, value_input_option=None):
     try:
          
         # Update the data in the worksheet
-        worksheet.update(data, cell)  # Update cell A1 with your data
+        worksheet.update(data, cell, value_input_option=value_input_option)  # Update cell A1 with your data
         
     except gspread.exceptions.GSpreadException as e:
         print(f"Error: {e}")
@@ -83,7 +94,7 @@ def update_sheet(worksheet, cell, data):
 def get_collection_config(short_name):
 
     collection_config = DATASET_CONFIG_URL + short_name + '.cfg'
-    forge_tig_config_resp = requests.get(collection_config)
+    forge_tig_config_resp = cmr_session.get(collection_config)
 
     if forge_tig_config_resp.status_code == 200:
         forge_tig_config = forge_tig_config_resp.json()
@@ -91,71 +102,6 @@ def get_collection_config(short_name):
         return forge_tig_config
  
 
-def create_backfiller(args, logger):
-
-    search = granule_search_from_args(args, logger)
-    message_writer = message_writer_from_args(args, logger)
-
-    s3 = S3Reader(logger, args.aws_profile)    # pylint: disable=C0103
-    collection = args.collection
-    # setup backfiller
-
-#    args.footprint = 'on'
-#    args.image = 'on'
-
-    # Check forge configurations before running backfill
-#    forge_tig_config = get_collection_config(collection)
-
-#    if forge_tig_config is None:
-#        logger.warning("No configuration for collection " + collection + " found.")
-#    else:
-#        if forge_tig_config.get('footprint'):
-#            args.footprint = 'on'
-#        imgVariables = forge_tig_config.get('imgVariables')
-#        if imgVariables is not None and len(imgVariables) > 0:
-#            args.image = 'on'
-
-    safe_log_args(logger, args)
-
-    granule_options = granule_options_from_args(args)
-
-    backfiller = Backfiller(search, message_writer, [],
-                            granule_options, logger, args.message_limit, args.cli_execution_id, s3, collection, None)
-    
-    return backfiller
-
-
-def get_info(short_name, args):
-
-    mode = cmr.queries.CMR_OPS
-
-    granule_url = cmr.queries.GranuleQuery(
-                    mode=mode).provider('POCLOUD').short_name(short_name)._build_url()
-    
-    headers = {"Authorization": f"Bearer {args.edl_token}"}
-
-    first_granule = requests.get(granule_url, headers=headers, params={
-                                'page_size': 1, 'sort_key': 'start_date'}).json()['feed']['entry']
-    last_granule = requests.get(granule_url, headers=headers, params={
-                                'page_size': 1, 'sort_key': '-start_date'}).json()['feed']['entry']
-
- #  granule_count = requests.get(granule_url, headers=headers, params={
-  #                              'page_size': 0}).headers["CMR-Hits"]
-
- #   print('granule counts = ' + granule_count)
-
-    time_start = first_granule[0].get("time_start")
-    time_end = last_granule[0].get("time_end")
-
-    if (time_end == None):
-        print("time_end not found.  This should never happen!")
-        now = datetime.now(pytz.timezone('US/Pacific'))
-        time_end = now.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-    return dict(time_start = time_start,
-                time_end = time_end)
-
-
 def get_latest_end_date(end_time : str):
     end_date = datetime.strptime(end_time[:7], "%Y-%m")
 
@@ -187,130 +133,44 @@ def gen_date_array(start_time, end_time):
     return date_array
 
 
-def calculate_earth_rectangle_area(rectangles):
-    """
-    Calculates the area of the Earth covered by a list of bounding box rectangles.
-
-    Args:
-        rectangles (list): List of dictionaries containing bounding box coordinates with keys:
-            WestBoundingCoordinate, EastBoundingCoordinate, SouthBoundingCoordinate, NorthBoundingCoordinate.
-            Longitudes and latitudes are in degrees.
-
-    Returns:
-        float: The total area of the Earth covered by the rectangles in square kilometers.
-    """
-    total_area_sq_km = 0.0
-
-    for rect in rectangles:
-        # Convert degrees to radians
-        south_lat_rad = math.radians(rect.get("SouthBoundingCoordinate"))
-        north_lat_rad = math.radians(rect.get("NorthBoundingCoordinate")) 
-        west_lon_rad = math.radians(rect.get("WestBoundingCoordinate"))
-        east_lon_rad = math.radians(rect.get("EastBoundingCoordinate"))
-
-        # Calculate the area using the formula for a latitude/longitude grid
-        # This formula is accurate for rectangles defined by constant latitude and longitude lines
-        area_of_band = 2 * math.pi * EARTH_RADIUS_KM**2 * (math.sin(north_lat_rad) - math.sin(south_lat_rad))
-        area_of_rectangle = area_of_band * (east_lon_rad - west_lon_rad) / (2 * math.pi)
-
-        total_area_sq_km += area_of_rectangle
-
-    print(f"Rectangles: {rectangles}, Total area: {total_area_sq_km:,.0f} km²")
-
-    return total_area_sq_km
-
-
-def get_count_global_bbox(granules):
-    """Count granules that have bounding boxes larger than 249,000,000 km².
-    
-    Args:
-        granules (list): List of granule metadata dictionaries containing UMM spatial extent info
-        
-    Returns:
-        int: Count of granules with bounding boxes exceeding the area threshold
-    """
-
-    count = 0
-    for granule in granules:
-        geom = granule['umm']['SpatialExtent']['HorizontalSpatialDomain']['Geometry']
-
-        if 'BoundingRectangles' in geom:
-            if calculate_earth_rectangle_area(geom.get('BoundingRectangles')) > 249_000_000:
-                count += 1
-
-    return count
-
-
-def update_monthly_counts(backfiller, row_index, month):
-
-    row = [backfiller.search._collection_short_name, month]
-
-    if month in backfiller.monthly_results:
-        result = backfiller.monthly_results[month]
-
-        global_bbox_count = get_count_global_bbox(result['granules'])
-        row.append(len(result['granules']))
-        row.append(result['needs_image'])
-        row.append(result['needs_footprint'])
-        row.append(global_bbox_count)
-        row.append(result['both_footprint_and_bbox'])
-    else:
-        row.append(0)
-        row.append(0)
-        row.append(0)
-        row.append(0)
-        row.append(0)
-
-        print("Month not found in backfiller.  Assuming no granules for this month.")
+def update_monthly_counts(result, state):
 
-    now = datetime.now(pytz.timezone('US/Pacific'))
-    dt_string = now.strftime("%m/%d/%Y %H:%M:%S")
-    row.append(dt_string)
+    row = [result['collection'], result['month'], *result['counts'], result['updated']]
 
     print("Adding row...")
     print(row)
 
-    try:
-        update_sheet(monthly_counts_sheet, "A" + str(row_index), [row])
-    except RetryError:
-        print("Update failed after multiple retries. You may want to handle this error further.")
+    state.complete(result['collection'], result['month'], result['counts'], result['updated'])
+
+    return row
 
 
 def process_one_collection(run):
 
-    args = run['args']
-    logger = run['logger']
-    row_index = run['row_index']
-    month = run['month']
+    pool = run['pool']
 
-    # run backfiller
+    # The scan runs in a worker process, its result comes back here to the state store and sheet writer
     try:
-        logger.info("Running backfiller on collection " + args.collection)
-
-        backfiller = create_backfiller(args, logger)
-
-        backfiller.process_granules()
-
-        with lock:
-            update_monthly_counts(backfiller, row_index, month)
-
+        if pool is None:
+            result = scan_shard(run['scan'], run['logger'])
+        else:
+            result = pool.submit(scan_shard, run['scan']).result()
     except Exception as exc:
-        logger.error(f"big error: {exc}")
-    except:  # noqa: E722 - to catch ctrl-C
-        logger.warning("keyboard interrupt")
+        run['logger'].error(f"Scan of {run['collection']} {run['month']} failed: {exc}")
+        result = dict(counts=None)
 
-    backfiller.log_stats()
+    if result['counts'] is None:
+        run['state'].fail(run['collection'], run['month'])
+        return False
 
-    logger.info(f"Finished backfill on {args.collection}: {datetime.now(pytz.timezone('US/Pacific')).strftime('%Y-%m-%d %H:%M:%S %Z')}")  # pylint: disable=W1203
-    
+    row = update_monthly_counts(result, run['state'])
 
-def fill_monthly_counts(args):
-    global monthly_counts_sheet
+    run['writer'].put(run['row_index'], row)
 
-    collection_list = get_collections()
+    return True
 
-    print(collection_list)
-    print(len(collection_list))
+
+def monthly_counts_header():
 
     header = ['Collection Name']
     header.append('Date')
@@ -320,37 +180,47 @@ def fill_monthly_counts(args):
     header.append('Global BBox')
     header.append('Both FP & BBox')
     header.append('Updated')
+    header.append('Expected')
 
-    rows = [header]
+    return header
 
-    for short_name in collection_list:
 
-        try:
-            info = get_info(short_name, args)
+def fill_monthly_counts(args, logger):
+    global monthly_counts_sheet
 
-            start_time = info['time_start']
-            end_time = info['time_end']
+    collection_list = get_collections()
 
-            dates = gen_date_array(start_time, end_time)
+    print(collection_list)
+    print(len(collection_list))
 
-            print("Collection: " + short_name)
-            print(dates)
-            print()
+    # Temporal extents and per-month CMR hits of every collection, resolved concurrently
+    extents = TemporalResolver(args.edl_token, logger).resolve(collection_list, gen_date_array)
 
-            for date in dates:
-                row = [short_name, date]
-                rows.append(row)
-        except IndexError:
-            print(f"Warning: Could not add collection {short_name}.  No granules maybe...")
+    rows = [monthly_counts_header()]
+
+    for short_name in collection_list:
+
+        if short_name not in extents:
+            continue
+
+        print("Collection: " + short_name)
+        print(list(extents[short_name]['months']))
+        print()
+
+        for date, hits in extents[short_name]['months'].items():
+            row = [short_name, date, "", "", "", "", "", "", "" if hits is None else hits]
+            rows.append(row)
 
     print("Adding new worksheet: " + worksheet_title)
-    monthly_counts_sheet = workbook.add_worksheet(worksheet_title, 1, 8)
+    monthly_counts_sheet = workbook.add_worksheet(worksheet_title, 1, 9)
 
     try:
         update_sheet(monthly_counts_sheet, "A1", rows)
     except RetryError:
         print("Update failed after multiple retries. You may want to handle this error further.")
 
+    return rows
+
 
 def next_month(date_str):
     date_obj = datetime.strptime(date_str, '%Y-%m')
@@ -378,216 +248,254 @@ def next_month(date_str):
 #     return int(granule_count)
 
 
-def build_runs(args, logger):
+def build_runs(args, logger, state, writer, pool):
 
-    all_rows = monthly_counts_sheet.get_all_values()
+    pending = state.pending()
 
-    if not all_rows:
-        logger.warning("No data found in the worksheet.")
+    if not pending:
+        logger.warning("No pending shards in the state store.")
         return
 
     runs = []
-    for index, row in enumerate(all_rows):
-
-        if row[2] != "":
-            continue
-
-        args.collection = row[0]
-        args.cli_execution_id = str(uuid.uuid4())
+    for collection, start_month, row_index, expected in pending:
 
-        start_month = row[1]  # Get the start_month value
-        args.start_date = f"{start_month}-01T00:00:00Z"
         end_month = next_month(start_month)
 
-        args.end_date = f"{end_month}-01T00:00:00Z"
-
 # TODO: Add column for last granule GPoygon or BBox or both.  Is bbox global or small?
-# TODO: Add Expected Granule count and Actual Counted
 # TODO: Add a list of granule IDs that failed to easily look them up
         run = dict(
-            args = copy.deepcopy(args),
+            scan = shard_descriptor(args, collection, start_month, end_month, row_index, str(uuid.uuid4())),
+            pool = pool,
             logger = logger,
-            row_index = index+1,
-            month = start_month
+            state = state,
+            writer = writer,
+            row_index = row_index,
+            collection = collection,
+            month = start_month,
+            expected = expected
             )
         runs.append(run)
 
-    random.shuffle(runs)
-
     return runs
 
 
-def clear_current_month_counts():
+def previous_month_rows(logger):
+    """All rows of last month's Monthly Counts sheet, or an empty list if there is none."""
 
-    all_rows = monthly_counts_sheet.get_all_values()
+    previous_title = "Monthly Counts " + (now - relativedelta(months=1)).strftime("%Y-%m")
 
-    for index, row in enumerate(all_rows):
+    try:
+        return workbook.worksheet(previous_title).get_all_values()
+    except gspread.WorksheetNotFound:
+        logger.warning(f"No {previous_title} worksheet")
+        return []
 
-        if row[1] == current_month:
-            new_row = [row[0], row[1], "", "", "", "", "", ""]
-            update_sheet(monthly_counts_sheet, "A" + str(index + 1), [new_row])
 
+def previous_month_volumes(logger):
+    """Granule counts from last month's Monthly Counts sheet, used to order this month's runs.
 
-def do_count_runs(args, logger):
+    Returns:
+        tuple: Counts keyed by (collection, month), and the count of each collection's latest month
+    """
+    rows = previous_month_rows(logger)
 
-    if new_monthly_count_sheet:
-        logger.info("Filling new worksheet!")
-        fill_monthly_counts(args)
-    else:
-        clear_current_month_counts()
+    volumes = {}
+    latest = {}
 
-    runs = build_runs(args, logger)
+    for row in rows[1:]:
+        if len(row) < 3 or not row[2].isdigit():
+            continue
 
-    retry_count = 3
+        volumes[(row[0], row[1])] = int(row[2])
 
-    while len(runs) > 0:
-        with ThreadPoolExecutor() as executor:
-            executor.map(process_one_collection, runs)
+        if row[0] not in latest or row[1] > latest[row[0]][0]:
+            latest[row[0]] = (row[1], int(row[2]))
 
-        if retry_count == 0:
-            break
-        else:
-            retry_count -= 1
+    return volumes, {collection: count for collection, (_, count) in latest.items()}
 
-        runs = build_runs(args, logger)
 
-        logger.info("Retrying monthly counts...")
+def estimate_volumes(runs, logger):
+    """Fill in the expected granule count of runs without CMR hits, from last month's sheet."""
 
+    unknown = [run for run in runs if run.get('expected') is None]
 
-def do_last_granules_runs(args, logger):
+    if not unknown:
+        return
 
-    last_granules_sheet = workbook.worksheet("Last Granules")
-    
-    collection_list = get_collections()
+    volumes, latest = previous_month_volumes(logger)
 
-    print(collection_list)
-    print(len(collection_list))
+    for run in unknown:
+        run['expected'] = volumes.get((run['collection'], run['month']), latest.get(run['collection'], 0))
 
-    header = ['Collection Name']
-    header.append('Date')
-    header.append('Granules')
-    header.append('Need Image')
-    header.append('Need Footprint')
-    header.append('Both FP & BBox')
-    header.append('Need DMRPP')
-    header.append('Updated')
 
-    rows = [header]
+def clear_current_month_counts(state, logger):
 
-    for short_name in collection_list:
+    # Only once per run, so a re-run attempt keeps the current month shards it already counted
+    if state.get_marker('current_month_cleared') == RUN_ID:
+        logger.info(f"Resuming run {RUN_ID}, {current_month} counts were already cleared")
+        return
 
-        try:
-            args.collection = short_name
-            args.cli_execution_id = str(uuid.uuid4())
+    state.reset_month(current_month)
+    state.set_marker('current_month_cleared', RUN_ID)
 
-      #      start_month = row[1]  # Get the start_month value
-            args.start_date = f"2024-01-01T00:00:00Z"
-       #     end_month = next_month(start_month)
 
-        #    args.end_date = f"{end_month}-01T00:00:00Z"
-            backfiller = create_backfiller(args, logger)
+def reconcile_with_previous_month(state, logger):
+    """Carry last month's counts over for months whose CMR hits are unchanged since last month's sheet.
 
-            backfiller.process_granules()
+    CMR hits count every granule overlapping a month while the counts go by start month, so hits are
+    only compared with earlier hits (the Expected column), never with the counted granules.
+    The current month is always scanned.  Returns the number of shards carried over.
+    """
+    carried = state.carry_over(previous_month_rows(logger), skip_month=current_month)
 
-         #   results = backfiller.monthly_results['2024-03']
+    logger.info(f"Reconciled {carried} months unchanged since last month's sheet")
 
-            last_month = list(backfiller.monthly_results.items())[-1]
+    return carried
 
-         #   print(last_month)
 
-         #   print(last_month[1])
+def reconcile_current_month(state, args, logger):
+    """Rescan only the current month shards whose CMR hits changed since they were last scanned."""
 
+    shards = state.month_shards(current_month)
+    hits = TemporalResolver(args.edl_token, logger).count_months([(collection, current_month) for collection, _, _ in shards])
 
-        #   print(month)
+    changed = 0
 
-      #      exit()       
+    for collection, status, expected in shards:
+        count = hits.get((collection, current_month))
 
-            count_limit = 5
+        if status != 'done' or count is None or count != expected:
+            state.reset_shard(collection, current_month, count)
+            changed += 1
 
-            count = 0
-            for granule in reversed(last_month[1]['granules']):
+    logger.info(f"Reconciled {current_month}: {changed} of {len(shards)} collections changed")
 
-                count += 1
 
-                if count > count_limit:
-                    break
+def publish_monthly_counts(state):
+    """Write every row of the state store to the Monthly Counts sheet in one request."""
 
-                row = [short_name]
-        #      print(granule)
-                meta = granule['meta']
-                umm = granule['umm']
-                print(meta)
-                row.append(umm['TemporalExtent']['RangeDateTime']['BeginningDateTime'])
-                row.append(meta['concept-id'])
+    try:
+        update_sheet(monthly_counts_sheet, "A1", [monthly_counts_header()] + state.rows())
+    except RetryError:
+        print("Update failed after multiple retries. You may want to handle this error further.")
 
-                for url in umm['RelatedUrls']:
-                    if 'MimeType' in url and url['MimeType'] == 'image/png':
-                        image_url = url["URL"]
-                    #    match = re.search(r'\.([^\.]+)\.png$', image_url)
 
-                    #    print(image_url)
-                    #    var_name = 'Link'
-                    #    if match:
-                    #        var_name = match.group(1)
+def do_count_runs(args, logger):
 
-                    #    hyperlink_formula = f'=HYPERLINK("{url["URL"]}", "{var_name}")'
-                        image_formula = f'=IMAGE("{image_url}", 1)'
-                        row.append(image_formula)
-                        
-             #           last_granules_sheet.update_acell("B2", hyperlink_formula)
-             #   row.append(umm['SpatialExtent']['HorizontalSpatialDomain']['Geometry']['GPolygons'])
+    state = ShardStateStore(worksheet_title)
 
-                rows.append(row)
-            break
+    if new_monthly_count_sheet:
+        logger.info("Filling new worksheet!")
+        state.seed(fill_monthly_counts(args, logger))
+        state.set_marker('current_month_cleared', RUN_ID)
 
-        except IndexError:
-            print(f"Warning: Could not add collection {short_name}.  No granules maybe...")
+        if RECONCILE:
+            reconcile_with_previous_month(state, logger)
+    else:
+        if not state.is_seeded():
+            logger.info(f"Loading shard state from {worksheet_title}")
+            state.seed(monthly_counts_sheet.get_all_values())
+
+        if RECONCILE:
+            reconcile_current_month(state, args, logger)
+        else:
+            clear_current_month_counts(state, logger)
+
+    logger.info(f"Shard state: {state.summary()}")
+
+    # Forked before any other thread starts, see scan_pool
+    pool = scan_pool()
+    workers = DEFAULT_SCAN_PROCESSES if pool is not None else DEFAULT_MAX_WORKERS
 
+    # Completed rows are published as they come in, the full sheet is rewritten at the end
     try:
+        with SheetBatchWriter(monthly_counts_sheet, logger) as writer:
+            runs = build_runs(args, logger, state, writer, pool) or []
 
-        print('update last granules sheet')
+            estimate_volumes(runs, logger)
 
-        last_granules_sheet.update(rows, value_input_option='USER_ENTERED')
-  #      update_sheet(last_granules_sheet, "A1", rows)
-        print('done update last granules sheet')
-    except RetryError:
-        print("Update failed after multiple retries. You may want to handle this error further.")
+            failed = ShardScheduler(process_one_collection, logger, max_workers=workers).run(runs)
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
+    for run in failed:
+        logger.error(f"Monthly count failed for {run['collection']} {run['month']}")
 
-def bearer_token(env, logger):
-    tokens = []
-    headers: dict = {'Accept': 'application/json'}
-    url: str = f"https://{'uat.' if env == 'uat' else ''}urs.earthdata.nasa.gov/api/users"
+    publish_monthly_counts(state)
 
-    # First just try to get a token that already exists
-    try:
-        resp = requests.get(url + "/tokens", headers=headers,
-                                   auth=requests.auth.HTTPBasicAuth(os.environ['CMR_USER'], os.environ['CMR_PASS']))
-        response_content = json.loads(resp.content)
+    logger.info(f"Shard state: {state.summary()}")
+
+
+def last_granule_row(short_name, granule):
+
+    umm = granule['umm']
+
+    row = [short_name]
+    row.append(umm['TemporalExtent']['RangeDateTime']['BeginningDateTime'])
+    row.append(granule['meta']['concept-id'])
+
+    for url in umm.get('RelatedUrls', []):
+        if url.get('MimeType') == 'image/png':
+            row.append(f'=IMAGE("{url["URL"]}", 1)')
+
+    return row
+
+
+def pad_rows(rows, height, width):
+    """Rows padded with blanks to a height x width block, so one update also clears stale cells."""
+
+    rows = [row + [""] * (width - len(row)) for row in rows]
+
+    return rows + [[""] * width for _ in range(height - len(rows))]
+
+
+def do_last_granules_runs(args, logger):
+    """Refresh the Last Granules sheet with the newest LAST_GRANULES granules of every collection.
+
+    The granules come straight from CMR, one search per collection run concurrently, and the
+    sheet is written in one update.
+    """
+    last_granules_sheet = workbook.worksheet("Last Granules")
+
+    collection_list = get_collections()
 
-        for x in response_content:
-            tokens.append(x['access_token'])
+    logger.info(f"Last {LAST_GRANULES} granules of {len(collection_list)} collections")
 
-    except Exception as ex:  # noqa E722
-        logger.error(ex)
-        logger.error("Error getting the token - check user name and password")
+    header = ['Collection Name']
+    header.append('Date')
+    header.append('Granule')
+    header.append('Images')
 
-    # No tokens exist, try to create one
-    if not tokens:
-        try:
-            resp = requests.post(url + "/token", headers=headers,
-                                        auth=requests.auth.HTTPBasicAuth(os.environ['CMR_USER'], os.environ['CMR_PASS']))
-            response_content: dict = json.loads(resp.content)
-            tokens.append(response_content['access_token'])
-        except Exception as ex:  # noqa E722
-            logger.error(ex)
-            logger.error("Error getting the token - check user name and password")
+    rows = [header]
 
-    # If still no token, then we can't do anything
-    if not tokens:
-        return None
+    last_granules = TemporalResolver(args.edl_token, logger).resolve_last_granules(collection_list, LAST_GRANULES)
 
-    return next(iter(tokens))
+    for short_name in collection_list:
+        granules = last_granules.get(short_name)
+
+        if not granules:
+            print(f"Warning: Could not add collection {short_name}.  No granules maybe...")
+            continue
+
+        for granule in granules:
+            rows.append(last_granule_row(short_name, granule))
+
+    height = max(len(rows), last_granules_sheet.row_count)
+    width = max(max(map(len, rows)), last_granules_sheet.col_count)
+
+    if height > last_granules_sheet.row_count or width > last_granules_sheet.col_count:
+        last_granules_sheet.resize(rows=height, cols=width)
+
+    try:
+
+        print('update last granules sheet')
+
+        update_sheet(last_granules_sheet, "A1", pad_rows(rows, height, width), value_input_option='USER_ENTERED')
+
+        print('done update last granules sheet')
+    except RetryError:
+        print("Update failed after multiple retries. You may want to handle this error further.")
 
 
 def main(args=None):
@@ -600,14 +508,19 @@ def main(args=None):
     logger.info(f"Started backfill: "                                 # pylint: disable=W1203
                 f"{datetime.now(pytz.timezone('US/Pacific')).strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
-    args.edl_token = bearer_token(args.cmr, logger)
+    args.edl_token = bearer_token(args.cmr, logger, cmr_session)
 
     if not args.edl_token:
         logger.error("Could not get bearer token")
         exit(1)
 
-    do_count_runs(args, logger)
-  #  do_last_granules_runs(args, logger)
+    if MODE in ('counts', 'all'):
+        do_count_runs(args, logger)
+
+    if MODE in ('last_granules', 'all'):
+        do_last_granules_runs(args, logger)
+
+    log_connection_stats(logger)
 
     logger.info(f"Finished all collections: "                                 # pylint: disable=W1203
                 f"{datetime.now(pytz.timezone('US/Pacific')).strftime('%Y-%m-%d %H:%M:%S %Z')}")
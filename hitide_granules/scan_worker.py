@@ -0,0 +1,140 @@
+import copy
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pytz
+
+from podaac.hitide_backfill_tool.cli import (granule_options_from_args, granule_search_from_args,
+                                            message_writer_from_args, safe_log_args)
+from podaac.hitide_backfill_tool.s3_reader import S3Reader
+
+from granule_stats import StreamingBackfiller
+
+# Processes running Backfiller scans, 0 scans on the scheduler threads instead
+DEFAULT_SCAN_PROCESSES = int(os.environ.get('HITIDE_GRANULES_PROCESSES', os.cpu_count() or 1))
+
+# Logger configured by logger_from_args, forked workers inherit its handlers
+LOGGER_NAME = "backfill"
+
+
+def create_backfiller(args, logger):
+
+    search = granule_search_from_args(args, logger)
+    message_writer = message_writer_from_args(args, logger)
+
+    s3 = S3Reader(logger, args.aws_profile)    # pylint: disable=C0103
+    collection = args.collection
+    # setup backfiller
+
+#    args.footprint = 'on'
+#    args.image = 'on'
+
+    # Check forge configurations before running backfill
+#    forge_tig_config = get_collection_config(collection)
+
+#    if forge_tig_config is None:
+#        logger.warning("No configuration for collection " + collection + " found.")
+#    else:
+#        if forge_tig_config.get('footprint'):
+#            args.footprint = 'on'
+#        imgVariables = forge_tig_config.get('imgVariables')
+#        if imgVariables is not None and len(imgVariables) > 0:
+#            args.image = 'on'
+
+    safe_log_args(logger, args)
+
+    granule_options = granule_options_from_args(args)
+
+    backfiller = StreamingBackfiller(search, message_writer, [],
+                                     granule_options, logger, args.message_limit, args.cli_execution_id, s3, collection, None)
+
+    return backfiller
+
+
+def shard_descriptor(args, collection, month, end_month, row_index, cli_execution_id):
+    """Picklable description of one (collection, month) scan.
+
+    Holds its own copy of the parsed cli args narrowed to the shard, and nothing live (no logger,
+    state store or sheet), so it can be sent to a worker process.
+    """
+    shard_args = copy.copy(args)
+    shard_args.collection = collection
+    shard_args.cli_execution_id = cli_execution_id
+    shard_args.start_date = f"{month}-01T00:00:00Z"
+    shard_args.end_date = f"{end_month}-01T00:00:00Z"
+
+    return dict(args=shard_args, collection=collection, month=month, row_index=row_index)
+
+
+def month_counts(backfiller, month):
+    """Granules, no image, no footprint, global bbox and both footprint & bbox counts of a month."""
+
+    if month not in backfiller.monthly_results:
+        print("Month not found in backfiller.  Assuming no granules for this month.")
+        return [0, 0, 0, 0, 0]
+
+    result = backfiller.monthly_results[month]
+
+    return [len(result['granules']), result['needs_image'], result['needs_footprint'],
+            result['granules'].global_bbox, result['both_footprint_and_bbox']]
+
+
+def scan_shard(descriptor, logger=None):
+    """Run the Backfiller over one shard and return its counts.
+
+    Args:
+        descriptor (dict): Shard from shard_descriptor
+        logger: Logger instance for logging, the inherited backfill logger if None
+
+    Returns:
+        dict: collection, month, row_index, counts (None if the scan failed) and updated
+    """
+    args = descriptor['args']
+    logger = logger or logging.getLogger(LOGGER_NAME)
+
+    backfiller = None
+    counts = None
+
+    # run backfiller
+    try:
+        logger.info("Running backfiller on collection " + args.collection)
+
+        backfiller = create_backfiller(args, logger)
+
+        backfiller.process_granules()
+
+        counts = month_counts(backfiller, descriptor['month'])
+
+    except Exception as exc:
+        logger.error(f"big error: {exc}")
+    except:  # noqa: E722 - to catch ctrl-C
+        logger.warning("keyboard interrupt")
+
+    if backfiller is not None:
+        backfiller.log_stats()
+
+    now = datetime.now(pytz.timezone('US/Pacific'))
+
+    logger.info(f"Finished backfill on {args.collection}: {now.strftime('%Y-%m-%d %H:%M:%S %Z')}")  # pylint: disable=W1203
+
+    return dict(collection=descriptor['collection'], month=descriptor['month'], row_index=descriptor['row_index'],
+                counts=counts, updated=now.strftime("%m/%d/%Y %H:%M:%S"))
+
+
+def scan_pool(processes: int = DEFAULT_SCAN_PROCESSES):
+    """Process pool for scan_shard, or None when processes is 0.
+
+    Workers are forked rather than spawned, so they do not re-run the sheet setup at the top of
+    hitide_granules.py.  With fork every worker starts on the first submit, which is done here,
+    before the sheet writer and scheduler threads exist.
+    """
+    if processes <= 0:
+        return None
+
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('fork'))
+    pool.submit(os.getpid).result()
+
+    return pool
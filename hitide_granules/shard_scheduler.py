@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import os
+import threading
+
+
+# Number of shards processed at the same time
+DEFAULT_MAX_WORKERS = int(os.environ.get('HITIDE_GRANULES_WORKERS', min(32, (os.cpu_count() or 1) + 4)))
+
+# Max shards of the same collection processed at the same time, so one large collection
+# cannot hold every CMR slot
+DEFAULT_PER_COLLECTION = int(os.environ.get('HITIDE_GRANULES_PER_COLLECTION', 4))
+
+# Attempts per shard, the first run included
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get('HITIDE_GRANULES_ATTEMPTS', 4))
+
+
+class ShardScheduler:
+    """Run (collection, month) shards from a priority queue, largest expected volume first.
+
+    Every worker thread takes the biggest pending shard whose collection is under its concurrency
+    cap, so idle workers keep pulling work until the queue is drained.  A shard whose worker
+    returns False or raises is put back on the queue until it runs out of attempts.
+    """
+
+    def __init__(self, worker, logger, max_workers: int = DEFAULT_MAX_WORKERS,
+                 per_collection: int = DEFAULT_PER_COLLECTION, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """Initialize ShardScheduler.
+
+        Args:
+            worker: Function called with a shard dict, returns True on success
+            logger: Logger instance for logging
+            max_workers: Number of worker threads
+            per_collection: Max shards of one collection running at the same time
+            max_attempts: Times a shard is tried before it is reported as failed
+        """
+        self.worker = worker
+        self.logger = logger
+        self.max_workers = max(1, max_workers)
+        self.per_collection = max(1, per_collection)
+        self.max_attempts = max(1, max_attempts)
+
+        self._heap = []
+        self._order = itertools.count()
+        self._running = {}
+        self._active = 0
+        self._failed = []
+        self._condition = threading.Condition()
+
+
+    def _push(self, shard):
+
+        heapq.heappush(self._heap, (-shard.get('expected', 0), next(self._order), shard))
+
+
+    def _take(self):
+        """Pop the largest shard whose collection has a free slot, or None if all are capped."""
+
+        skipped = []
+        shard = None
+
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if self._running.get(entry[2]['collection'], 0) < self.per_collection:
+                shard = entry[2]
+                break
+            skipped.append(entry)
+
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+
+        return shard
+
+
+    def _work(self):
+
+        while True:
+            with self._condition:
+                while True:
+                    shard = self._take()
+                    if shard is not None:
+                        break
+                    if not self._heap and self._active == 0:
+                        return
+                    self._condition.wait()
+
+                collection = shard['collection']
+                self._running[collection] = self._running.get(collection, 0) + 1
+                self._active += 1
+
+            try:
+                succeeded = bool(self.worker(shard))
+            except Exception as exc:  # noqa: E722
+                self.logger.error(f"Shard {collection} {shard.get('month')} failed: {exc}")
+                succeeded = False
+
+            with self._condition:
+                self._running[collection] -= 1
+                self._active -= 1
+
+                if not succeeded:
+                    if shard.get('attempts', 1) < self.max_attempts:
+                        shard['attempts'] = shard.get('attempts', 1) + 1
+                        self.logger.info(f"Retrying {collection} {shard.get('month')} (attempt {shard['attempts']})")
+                        self._push(shard)
+                    else:
+                        self._failed.append(shard)
+
+                self._condition.notify_all()
+
+
+    def run(self, shards):
+        """Process every shard and return the ones that still failed after all attempts."""
+
+        with self._condition:
+            for shard in shards:
+                self._push(shard)
+
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(min(self.max_workers, len(shards)))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return self._failed
@@ -0,0 +1,217 @@
+import os
+import sqlite3
+import threading
+
+DEFAULT_STATE_FILE = os.environ.get('HITIDE_GRANULES_STATE', ".monthly_counts_state.sqlite")
+
+# Count columns of a Monthly Counts row, after Collection Name and Date
+COUNT_COLUMNS = ('granules', 'no_image', 'no_footprint', 'global_bbox', 'both_fp_bbox')
+
+
+def parse_count(value):
+
+    if isinstance(value, int):
+        return value
+
+    return int(value) if isinstance(value, str) and value.isdigit() else None
+
+
+class ShardStateStore:
+    """SQLite record of the (collection, month) shards of a Monthly Counts worksheet.
+
+    Holds each shard's sheet row, status ('pending', 'done' or 'failed'), counts and update time,
+    so a run picks up where the last one stopped without reading the sheet, and the sheet is
+    written from here in bulk.
+    """
+
+    def __init__(self, sheet: str, path: str = DEFAULT_STATE_FILE):
+        """Initialize ShardStateStore.
+
+        Args:
+            sheet: Title of the Monthly Counts worksheet the shards belong to
+            path: Path to the SQLite state file
+        """
+        self.sheet: str = sheet
+        self.path: str = path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS shards (
+                    sheet TEXT NOT NULL,
+                    collection TEXT NOT NULL,
+                    month TEXT NOT NULL,
+                    row_index INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    granules INTEGER,
+                    no_image INTEGER,
+                    no_footprint INTEGER,
+                    global_bbox INTEGER,
+                    both_fp_bbox INTEGER,
+                    updated TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    expected INTEGER,
+                    PRIMARY KEY (sheet, collection, month)
+                )
+            """)
+
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS markers (
+                    sheet TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    value TEXT,
+                    PRIMARY KEY (sheet, name)
+                )
+            """)
+
+
+    def is_seeded(self) -> bool:
+
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM shards WHERE sheet = ? LIMIT 1", (self.sheet,)).fetchone()
+
+        return row is not None
+
+
+    def seed(self, rows):
+        """Load the shards from Monthly Counts rows, header first, as read from or written to the sheet."""
+
+        shards = []
+
+        for index, row in enumerate(rows[1:], start=2):
+            row = list(row) + [""] * (9 - len(row))
+            counts = [parse_count(value) for value in row[2:7]]
+            status = 'done' if row[2] != "" else 'pending'
+            shards.append((self.sheet, row[0], row[1], index, status, *counts, row[7] or None, parse_count(row[8])))
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM shards WHERE sheet = ?", (self.sheet,))
+            self._conn.executemany(
+                "INSERT INTO shards (sheet, collection, month, row_index, status, granules, no_image, no_footprint, "
+                "global_bbox, both_fp_bbox, updated, expected) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", shards)
+
+
+    def pending(self):
+        """Shards that are not done yet, as (collection, month, row_index, expected) tuples in sheet order."""
+
+        with self._lock:
+            return self._conn.execute(
+                "SELECT collection, month, row_index, expected FROM shards WHERE sheet = ? AND status != 'done' ORDER BY row_index",
+                (self.sheet,)).fetchall()
+
+
+    def complete(self, collection, month, counts, updated):
+        """Record the counts of a finished shard, in COUNT_COLUMNS order."""
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE shards SET status = 'done', granules = ?, no_image = ?, no_footprint = ?, global_bbox = ?, "
+                "both_fp_bbox = ?, updated = ?, attempts = attempts + 1 WHERE sheet = ? AND collection = ? AND month = ?",
+                (*counts, updated, self.sheet, collection, month))
+
+
+    def carry_over(self, previous_rows, skip_month=None):
+        """Mark pending shards done with the counts of an earlier sheet's row, where that row is still valid.
+
+        A row is carried over when its Expected hits equal the shard's and all its counts are filled
+        in; a shard whose scan failed on the earlier sheet has blank counts and stays pending.
+
+        Args:
+            previous_rows: Monthly Counts rows of the earlier sheet, header first
+            skip_month: Month that is always scanned, e.g. the current one
+
+        Returns:
+            int: Number of shards carried over
+        """
+        previous = {(row[0], row[1]): row for row in previous_rows[1:] if len(row) >= 9}
+
+        carried = 0
+
+        for collection, month, _, expected in self.pending():
+            row = previous.get((collection, month))
+
+            if month == skip_month or row is None or expected is None or parse_count(row[8]) != expected:
+                continue
+
+            counts = [parse_count(value) for value in row[2:7]]
+            if None in counts:
+                continue
+
+            self.complete(collection, month, counts, row[7])
+            carried += 1
+
+        return carried
+
+
+    def fail(self, collection, month):
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE shards SET status = 'failed', attempts = attempts + 1 WHERE sheet = ? AND collection = ? AND month = ?",
+                (self.sheet, collection, month))
+
+
+    def reset_month(self, month):
+        """Mark every shard of month pending again and clear its counts."""
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE shards SET status = 'pending', granules = NULL, no_image = NULL, no_footprint = NULL, "
+                "global_bbox = NULL, both_fp_bbox = NULL, updated = NULL WHERE sheet = ? AND month = ?",
+                (self.sheet, month))
+
+
+    def month_shards(self, month):
+        """(collection, status, expected) of every shard of month, expected being the CMR hits it was scanned for."""
+
+        with self._lock:
+            return self._conn.execute(
+                "SELECT collection, status, expected FROM shards WHERE sheet = ? AND month = ?", (self.sheet, month)).fetchall()
+
+
+    def reset_shard(self, collection, month, expected=None):
+        """Mark one shard pending again, clear its counts and record its new expected count."""
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE shards SET status = 'pending', granules = NULL, no_image = NULL, no_footprint = NULL, "
+                "global_bbox = NULL, both_fp_bbox = NULL, updated = NULL, expected = COALESCE(?, expected) "
+                "WHERE sheet = ? AND collection = ? AND month = ?",
+                (expected, self.sheet, collection, month))
+
+
+    def get_marker(self, name):
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM markers WHERE sheet = ? AND name = ?", (self.sheet, name)).fetchone()
+
+        return row[0] if row else None
+
+
+    def set_marker(self, name, value):
+
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO markers VALUES (?, ?, ?)", (self.sheet, name, value))
+
+
+    def rows(self):
+        """Monthly Counts rows (without the header) in sheet order, with blanks for missing counts."""
+
+        with self._lock:
+            shards = self._conn.execute(
+                "SELECT collection, month, granules, no_image, no_footprint, global_bbox, both_fp_bbox, updated, expected "
+                "FROM shards WHERE sheet = ? ORDER BY row_index", (self.sheet,)).fetchall()
+
+        return [["" if value is None else value for value in shard] for shard in shards]
+
+
+    def summary(self) -> str:
+
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM shards WHERE sheet = ? GROUP BY status", (self.sheet,)).fetchall())
+
+        return ", ".join(f"{counts.get(status, 0)} {status}" for status in ('done', 'pending', 'failed'))
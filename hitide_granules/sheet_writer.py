@@ -0,0 +1,143 @@
+import os
+import queue
+import threading
+import time
+
+import gspread
+
+# Flush completed rows once this many are waiting ...
+DEFAULT_FLUSH_ROWS = int(os.environ.get('HITIDE_GRANULES_FLUSH_ROWS', 100))
+
+# ... or once the oldest waiting row is this many seconds old
+DEFAULT_FLUSH_SECONDS = float(os.environ.get('HITIDE_GRANULES_FLUSH_SECONDS', 30))
+
+# Sheets allows 60 write requests per minute per user, stay well under it
+MIN_FLUSH_INTERVAL_SECONDS = 2.0
+
+# Retries of a failed flush, with exponential backoff capped at 64s
+MAX_FLUSH_RETRIES = 6
+
+_CLOSE = object()
+
+
+class SheetBatchWriter:
+    """Write completed worksheet rows from a background thread, batched into one batch_update.
+
+    put() only queues the row, so workers never wait on the Sheets API.  Rows are flushed every
+    flush_rows rows or flush_seconds seconds, no more often than MIN_FLUSH_INTERVAL_SECONDS, and
+    a flush that hits a quota or server error is retried with backoff.
+    """
+
+    def __init__(self, worksheet, logger, flush_rows: int = DEFAULT_FLUSH_ROWS,
+                 flush_seconds: float = DEFAULT_FLUSH_SECONDS):
+        """Initialize SheetBatchWriter.
+
+        Args:
+            worksheet: gspread Worksheet to write to
+            logger: Logger instance for logging
+            flush_rows: Number of waiting rows that triggers a flush
+            flush_seconds: Max age in seconds of a waiting row before it is flushed
+        """
+        self.worksheet = worksheet
+        self.logger = logger
+        self.flush_rows = max(1, flush_rows)
+        self.flush_seconds = flush_seconds
+
+        self.rows_written = 0
+        self.requests = 0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._last_flush = 0.0
+
+
+    def __enter__(self):
+
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc):
+
+        self.close()
+
+
+    def start(self):
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def put(self, row_index, row):
+        """Queue row to be written at 1-based sheet row row_index."""
+
+        self._queue.put((row_index, row))
+
+
+    def close(self):
+        """Flush everything still waiting and stop the writer thread."""
+
+        if self._thread is not None:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            self._thread = None
+
+        self.logger.info(f"Sheet writer: {self.rows_written} rows in {self.requests} requests")
+
+
+    def _run(self):
+
+        pending = {}
+        oldest = None
+
+        while True:
+            timeout = None if oldest is None else max(0.0, oldest + self.flush_seconds - time.monotonic())
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not _CLOSE:
+                # A later row for the same sheet row replaces the earlier one
+                pending[item[0]] = item[1]
+                oldest = oldest or time.monotonic()
+
+            due = oldest is not None and time.monotonic() - oldest >= self.flush_seconds
+
+            if pending and (item is _CLOSE or due or len(pending) >= self.flush_rows):
+                self._flush(pending)
+                pending = {}
+                oldest = None
+
+            if item is _CLOSE:
+                return
+
+
+    def _flush(self, pending):
+
+        data = [{'range': f"A{row_index}", 'values': [row]} for row_index, row in sorted(pending.items())]
+
+        for attempt in range(MAX_FLUSH_RETRIES + 1):
+            wait = self._last_flush + MIN_FLUSH_INTERVAL_SECONDS - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                self._last_flush = time.monotonic()
+                self.requests += 1
+                self.worksheet.batch_update(data, value_input_option='RAW')
+                self.rows_written += len(data)
+                return
+            except Exception as exc:  # noqa: E722
+                # Quota and server errors are retried, so are connection errors
+                status = getattr(getattr(exc, 'response', None), 'status_code', None)
+                retryable = not isinstance(exc, gspread.exceptions.APIError) or status == 429 or (status or 0) >= 500
+
+                if not retryable or attempt == MAX_FLUSH_RETRIES:
+                    self.logger.error(f"Could not write {len(data)} rows to {self.worksheet.title}: {exc}")
+                    return
+
+                backoff = min(64, 2 ** attempt)
+                self.logger.warning(f"Sheets write failed ({status or exc}), retrying in {backoff}s")
+                time.sleep(backoff)
@@ -0,0 +1,179 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cmr
+import pytz
+from dateutil.relativedelta import relativedelta
+
+from cmr_session import cmr_session, log_connection_stats
+
+# Number of CMR granule searches in flight at the same time
+DEFAULT_CMR_WORKERS = int(os.environ.get('HITIDE_GRANULES_CMR_WORKERS', 16))
+
+GRANULE_SEARCH_URL = cmr.queries.CMR_OPS + "granules.json"
+GRANULE_UMM_SEARCH_URL = cmr.queries.CMR_OPS + "granules.umm_json"
+
+
+def month_range(month):
+    """CMR temporal range covering a YYYY-MM month."""
+
+    start = datetime.strptime(month, "%Y-%m")
+    end = start + relativedelta(months=1)
+
+    return f"{start:%Y-%m-%dT%H:%M:%SZ},{end:%Y-%m-%dT%H:%M:%SZ}"
+
+
+class TemporalResolver:
+    """Resolve the temporal extent and per-month granule hits of many collections concurrently.
+
+    The first/last granule searches of every collection, then the page_size=0 hit count searches
+    of every (collection, month), all go through one thread pool and one pooled session.
+    """
+
+    def __init__(self, edl_token, logger, max_workers: int = DEFAULT_CMR_WORKERS, provider: str = 'POCLOUD',
+                 session=None):
+        """Initialize TemporalResolver.
+
+        Args:
+            edl_token: EDL bearer token
+            logger: Logger instance for logging
+            max_workers: Number of concurrent CMR searches
+            provider: CMR provider of the collections
+            session: requests Session to search with, defaults to the shared cmr_session whose
+                     CMR_POOL_SIZE connections should cover max_workers
+        """
+        self.logger = logger
+        self.max_workers = max_workers
+        self.provider = provider
+
+        self.session = cmr_session if session is None else session
+        self.headers = {"Authorization": f"Bearer {edl_token}"}
+
+
+    def search(self, short_name, url=GRANULE_SEARCH_URL, **params):
+
+        response = self.session.get(url, headers=self.headers, params={
+            'provider': self.provider, 'short_name': short_name, **params})
+        response.raise_for_status()
+
+        return response
+
+
+    def bounds(self, short_name):
+        """Start of the first granule and end of the last granule of a collection.
+
+        Raises:
+            IndexError: The collection has no granules
+        """
+        first_granule = self.search(short_name, page_size=1, sort_key='start_date').json()['feed']['entry']
+        last_granule = self.search(short_name, page_size=1, sort_key='-start_date').json()['feed']['entry']
+
+        time_start = first_granule[0].get("time_start")
+        time_end = last_granule[0].get("time_end")
+
+        if time_end is None:
+            self.logger.warning(f"time_end not found for {short_name}.  This should never happen!")
+            time_end = datetime.now(pytz.timezone('US/Pacific')).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        return dict(time_start=time_start, time_end=time_end)
+
+
+    def month_hits(self, short_name, month):
+        """Number of granules of a collection in a YYYY-MM month, from the CMR-Hits header."""
+
+        return int(self.search(short_name, page_size=0, temporal=month_range(month)).headers['CMR-Hits'])
+
+
+    def last_granules(self, short_name, count):
+        """UMM records of the newest count granules of a collection, newest first."""
+
+        return self.search(short_name, url=GRANULE_UMM_SEARCH_URL, page_size=count, sort_key='-start_date').json()['items']
+
+
+    def _safe_bounds(self, short_name):
+
+        try:
+            return self.bounds(short_name)
+        except IndexError:
+            self.logger.warning(f"Could not add collection {short_name}.  No granules maybe...")
+        except Exception as exc:  # noqa: E722
+            self.logger.error(f"Could not get temporal extent of {short_name}: {exc}")
+
+        return None
+
+
+    def _safe_hits(self, job):
+
+        short_name, month = job
+
+        try:
+            return self.month_hits(short_name, month)
+        except Exception as exc:  # noqa: E722
+            self.logger.warning(f"Could not count {short_name} granules in {month}: {exc}")
+            return None
+
+
+    def count_months(self, jobs, executor=None):
+        """CMR hits of every (short_name, month) in jobs, None where the search failed."""
+
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return self.count_months(jobs, executor)
+
+        return dict(zip(jobs, executor.map(self._safe_hits, jobs)))
+
+
+    def resolve_last_granules(self, short_names, count):
+        """Newest count granules of every collection, searched concurrently.
+
+        Returns:
+            dict: UMM records, newest first, keyed by short name.  Collections whose search
+                  failed are left out.
+        """
+
+        def safe_last_granules(short_name):
+
+            try:
+                return self.last_granules(short_name, count)
+            except Exception as exc:  # noqa: E722
+                self.logger.warning(f"Could not get last granules of {short_name}: {exc}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = dict(zip(short_names, executor.map(safe_last_granules, short_names)))
+
+        log_connection_stats(self.logger, self.session)
+
+        return {short_name: granules for short_name, granules in results.items() if granules is not None}
+
+
+    def resolve(self, short_names, date_array, histogram: bool = True):
+        """Temporal extent and months of every collection, with the granule hits of each month.
+
+        Args:
+            short_names: Collection short names
+            date_array: Function returning the YYYY-MM months between a start and end time
+            histogram: Also count the granules of every month
+
+        Returns:
+            dict: {'time_start', 'time_end', 'months': {month: hits or None}} keyed by short name.
+                  Collections without granules are left out.
+        """
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for short_name, bounds in zip(short_names, executor.map(self._safe_bounds, short_names)):
+                if bounds is not None:
+                    months = date_array(bounds['time_start'], bounds['time_end'])
+                    results[short_name] = dict(bounds, months=dict.fromkeys(months))
+
+            if histogram:
+                jobs = [(short_name, month) for short_name, result in results.items() for month in result['months']]
+
+                for (short_name, month), hits in self.count_months(jobs, executor).items():
+                    results[short_name]['months'][month] = hits
+
+        log_connection_stats(self.logger, self.session)
+
+        return results
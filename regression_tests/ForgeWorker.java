@@ -0,0 +1,94 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+
+/**
+ * Long-lived Forge worker for run_forge_regression.py.
+ *
+ * Reads one job per line from stdin, "input_file TAB config_file", runs FootprintCLI.main on it in
+ * this JVM and answers on stdout with a "status stdout_bytes stderr_bytes" line followed by the
+ * captured stdout and stderr of the run.  System.exit calls from FootprintCLI are trapped and
+ * reported as the job status, so the JVM and its loaded classes are reused for every granule.
+ * If they cannot be trapped the worker exits with NO_EXIT_TRAP before reading any job, since the
+ * first job that exits would otherwise end it mid-run.
+ */
+public class ForgeWorker {
+
+    static final int NO_EXIT_TRAP = 3;
+
+    static class ExitTrapped extends SecurityException {
+
+        final int status;
+
+        ExitTrapped(int status) {
+            super("System.exit(" + status + ")");
+            this.status = status;
+        }
+    }
+
+    public static void main(String[] args) throws IOException {
+
+        // Replies go straight to fd 1, anything else printed between jobs goes to stderr
+        OutputStream replies = new FileOutputStream(FileDescriptor.out);
+        PrintStream idle = System.err;
+        System.setOut(idle);
+
+        try {
+            System.setSecurityManager(new SecurityManager() {
+                @Override
+                public void checkPermission(Permission perm) {
+                }
+
+                @Override
+                public void checkExit(int status) {
+                    throw new ExitTrapped(status);
+                }
+            });
+        } catch (UnsupportedOperationException | SecurityException e) {
+            idle.println("ForgeWorker: cannot trap System.exit, run with -Djava.security.manager=allow: " + e);
+            System.exit(NO_EXIT_TRAP);
+        }
+
+        BufferedReader jobs = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String line;
+
+        while ((line = jobs.readLine()) != null) {
+            String[] job = line.split("\t");
+
+            ByteArrayOutputStream jobOut = new ByteArrayOutputStream();
+            ByteArrayOutputStream jobErr = new ByteArrayOutputStream();
+            System.setOut(new PrintStream(jobOut, true, "UTF-8"));
+            System.setErr(new PrintStream(jobErr, true, "UTF-8"));
+
+            int status = 0;
+            try {
+                FootprintCLI.main(job);
+            } catch (ExitTrapped e) {
+                status = e.status;
+            } catch (Throwable t) {
+                t.printStackTrace();
+                status = 1;
+            } finally {
+                System.out.flush();
+                System.err.flush();
+                System.setOut(idle);
+                System.setErr(idle);
+            }
+
+            byte[] out = jobOut.toByteArray();
+            byte[] err = jobErr.toByteArray();
+
+            replies.write((status + " " + out.length + " " + err.length + "\n").getBytes(StandardCharsets.UTF_8));
+            replies.write(out);
+            replies.write(err);
+            replies.flush();
+        }
+    }
+}
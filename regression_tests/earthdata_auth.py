@@ -0,0 +1,254 @@
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+# On-disk token cache shared by every tool run by the same user, override with EDL_TOKEN_CACHE.
+# Set EDL_TOKEN_CACHE to an empty string to disable caching.
+DEFAULT_TOKEN_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "tva-automation-tools", "edl_tokens.json")
+
+# Cached tokens are not handed out when they expire within this many seconds
+EXPIRY_MARGIN_SECONDS = 6 * 3600
+
+# Used when URS does not say when a token expires
+FALLBACK_TTL_SECONDS = 24 * 3600
+
+
+def urs_base_url(env):
+
+    return f"https://{'uat.' if env == 'uat' else ''}urs.earthdata.nasa.gov"
+
+
+def token_expiry(entry):
+    """Expiry time of a URS token entry as a unix timestamp.
+
+    Uses the expiration_date URS returns with the token (m/d/Y), then the exp claim of the JWT,
+    then FALLBACK_TTL_SECONDS from now.
+    """
+    expiration_date = entry.get('expiration_date')
+
+    if expiration_date:
+        try:
+            return datetime.strptime(expiration_date, "%m/%d/%Y").replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            pass
+
+    try:
+        payload = entry['access_token'].split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (KeyError, IndexError, ValueError, TypeError):
+        pass
+
+    return time.time() + FALLBACK_TTL_SECONDS
+
+
+class TokenCache:
+    """JSON file of EDL tokens keyed by URS host + user, with their expiry times.
+
+    Reads and writes go through a lock and the file is replaced atomically, so the OPS and UAT
+    threads of one tool and back-to-back tool runs can share it safely.
+    """
+
+    def __init__(self, path: str = None):
+        """Initialize TokenCache.
+
+        Args:
+            path: Path to the cache file, defaults to EDL_TOKEN_CACHE or DEFAULT_TOKEN_CACHE.
+                  An empty path disables the cache.
+        """
+        self.path: str = os.environ.get('EDL_TOKEN_CACHE', DEFAULT_TOKEN_CACHE) if path is None else path
+        self._lock = threading.Lock()
+
+
+    def _load(self):
+
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+    def _save(self, tokens):
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".edl_tokens.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(tokens, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+    def get(self, key):
+        """Return the cached token for key, or None if there is none or it is about to expire."""
+
+        if not self.path:
+            return None
+
+        with self._lock:
+            entry = self._load().get(key)
+
+        if entry is None or entry['expires_at'] - time.time() < EXPIRY_MARGIN_SECONDS:
+            return None
+
+        return entry['access_token']
+
+
+    def put(self, key, access_token, expires_at):
+
+        if not self.path:
+            return
+
+        with self._lock:
+            tokens = self._load()
+            now = time.time()
+
+            # Drop anything that has expired while we are rewriting the file
+            tokens = {k: v for k, v in tokens.items() if v.get('expires_at', 0) > now}
+            tokens[key] = {'access_token': access_token, 'expires_at': expires_at}
+
+            self._save(tokens)
+
+
+    def invalidate(self, key, access_token=None):
+        """Drop the cached token for key, only if it is still access_token when that is given."""
+
+        if not self.path:
+            return
+
+        with self._lock:
+            tokens = self._load()
+            entry = tokens.get(key)
+
+            if entry is None or (access_token is not None and entry.get('access_token') != access_token):
+                return
+
+            del tokens[key]
+            self._save(tokens)
+
+
+token_cache = TokenCache()
+
+
+def request_token_entries(session, base_url, auth, logger):
+    """Ask URS for tokens, preferring find_or_create_token and falling back to /tokens then /token."""
+
+    headers = {'Accept': 'application/json'}
+    url = f"{base_url}/api/users"
+
+    try:
+        resp = session.post(url + "/find_or_create_token", headers=headers, auth=auth)
+        resp.raise_for_status()
+        return [resp.json()]
+    except Exception as ex:  # noqa E722
+        logger.warning(f"find_or_create_token failed, listing tokens instead: {ex}")
+
+    entries = []
+
+    # Try to get a token that already exists
+    try:
+        resp = session.get(url + "/tokens", headers=headers, auth=auth)
+        resp.raise_for_status()
+        entries = [x for x in resp.json() if x.get('access_token')]
+    except Exception as ex:  # noqa E722
+        logger.error(ex)
+        logger.error("Error getting the token - check user name and password")
+
+    # No tokens exist, try to create one
+    if not entries:
+        try:
+            resp = session.post(url + "/token", headers=headers, auth=auth)
+            resp.raise_for_status()
+            entries = [resp.json()]
+        except Exception as ex:  # noqa E722
+            logger.error(ex)
+            logger.error("Error creating a token - check user name and password")
+
+    return entries
+
+
+def invalidate_on_unauthorized(cache, key, access_token, logger):
+    """requests response hook dropping access_token from the cache when a request sent with it gets a 401.
+
+    A token revoked before it expires is then replaced by a fresh one on the next bearer_token call,
+    instead of being handed out from the cache until it expires.
+    """
+
+    def hook(response, *args, **kwargs):
+
+        if response.status_code == 401 and response.request.headers.get('Authorization') == f"Bearer {access_token}":
+            logger.warning("Bearer token was rejected, dropping it from the token cache")
+
+            try:
+                cache.invalidate(key, access_token)
+            except OSError as ex:
+                logger.warning(f"Could not write token cache {cache.path}: {ex}")
+
+    return hook
+
+
+def bearer_token(env, logger, session=None, base_url=None, cache=None):
+    """Return an EDL bearer token for env, reusing a cached one while it is still valid.
+
+    When session is given, a 401 on a request it sends with the token drops the token from the
+    cache, so a revoked token is replaced on the next call. Requests sent some other way, such as
+    the GraphQL client, do not invalidate it.
+
+    Args:
+        env: Environment ('ops' or 'uat')
+        logger: Logger instance for logging
+        session: Optional requests Session to talk to URS with
+        base_url: URS base URL, defaults to the one for env
+        cache: TokenCache to use, defaults to the shared on-disk cache
+
+    Returns:
+        str: The access token, or None if no token could be found or created
+    """
+    base_url = base_url or urs_base_url(env)
+    cache = token_cache if cache is None else cache
+
+    user = os.environ.get('CMR_USER')
+    password = os.environ.get('CMR_PASS')
+
+    if not user or not password:
+        logger.error("CMR_USER and CMR_PASS must be set to get a token")
+        return None
+
+    key = f"{base_url}|{user}"
+
+    token = cache.get(key)
+    if token:
+        logger.debug(f"Using cached {env} token")
+    else:
+        entries = request_token_entries(session or requests, base_url, requests.auth.HTTPBasicAuth(user, password), logger)
+
+        # If still no token, then we can't do anything
+        if not entries:
+            return None
+
+        # Hand out the token that stays valid the longest
+        expiry, entry = max(((token_expiry(entry), entry) for entry in entries), key=lambda x: x[0])
+        token = entry['access_token']
+
+        try:
+            cache.put(key, token, expiry)
+        except OSError as ex:
+            logger.warning(f"Could not write token cache {cache.path}: {ex}")
+
+    if session is not None:
+        session.hooks['response'].append(invalidate_on_unauthorized(cache, key, token, logger))
+
+    return token
+
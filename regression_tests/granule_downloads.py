@@ -0,0 +1,335 @@
+import contextlib
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from cmr_session import cmr_session
+
+# Granule files shared by every workdir of the same user, override with GRANULE_DOWNLOAD_CACHE
+DEFAULT_DOWNLOAD_CACHE = os.environ.get(
+    'GRANULE_DOWNLOAD_CACHE', os.path.join(os.path.expanduser("~"), ".cache", "tva-automation-tools", "granules"))
+
+# Granule files downloaded at the same time
+DEFAULT_DOWNLOAD_WORKERS = int(os.environ.get('GRANULE_DOWNLOAD_WORKERS', 8))
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ChecksumError(Exception):
+    pass
+
+
+class _Adler32:
+    """hashlib-style wrapper around zlib.adler32, an algorithm UMM-G allows."""
+
+    def __init__(self):
+
+        self.value = 1
+
+
+    def update(self, data):
+
+        self.value = zlib.adler32(data, self.value)
+
+
+    def hexdigest(self):
+
+        return f"{self.value:08x}"
+
+
+# UMM-G Checksum Algorithm values and how to compute them
+CHECKSUM_ALGORITHMS = {
+    'Adler-32': _Adler32,
+    'MD5': hashlib.md5,
+    'SHA-1': hashlib.sha1,
+    'SHA-256': hashlib.sha256,
+    'SHA-384': hashlib.sha384,
+    'SHA-512': hashlib.sha512,
+}
+
+
+def granule_file_info(granule, filename):
+    """Size and checksum of a granule file from UMM-G DataGranule.ArchiveAndDistributionInformation.
+
+    Returns:
+        dict: 'size' (bytes or None) and 'checksum' ({'Value', 'Algorithm'} or None)
+    """
+    entries = (granule.get('umm', {}).get('DataGranule') or {}).get('ArchiveAndDistributionInformation') or []
+
+    for entry in entries:
+        if entry.get('Name') == filename:
+            checksum = entry.get('Checksum')
+            if checksum and checksum.get('Algorithm') not in CHECKSUM_ALGORITHMS:
+                checksum = None
+
+            return dict(size=entry.get('SizeInBytes'), checksum=checksum)
+
+    return dict(size=None, checksum=None)
+
+
+def file_digest(path, algorithm):
+
+    digest = CHECKSUM_ALGORITHMS[algorithm]()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class DownloadManager:
+    """Download granule files through a content-addressed cache.
+
+    A file is stored once under cache_dir, read-only and named by its UMM-G checksum (or by the
+    SHA-256 of its contents when CMR has none), and hard-linked or copied into each workdir that
+    needs it.
+    Downloads go to a .part file that is resumed with an HTTP Range and If-Range request after an
+    interruption, verified against the UMM-G size and checksum, and only then renamed into the cache.
+    Filling a cache entry holds a lock file next to it, so runs sharing the cache never write the
+    same .part file at once.
+    """
+
+    def __init__(self, cache_dir=None, session=None, max_workers: int = DEFAULT_DOWNLOAD_WORKERS, logger=None):
+        """Initialize DownloadManager.
+
+        Args:
+            cache_dir: Cache directory, defaults to GRANULE_DOWNLOAD_CACHE or DEFAULT_DOWNLOAD_CACHE
+            session: requests Session to download with, the shared pooled cmr_session by default
+            max_workers: Number of files downloaded at the same time by fetch_all
+            logger: Logger instance for logging, print if None
+        """
+        self.cache_dir: str = DEFAULT_DOWNLOAD_CACHE if cache_dir is None else cache_dir
+        self.session = session or cmr_session
+        self.max_workers = max(1, max_workers)
+        self.log = logger.info if logger else print
+
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+
+    def _key_lock(self, key):
+
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _file_lock(path):
+        """Hold an exclusive flock on path + '.lock', so other processes sharing the cache wait for this one."""
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+    def cache_path(self, url, checksum=None):
+        """Cache entry of a file, by checksum when known, else by URL until its contents are hashed."""
+
+        if checksum:
+            return os.path.join(self.cache_dir, 'objects', checksum['Algorithm'], checksum['Value'].lower())
+
+        return os.path.join(self.cache_dir, 'urls', hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+
+    def _verify(self, path, size=None, checksum=None):
+
+        if size is not None and os.path.getsize(path) != size:
+            raise ChecksumError(f"{path} is {os.path.getsize(path)} bytes, expected {size}")
+
+        if checksum and file_digest(path, checksum['Algorithm']) != checksum['Value'].lower():
+            raise ChecksumError(f"{path} does not match its {checksum['Algorithm']} checksum {checksum['Value']}")
+
+
+    def _download(self, url, part_path, headers):
+        """Download url into part_path, resuming from the bytes already there.
+
+        A .part is only resumed with an If-Range on the ETag or Last-Modified of the response that
+        started it, kept next to it in a .validator file, so a file that changed on the server is
+        downloaded again from the start instead of being spliced.
+
+        Returns:
+            int: Full size of the file according to the server, None if it did not say
+        """
+        validator_path = part_path + '.validator'
+        validator = None
+
+        if os.path.exists(part_path) and os.path.exists(validator_path):
+            with open(validator_path) as f:
+                validator = f.read().strip() or None
+
+        offset = os.path.getsize(part_path) if validator else 0
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers['Range'] = f"bytes={offset}-"
+            request_headers['If-Range'] = validator
+
+        with self.session.get(url, headers=request_headers, stream=True) as response:
+            if offset and response.status_code == 416:
+                # The validator matched and the .part file already holds the whole file
+                return offset
+
+            response.raise_for_status()
+
+            if offset and response.status_code == 206:
+                self.log(f"Resuming {os.path.basename(url)} at {offset} bytes")
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                mode = 'ab'
+            else:
+                total = None if response.headers.get('Content-Encoding') else response.headers.get('Content-Length')
+                mode = 'wb'
+                self._save_validator(validator_path, response)
+
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+
+        return int(total) if total and total.isdigit() else None
+
+
+    @staticmethod
+    def _discard(part_path):
+
+        for path in (part_path, part_path + '.validator'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+    @staticmethod
+    def _save_validator(validator_path, response):
+        """Keep the strong ETag, else the Last-Modified date, of a response a .part is started from."""
+
+        etag = response.headers.get('ETag')
+        validator = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+
+        if validator:
+            with open(validator_path, 'w') as f:
+                f.write(validator)
+        elif os.path.exists(validator_path):
+            # Without a validator the .part cannot be resumed safely, it is downloaded again
+            os.remove(validator_path)
+
+
+    def _fill_cache(self, url, size, checksum, headers):
+        """Download a file into the cache unless it is there already, returning its cache path."""
+
+        cached = self.cache_path(url, checksum)
+
+        # The thread lock keeps this process's threads off the file lock, which other processes take too
+        with self._key_lock(cached), self._file_lock(cached):
+            if os.path.exists(cached):
+                # Workdir copies are hard links, check nothing wrote through one into the cache
+                try:
+                    self._verify(cached, size, checksum)
+                    return cached
+                except ChecksumError as e:
+                    self.log(f"{e}, dropping it from the cache")
+                    os.remove(cached)
+
+            part_path = cached + '.part'
+
+            total = self._download(url, part_path, headers)
+
+            try:
+                # Without a UMM-G size, at least check the size the server announced
+                self._verify(part_path, total if size is None else size, checksum)
+            except ChecksumError:
+                # A corrupt partial file would be resumed forever, start over next time
+                self._discard(part_path)
+                raise
+
+            os.chmod(part_path, 0o444)
+            os.replace(part_path, cached)
+            self._discard(part_path)
+
+        if checksum:
+            return cached
+
+        # Without a CMR checksum, file the contents under their SHA-256 and keep the URL entry as a link
+        objects_path = os.path.join(self.cache_dir, 'objects', 'SHA-256', file_digest(cached, 'SHA-256'))
+        os.makedirs(os.path.dirname(objects_path), exist_ok=True)
+        try:
+            os.link(cached, objects_path)
+        except FileExistsError:
+            pass
+
+        return cached
+
+
+    def fetch(self, url, dest_dir, size=None, checksum=None, headers=None):
+        """Put the file at url into dest_dir, from the cache when possible.
+
+        Args:
+            url: File URL
+            dest_dir: Directory the file is wanted in, named after the last part of the URL
+            size: Expected size in bytes, from UMM-G
+            checksum: Expected {'Value', 'Algorithm'} checksum, from UMM-G
+            headers: Extra request headers, e.g. Authorization
+
+        Returns:
+            str: Path of the file in dest_dir
+
+        Raises:
+            ChecksumError: The downloaded file does not match size or checksum
+        """
+        dest = os.path.join(dest_dir, os.path.basename(url))
+
+        if os.path.exists(dest):
+            try:
+                self._verify(dest, size, checksum)
+                self.log(f"File {os.path.basename(dest)} already exists, skipping download")
+                return dest
+            except ChecksumError as e:
+                self.log(f"{e}, downloading it again")
+
+        cached = self._fill_cache(url, size, checksum, headers)
+
+        # Linked under a temporary name and renamed, so dest is never a partial file
+        os.makedirs(dest_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=".download.")
+        os.close(fd)
+        os.unlink(tmp_path)
+
+        try:
+            os.link(cached, tmp_path)
+        except OSError:
+            shutil.copyfile(cached, tmp_path)
+
+        os.replace(tmp_path, dest)
+        self.log(f"Downloaded file to {dest}")
+
+        return dest
+
+
+    def fetch_all(self, downloads, headers=None):
+        """Fetch many files concurrently.
+
+        Args:
+            downloads: dicts with the fetch arguments url, dest_dir and optionally size and checksum
+            headers: Extra request headers for every download
+
+        Returns:
+            list: The path or the exception of each download, in order
+        """
+
+        def safe_fetch(download):
+
+            try:
+                return self.fetch(headers=headers, **download)
+            except Exception as exc:  # noqa: E722
+                self.log(f"Error downloading {download['url']}: {exc}")
+                return exc
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(safe_fetch, downloads))
@@ -1,57 +1,281 @@
 import os
+import io
 import logging
-from typing import Callable, List
-from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import traceback
+from typing import Callable, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+# Memory one tool run may need, caps the number of workers on small runners
+DEFAULT_JOB_MEMORY_MB = int(os.environ.get('REGRESSION_JOB_MEMORY_MB', 2048))
 
-def process_workdir(workdir: str, palette_dir: str, output_dir_name: str, processors: List[Callable]) -> None:
+# 'inprocess' calls the tools' Python entry points in the worker, 'subprocess' runs their console scripts
+BACKENDS = ('inprocess', 'subprocess')
+
+# (processor, output directory name) - one tool version run on a granule
+Step = Tuple[Callable, str]
+
+# (granule directory, config file, steps) - the steps of a job run one after the other
+Job = Tuple[str, str, Tuple[Step, ...]]
+
+
+def default_workers(job_memory_mb: int = DEFAULT_JOB_MEMORY_MB) -> int:
+    """
+    Number of jobs to run at the same time, from the CPUs this process may use and the available memory
+
+    REGRESSION_WORKERS overrides it.
+
+    Args:
+        job_memory_mb: Memory one job may need, in MB
+
+    Returns:
+        Number of worker processes, at least 1
+    """
+    if os.environ.get('REGRESSION_WORKERS'):
+        return max(1, int(os.environ['REGRESSION_WORKERS']))
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        available_mb = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return cpus
+
+    return max(1, min(cpus, available_mb // max(1, job_memory_mb)))
+
+
+def in_process_backend() -> bool:
+    """
+    Whether Python tools run in the worker process, from REGRESSION_BACKEND (default inprocess)
+
+    Read at call time so pool workers see the value main() set, whatever the start method.
+    """
+    return os.environ.get('REGRESSION_BACKEND', 'inprocess') == 'inprocess'
+
+
+def _loggers() -> List[logging.Logger]:
+
+    return [logging.getLogger()] + [logger for logger in logging.root.manager.loggerDict.values()
+                                    if isinstance(logger, logging.Logger)]
+
+
+def run_in_process(func: Callable, *args, **kwargs) -> Tuple[str, str, int]:
+    """
+    Call a tool entry point in this process, capturing what it prints like a subprocess would
+
+    The root logger's handlers are swapped for one writing WARNING and above to the captured stderr,
+    as logging's last resort handler does in a tool subprocess.  Logging handlers the call adds
+    (basicConfig, per-run StreamHandlers) are removed again, so they do not pile up or write to a
+    later granule's output.
+
+    Args:
+        func: Entry point to call
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Tuple of (stdout, stderr, return code), 1 with the traceback on stderr if func raised
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    return_code = 0
+
+    root = logging.getLogger()
+    root_handlers = root.handlers[:]
+    for handler in root_handlers:
+        root.removeHandler(handler)
+
+    captured = logging.StreamHandler(stderr)
+    captured.setLevel(logging.WARNING)
+    root.addHandler(captured)
+
+    handlers = {id(logger): list(logger.handlers) for logger in _loggers()}
+
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            func(*args, **kwargs)
+        except SystemExit as e:
+            return_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            return_code = 1
+
+    for logger in _loggers():
+        for handler in logger.handlers[:]:
+            if handler not in handlers.get(id(logger), []):
+                logger.removeHandler(handler)
+                handler.close()
+
+    root.removeHandler(captured)
+    for handler in root_handlers:
+        root.addHandler(handler)
+
+    return stdout.getvalue(), stderr.getvalue(), return_code
+
+
+def tool_output(stdout: str, stderr: str, return_code: int) -> str:
+    """
+    Output saved to the *_successful.txt / *_failed.txt files, as the subprocess runners format it
+    """
+    if return_code != 0:
+        return f"STDOUT:\n{stdout}\nSTDERR:\n{stderr}"
+
+    return stdout + "\n" + stderr if stderr else stdout
+
+
+def find_data_file(granule_dir: str) -> Optional[str]:
+    """
+    Granule file of a granule directory, None if there is none
+
+    Skips the tools' .txt and .wkt files and hidden files, such as a download being linked into
+    place, which other jobs on the same granule may be writing while this one looks.
+    """
+    data_files = sorted(f for f in os.listdir(granule_dir)
+                        if not f.endswith(('.txt', '.wkt')) and not f.startswith('.')
+                        and not os.path.isdir(os.path.join(granule_dir, f)))
+
+    if not data_files:
+        logging.warning(f"No data files found in {granule_dir}")
+        return None
+
+    return os.path.join(granule_dir, data_files[0])
+
+
+def step_name(step: Step) -> str:
+
+    process_func, output_dir_name = step
+    return f"{getattr(process_func, 'func', process_func).__name__}:{output_dir_name}"
+
+
+def list_collection_dirs(workdir: str) -> List[str]:
+    """
+    Collection directories of a workdir, sorted alphabetically
+    """
+    return [os.path.join(workdir, item) for item in sorted(os.listdir(workdir))
+            if os.path.isdir(os.path.join(workdir, item))]
+
+
+def list_granule_dirs(collection_dir: str) -> Tuple[Optional[str], List[str]]:
+    """
+    Config file and granule subdirectories of a collection directory
+
+    Returns:
+        Tuple of (config file, granule directories), (None, []) if the collection has no config file
+    """
+    collection_name = os.path.basename(collection_dir)
+    config_file = os.path.join(collection_dir, f"{collection_name}.cfg")
+
+    if not os.path.exists(config_file):
+        logging.warning(f"Config file not found for {collection_name}")
+        return None, []
+
+    granule_dirs = [os.path.join(collection_dir, item) for item in sorted(os.listdir(collection_dir))
+                    if os.path.isdir(os.path.join(collection_dir, item))]
+
+    return config_file, granule_dirs
+
+
+def collection_jobs(collection_dir: str, processors: List[Callable], output_dir_name: str) -> List[Job]:
+    """
+    Jobs for every granule subdirectory of a collection directory, one per granule and processor
+
+    Args:
+        collection_dir: Path to collection directory
+        processors: List of processing functions to run on each granule
+        output_dir_name: Name of output directory for results
+    """
+    config_file, granule_dirs = list_granule_dirs(collection_dir)
+
+    return [(granule_dir, config_file, ((process_func, output_dir_name),))
+            for granule_dir in granule_dirs for process_func in processors]
+
+
+def run_job(job: Job, palette_dir: str) -> None:
+    """
+    Run the steps of one job on its granule directory
+
+    Args:
+        job: (granule directory, config file, steps)
+        palette_dir: Directory containing palette files
+    """
+    granule_dir, config_file, steps = job
+
+    for process_func, output_dir_name in steps:
+        print(f"Processing directory: {granule_dir}")
+        process_func(granule_dir, config_file, palette_dir, output_dir_name)
+        print()
+
+
+def run_jobs(jobs: List[Job], palette_dir: str, max_workers: Optional[int] = None) -> int:
+    """
+    Run jobs on one process pool, so the run takes as long as the slowest job
+
+    Args:
+        jobs: Jobs to run
+        palette_dir: Directory containing palette files
+        max_workers: Number of worker processes, default_workers() if None
+
+    Returns:
+        Number of jobs that raised
+    """
+    max_workers = max_workers or default_workers()
+    logging.info(f"Running {len(jobs)} jobs on {max_workers} workers")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_job, job, palette_dir): job for job in jobs}
+
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                granule_dir, _, steps = futures[future]
+                logging.error(f"Job {', '.join(map(step_name, steps))} on {granule_dir} failed: {str(e)}")
+
+    logging.info(f"Finished {len(jobs)} jobs, {failed} failed")
+
+    return failed
+
+
+def process_workdir(workdir: str, palette_dir: str, output_dir_name: str, processors: List[Callable],
+                    max_workers: Optional[int] = None) -> None:
     """
     Process the entire workdir containing collection directories
-    
+
+    Every (granule, processor) pair of every collection is an independent job on one process pool,
+    so a collection with many granules or a slow tool run no longer holds up the rest.
+
     Args:
         workdir: Path to working directory
         palette_dir: Directory containing palette files
         output_dir_name: Name of output directory for results
         processors: List of processing functions to run on each granule
+        max_workers: Number of worker processes, default_workers() if None
     """
     if not os.path.exists(workdir):
         logging.error(f"Working directory {workdir} does not exist")
         return
 
-    # Process each collection directory in parallel
-    # Sort directories alphabetically
-    collection_dirs = [os.path.join(workdir, item) for item in sorted(os.listdir(workdir)) 
-                      if os.path.isdir(os.path.join(workdir, item))]
-    
-    with ThreadPoolExecutor() as executor:
-        executor.map(lambda d: process_collection_dir(d, palette_dir, output_dir_name, processors), collection_dirs)
+    collection_dirs = list_collection_dirs(workdir)
+
+    jobs = [job for collection_dir in collection_dirs for job in collection_jobs(collection_dir, processors, output_dir_name)]
+
+    logging.info(f"{len(jobs)} jobs from {len(collection_dirs)} collections")
+    run_jobs(jobs, palette_dir, max_workers)
 
 
 def process_collection_dir(collection_dir: str, palette_dir: str, output_dir_name: str, processors: List[Callable]) -> None:
     """
-    Process a single collection directory
-    
+    Process a single collection directory, one granule after the other
+
     Args:
         collection_dir: Path to collection directory
         palette_dir: Directory containing palette files
         output_dir_name: Name of output directory for results
         processors: List of processing functions to run on each granule
     """
-    collection_name = os.path.basename(collection_dir)
-    config_file = os.path.join(collection_dir, f"{collection_name}.cfg")
-    
-    if not os.path.exists(config_file):
-        logging.warning(f"Config file not found for {collection_name}")
-        return
-        
-    # Process each granule subdirectory
-    for item in os.listdir(collection_dir):
-        item_path = os.path.join(collection_dir, item)
-        if os.path.isdir(item_path):
-            print(f"Processing directory: {item_path}")
-            
-            # Run each processor function
-            for process_func in processors:
-                process_func(item_path, config_file, palette_dir, output_dir_name)
-            
-            print() 
\ No newline at end of file
+    for job in collection_jobs(collection_dir, processors, output_dir_name):
+        run_job(job, palette_dir)
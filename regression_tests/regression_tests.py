@@ -3,13 +3,16 @@ import cmr
 import pytz
 from datetime import datetime
 import gspread
-import requests
 import json
 import logging
 import sys
 
 from retrying import retry
 
+from cmr_session import cmr_session, log_connection_stats
+from earthdata_auth import bearer_token
+from granule_downloads import DownloadManager, granule_file_info
+
 
 gc = gspread.service_account()
 
@@ -47,7 +50,7 @@ def get_regression_sheet_table():
 def get_collection_config(short_name):
 
     collection_config = DATASET_CONFIG_URL + short_name + '.cfg'
-    forge_tig_config_resp = requests.get(collection_config)
+    forge_tig_config_resp = cmr_session.get(collection_config)
 
     if forge_tig_config_resp.status_code == 200:
         forge_tig_config = forge_tig_config_resp.json()
@@ -86,7 +89,7 @@ def get_granule(granule_id, edl_token):
     print(granule_url)
     headers = {"Authorization": f"Bearer {edl_token}"}
 
-    granule = requests.get(granule_url, headers=headers).json()['items']
+    granule = cmr_session.get(granule_url, headers=headers).json()['items']
 
     if len(granule) != 1:
         print(f"No granule found with ID {granule_id}")
@@ -106,7 +109,7 @@ def get_last_granule(short_name, edl_token):
 
  #   first_granule = requests.get(granule_url, headers=headers, params={
  #                               'page_size': 1, 'sort_key': 'start_date'}).json()['items']
-    last_granule = requests.get(granule_url, headers=headers, params={
+    last_granule = cmr_session.get(granule_url, headers=headers, params={
                                 'page_size': 1, 'sort_key': '-start_date'}).json()['items']
 
  #  granule_count = requests.get(granule_url, headers=headers, params={
@@ -123,25 +126,6 @@ def get_last_granule(short_name, edl_token):
     return last_granule[0]
 
 
-def bearer_token(env: str, logger) -> str:
-    url = f"https://{'uat.' if env == 'uat' else ''}urs.earthdata.nasa.gov/api/users/find_or_create_token"
-
-    try:
-        # Make the request with the Base64-encoded Authorization header
-        resp = requests.post(
-            url,
-            auth=requests.auth.HTTPBasicAuth(os.environ['CMR_USER'], os.environ['CMR_PASS'])
-        )
-
-        # Check for successful response
-        if resp.status_code == 200:
-            response_content = resp.json()
-            return response_content.get('access_token')
-
-    except Exception as e:
-        logger.error(f"Error getting the token (status code {resp.status_code}): {e}", exc_info=True)
-
-
 def get_info(granule_json):
 
     # Get granule ID from metadata
@@ -157,43 +141,14 @@ def get_info(granule_json):
         if x.get('Type') == "GET DATA" and x.get('Subtype') in [None, 'DIRECT DOWNLOAD'] and '.bin' not in x.get('URL'):
             granule_url = x.get('URL')
 
+    file_info = granule_file_info(granule_json, os.path.basename(granule_url)) if granule_url else {}
+
     return { 'href': granule_url,
             'id': granule_id,
-            'date': date}
-
-
-def download_file(save_path, source_url, edl_token):
-    """
-    Download a file from a URL to a specified path, using EDL token authentication.
-    
-    Args:
-        save_path (str): Path where the file should be saved
-        source_url (str): URL of the file to download
-        edl_token (str): EDL bearer token for authentication
-    """
-    # Create session and set authorization header with token
-    session = requests.Session()
-    session.headers.update({'Authorization': f'Bearer {edl_token}'})
-
-    try:
-        # Stream the download to handle large files efficiently
-        response = session.get(source_url, stream=True)
-        response.raise_for_status()
-        
-        # Get the filename from the URL
-        filename = os.path.basename(source_url)
-        full_path = os.path.join(save_path, filename)
-        
-        # Write the file in chunks
-        with open(full_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+            'date': date,
+            'size': file_info.get('size'),
+            'checksum': file_info.get('checksum')}
 
-        print(f"Downloaded file to {full_path}")
-    except requests.exceptions.RequestException as e:
-        print(f"Error downloading file: {e}")
-        raise
 
 def needs_update(row: list) -> bool:
     """
@@ -227,6 +182,7 @@ def fill_regression(workdir, edl_token):
     header.append('Data URL')
     header.append('Config Image Count')
     rows = [header]
+    downloads = []
 
     # Process each row in collection table, skipping header row
     for collection_row in collection_table[1:]:
@@ -274,12 +230,8 @@ def fill_regression(workdir, edl_token):
             if not os.path.exists(workdir_granule):
                 os.makedirs(workdir_granule)
 
-            filename = os.path.basename(info['href'])
-            full_path = os.path.join(workdir_granule, filename)
-            if not os.path.exists(full_path):
-                download_file(workdir_granule, info['href'], edl_token)
-            else:
-                print(f"File {filename} already exists, skipping download")
+            # Downloaded together once every granule is known
+            downloads.append((row, dict(url=info['href'], dest_dir=workdir_granule, size=info['size'], checksum=info['checksum'])))
 
             try:
                 with open(config_path) as f:
@@ -297,6 +249,18 @@ def fill_regression(workdir, edl_token):
         finally:
             rows.append(row)
 
+    results = DownloadManager().fetch_all([download for _, download in downloads], headers={'Authorization': f'Bearer {edl_token}'})
+
+    failed = 0
+    for (row, download), result in zip(downloads, results):
+        if isinstance(result, Exception):
+            # Left without its Config Image Count, as before the download, so the next run retries it
+            print(f"Warning: could not download {download['url']} for granule {row[0]}, leaving its row incomplete")
+            del row[4:]
+            failed += 1
+
+    print(f"Downloaded {len(results) - failed} of {len(results)} granule files")
+
     regression_sheet = workbook.worksheet("Regression Tests")
 
     try:
@@ -323,7 +287,7 @@ def main(args=None):
     logger.info(f"Started regression tests: "                                 # pylint: disable=W1203
                 f"{datetime.now(pytz.timezone('US/Pacific')).strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
-    edl_token = bearer_token('ops', logger)
+    edl_token = bearer_token('ops', logger, cmr_session)
 
     # Create workdir subdirectory if it doesn't exist
     workdir = "workdir"
@@ -332,6 +296,8 @@ def main(args=None):
 
     fill_regression(workdir, edl_token)
 
+    log_connection_stats(logger)
+
     logger.info(f"Finished all collections: "                                 # pylint: disable=W1203
                 f"{datetime.now(pytz.timezone('US/Pacific')).strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
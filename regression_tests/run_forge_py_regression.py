@@ -4,9 +4,9 @@ import subprocess
 import os
 import json
 from typing import Tuple, Optional
-from regression_base import process_workdir
+from regression_base import BACKENDS, find_data_file, in_process_backend, process_workdir, run_in_process, tool_output
 
-def run_forge_py_process(input_file: str, output_dir: str, config_file: str) -> Tuple[str, int]:
+def run_forge_py_process(input_file: str, output_dir: str, config_file: str, forge_py_command: str = 'forge-py') -> Tuple[str, int]:
     """
     Run the forge-py process on a single granule file and capture output
     
@@ -14,7 +14,8 @@ def run_forge_py_process(input_file: str, output_dir: str, config_file: str) ->
         input_file: Path to input granule file
         output_dir: Directory to store forge-py output
         config_file: Path to config file
-        
+        forge_py_command: forge-py executable to run
+
     Returns:
         Tuple of (output string, return code) from forge-py process
     """
@@ -23,7 +24,7 @@ def run_forge_py_process(input_file: str, output_dir: str, config_file: str) ->
         log_file = os.path.join(output_dir, 'forge-py.log')
         
         cmd = [
-            'forge-py',
+            forge_py_command,
             '-c', config_file,
             '-g', input_file,
             '-o', output_file,
@@ -48,7 +49,54 @@ def run_forge_py_process(input_file: str, output_dir: str, config_file: str) ->
         return output, e.returncode
 
 
-def process_granule_dir_forge_py(granule_dir: str, config_file: str, palette_dir: Optional[str] = None, output_dir_name: str = 'output') -> None:
+def run_forge_py_in_process(input_file: str, output_dir: str, config_file: str) -> Optional[Tuple[str, int]]:
+    """
+    Run forge-py on a single granule file through its cli entry point, in this worker process
+
+    forge-py and its xarray stack are imported once per worker instead of once per granule.
+
+    Returns:
+        Tuple of (output string, return code) like run_forge_py_process, or None if forge-py is not importable
+    """
+    try:
+        from podaac.forge_py.cli import main as forge_py_main
+    except ImportError:
+        return None
+
+    output_file = os.path.join(output_dir, 'forge-py-footprint.wkt')
+    log_file = os.path.join(output_dir, 'forge-py.log')
+
+    cli_args = [
+        '-c', config_file,
+        '-g', input_file,
+        '-o', output_file,
+        '--log-file', log_file,
+        '--log-level', 'DEBUG'
+    ]
+
+    print("\nRunning forge-py in process:")
+    print(" ".join(['forge-py'] + cli_args))
+    print()
+
+    # forge-py's logging.basicConfig is a no-op once the root logger has handlers, so the
+    # per-granule log file is attached here
+    log_handler = logging.FileHandler(log_file)
+    logging.getLogger().addHandler(log_handler)
+
+    try:
+        stdout, stderr, return_code = run_in_process(forge_py_main, cli_args)
+    finally:
+        logging.getLogger().removeHandler(log_handler)
+        log_handler.close()
+
+    if return_code != 0:
+        logging.error(f"Error running forge-py: {stderr}")
+
+    return tool_output(stdout, stderr, return_code), return_code
+
+
+def process_granule_dir_forge_py(granule_dir: str, config_file: str, palette_dir: Optional[str] = None, output_dir_name: str = 'output',
+                                 forge_py_command: Optional[str] = None) -> None:
     """
     Process a single granule directory for forge-py
     
@@ -56,6 +104,7 @@ def process_granule_dir_forge_py(granule_dir: str, config_file: str, palette_dir
         granule_dir: Path to granule directory
         config_file: Path to config file
         palette_dir: Directory containing palette files (unused for forge-py)
+        forge_py_command: forge-py executable of a specific forge-py version, always run as a subprocess
     """
     # First check if we should run forge-py based on config
     try:
@@ -79,13 +128,10 @@ def process_granule_dir_forge_py(granule_dir: str, config_file: str, palette_dir
         logging.error(f"Error reading config file {config_file}: {str(e)}")
         return
 
-    # Find the first data file in the granule directory that does not end in .txt and is not a directory
-    data_files = [f for f in os.listdir(granule_dir) if not f.endswith('.txt') and not os.path.isdir(os.path.join(granule_dir, f))]
-    if not data_files:
-        logging.warning(f"No data files found in {granule_dir}")
+    input_file = find_data_file(granule_dir)
+    if input_file is None:
         return
 
-    input_file = os.path.join(granule_dir, data_files[0])
     output_dir = os.path.join(granule_dir, output_dir_name)
     os.makedirs(output_dir, exist_ok=True)
 
@@ -96,7 +142,8 @@ def process_granule_dir_forge_py(granule_dir: str, config_file: str, palette_dir
         return
 
     # Run forge-py and save output
-    forge_py_output, return_code = run_forge_py_process(input_file, output_dir, config_file)
+    result = run_forge_py_in_process(input_file, output_dir, config_file) if in_process_backend() and not forge_py_command else None
+    forge_py_output, return_code = result or run_forge_py_process(input_file, output_dir, config_file, forge_py_command or 'forge-py')
     print(f"forge_py_output: {forge_py_output}")
     print(f"Return code: {return_code}")
 
@@ -117,9 +164,13 @@ def main():
     parser = argparse.ArgumentParser(description='Process forge-py regression tests')
     parser.add_argument('--workdir', default='workdir', help='Working directory path (default: workdir)')
     parser.add_argument('--output_dir_name', '-od', required=True, help='Name of output directory for Forge-py results')
+    parser.add_argument('--workers', type=int, default=None, help='Number of granules processed at the same time (default: from CPUs and memory)')
+    parser.add_argument('--backend', choices=BACKENDS, default='inprocess', help='Call forge-py in the worker processes or run the forge-py command (default: inprocess)')
     args = parser.parse_args()
 
-    process_workdir(args.workdir, None, args.output_dir_name, [process_granule_dir_forge_py])
+    os.environ['REGRESSION_BACKEND'] = args.backend
+
+    process_workdir(args.workdir, None, args.output_dir_name, [process_granule_dir_forge_py], args.workers)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
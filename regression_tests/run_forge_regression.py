@@ -1,26 +1,245 @@
 import argparse
+import atexit
+import functools
 import logging
+import re
 import subprocess
 import os
 import json
-from typing import Tuple, Optional
-from regression_base import process_workdir
+import shutil
+import tempfile
+from typing import Dict, Tuple, Optional
+from regression_base import DEFAULT_JOB_MEMORY_MB, find_data_file, process_workdir
 
-def run_forge_process(input_file: str, config_file: str) -> Tuple[str, int]:
+FORGE_JAR = 'footprint.jar'
+
+# JSON of the directory ForgeWorker.java was compiled into for this run, per Forge jar;
+# workers use a JVM per granule for a jar that has none
+FORGE_WORKER_ENV = 'REGRESSION_FORGE_WORKER'
+
+# Heap of each worker JVM, within the per-job memory budget the pool is sized by, leaving room for the JVM itself
+FORGE_HEAP_ENV = 'REGRESSION_FORGE_HEAP_MB'
+
+# Exit status of ForgeWorker.java when it cannot install the System.exit trap
+FORGE_WORKER_NO_EXIT_TRAP = 3
+
+
+def forge_heap_mb() -> int:
+    """
+    Maximum heap of a worker JVM, from REGRESSION_FORGE_HEAP_MB or 3/4 of REGRESSION_JOB_MEMORY_MB
+    """
+    return int(os.environ.get(FORGE_HEAP_ENV) or DEFAULT_JOB_MEMORY_MB * 3 // 4)
+
+
+@functools.lru_cache(maxsize=None)
+def java_major_version() -> Optional[int]:
+    """
+    Major version of the java on the PATH, 8 for "1.8.0_392", None if it cannot be run or parsed
+    """
+    try:
+        result = subprocess.run(['java', '-version'], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    match = re.search(r'version "(?:1\.)?(\d+)', result.stderr)
+    return int(match.group(1)) if match else None
+
+
+class ForgeWorker:
+    """
+    One long-lived JVM running ForgeWorker.java, which runs FootprintCLI jobs sent over a pipe
+
+    Started on first use in each worker process, so JVM startup and class loading are paid once
+    per process instead of once per granule.  Its heap is capped at forge_heap_mb() so the resident
+    JVMs of all workers fit the memory the pool was sized for.  Its stdin is closed when the process
+    exits, which stops the JVM.
+    """
+
+    def __init__(self, jar: str, classes_dir: str):
+        self.jar = jar
+        self.classes_dir = classes_dir
+        self.process = None
+
+    @staticmethod
+    def compile(jar: str = FORGE_JAR, classes_dir: Optional[str] = None) -> Optional[str]:
+        """
+        Compile ForgeWorker.java against the Forge jar
+
+        Args:
+            jar: Footprint jar to compile against
+            classes_dir: Directory kept for later runs, which reuse it when it holds ForgeWorker.class.
+                         A new temporary directory, removed when this process exits, if None
+
+        Returns:
+            The directory holding ForgeWorker.class, None if it could not be compiled
+        """
+        if classes_dir and os.path.exists(os.path.join(classes_dir, 'ForgeWorker.class')):
+            logging.info(f"Using cached Forge worker from {classes_dir}")
+            return classes_dir
+
+        source = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ForgeWorker.java')
+
+        if classes_dir:
+            # Compiled next to classes_dir and renamed, so a failed compile is not cached
+            os.makedirs(os.path.dirname(classes_dir), exist_ok=True)
+            build_dir = tempfile.mkdtemp(prefix='.forge_worker.', dir=os.path.dirname(classes_dir))
+        else:
+            build_dir = tempfile.mkdtemp(prefix='forge_worker.')
+            atexit.register(shutil.rmtree, build_dir, ignore_errors=True)
+
+        try:
+            subprocess.run(['javac', '-cp', jar, '-d', build_dir, source], capture_output=True, text=True, check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logging.warning(f"Could not compile the Forge worker for {jar}, running a JVM per granule: {getattr(e, 'stderr', e)}")
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return None
+
+        if not classes_dir:
+            return build_dir
+
+        try:
+            os.rename(build_dir, classes_dir)
+        except OSError:
+            # Another run cached it first
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+        return classes_dir
+
+    @staticmethod
+    def enable(classes_dirs: Dict[str, Optional[str]]) -> None:
+        """
+        Have the pool workers of this run use the ForgeWorker compiled for each Forge jar, none for a jar mapped to None
+
+        Passed through the environment, which the pool workers inherit whatever the start method.
+        """
+        classes_dirs = {jar: classes_dir for jar, classes_dir in classes_dirs.items() if classes_dir}
+
+        if classes_dirs:
+            os.environ[FORGE_WORKER_ENV] = json.dumps(classes_dirs)
+        else:
+            os.environ.pop(FORGE_WORKER_ENV, None)
+
+    def start(self) -> None:
+        cmd = ['java', f'-Xmx{forge_heap_mb()}m']
+
+        # Java 17+ refuses System.setSecurityManager unless allowed, before 12 "allow" would be read as a class name
+        if (java_major_version() or 0) >= 12:
+            cmd.append('-Djava.security.manager=allow')
+
+        cmd += ['-cp', os.pathsep.join([self.jar, self.classes_dir]), 'ForgeWorker']
+        print("\nStarting Forge worker:")
+        print(" ".join(cmd))
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def run(self, input_file: str, config_file: str) -> Tuple[str, str, int]:
+        """
+        Run FootprintCLI on one granule in the worker JVM
+
+        Returns:
+            Tuple of (stdout, stderr, exit status) of the job
+
+        Raises:
+            EOFError: The worker JVM exited
+        """
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+
+        try:
+            self.process.stdin.write(f"{input_file}\t{config_file}\n".encode('utf-8'))
+            self.process.stdin.flush()
+        except BrokenPipeError as e:
+            raise self.exited() from e
+
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            raise self.exited()
+
+        status, out_length, err_length = (int(value) for value in header)
+        out = self.process.stdout.read(out_length).decode('utf-8', errors='replace')
+        err = self.process.stdout.read(err_length).decode('utf-8', errors='replace')
+
+        return out, err, status
+
+    def exited(self) -> EOFError:
+        """
+        The error for a worker JVM that stopped answering, once it has exited
+        """
+        if self.process.wait() == FORGE_WORKER_NO_EXIT_TRAP:
+            return EOFError("Forge worker cannot trap System.exit in this JVM")
+        return EOFError(f"Forge worker exited with status {self.process.returncode}")
+
+    def close(self) -> None:
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+
+# ForgeWorker of this process per Forge jar, False once it has failed
+_workers = {}
+
+
+def forge_worker(jar: str = FORGE_JAR) -> Optional[ForgeWorker]:
+    """
+    The ForgeWorker of this process for a Forge jar, None when this run compiled no worker class for it or it has failed
+    """
+    classes_dir = json.loads(os.environ.get(FORGE_WORKER_ENV) or '{}').get(jar)
+
+    if jar not in _workers and classes_dir:
+        _workers[jar] = ForgeWorker(jar, classes_dir)
+        atexit.register(_workers[jar].close)
+
+    return _workers.get(jar) or None
+
+
+def run_forge_worker(input_file: str, config_file: str, forge_jar: str = FORGE_JAR) -> Optional[Tuple[str, int]]:
+    """
+    Run Forge on a single granule file in the worker JVM
+
+    Returns:
+        Tuple of (output string, return code) like run_forge_process, or None if the worker is not available
+    """
+    worker = forge_worker(forge_jar)
+    if worker is None:
+        return None
+
+    print("\nRunning Forge job in worker:")
+    print(f"FootprintCLI {input_file} {config_file}")
+    print()
+
+    try:
+        stdout, stderr, status = worker.run(input_file, config_file)
+    except (EOFError, OSError, ValueError) as e:
+        # A worker that died once is not restarted, the rest of this process uses a JVM per granule
+        logging.error(f"Forge worker failed, falling back to a JVM per granule: {str(e)}")
+        worker.close()
+        _workers[forge_jar] = False
+        return None
+
+    if status != 0:
+        logging.error(f"Error running Forge command: {stderr}")
+        return f"STDOUT:\n{stdout}\nSTDERR:\n{stderr}", status
+
+    output = stdout + "\n" + stderr if stderr else stdout
+    return output, status
+
+
+def run_forge_process(input_file: str, config_file: str, forge_jar: str = FORGE_JAR) -> Tuple[str, int]:
     """
     Run the Forge process on a single granule file and capture output
     
     Args:
         input_file: Path to input granule file
         config_file: Path to config file
-        
+        forge_jar: Footprint jar of the Forge version to run
+
     Returns:
         Tuple of (output string, return code) from Forge process
     """
     try:
         cmd = [
             'java',
-            '-cp', 'footprint.jar',
+            '-cp', forge_jar,
             'FootprintCLI',
             input_file,
             config_file
@@ -42,7 +261,8 @@ def run_forge_process(input_file: str, config_file: str) -> Tuple[str, int]:
         return output, e.returncode
 
 
-def process_granule_dir_forge(granule_dir: str, config_file: str, palette_dir: Optional[str] = None, output_dir_name: str = 'output') -> None:
+def process_granule_dir_forge(granule_dir: str, config_file: str, palette_dir: Optional[str] = None, output_dir_name: str = 'output',
+                              forge_jar: str = FORGE_JAR) -> None:
     """
     Process a single granule directory for Forge
     
@@ -50,6 +270,7 @@ def process_granule_dir_forge(granule_dir: str, config_file: str, palette_dir: O
         granule_dir: Path to granule directory
         config_file: Path to config file
         palette_dir: Optional palette directory (not used by Forge but needed for function signature compatibility)
+        forge_jar: Footprint jar of the Forge version to run
     """
     # First check if we should run Forge based on config
     try:
@@ -81,16 +302,12 @@ def process_granule_dir_forge(granule_dir: str, config_file: str, palette_dir: O
         print(f"Skipping Forge processing for {granule_dir} - already completed successfully")
         return
 
-    # Find the first data file in the granule directory that does not end in .txt and is not a directory
-    data_files = [f for f in os.listdir(granule_dir) if not f.endswith('.txt') and not os.path.isdir(os.path.join(granule_dir, f))]
-    if not data_files:
-        logging.warning(f"No data files found in {granule_dir}")
+    input_file = find_data_file(granule_dir)
+    if input_file is None:
         return
 
-    input_file = os.path.join(granule_dir, data_files[0])
-
-    # Run Forge and save output
-    forge_output, return_code = run_forge_process(input_file, config_file)
+    # Run Forge and save output, in the worker JVM if there is one
+    forge_output, return_code = run_forge_worker(input_file, config_file, forge_jar) or run_forge_process(input_file, config_file, forge_jar)
     print(f"forge_output: {forge_output}")
     print(f"Return code: {return_code}")
     
@@ -122,9 +339,13 @@ def main():
     parser = argparse.ArgumentParser(description='Process Forge regression tests')
     parser.add_argument('--workdir', default='workdir', help='Working directory path (default: workdir)')
     parser.add_argument('--output_dir_name', '-od', required=True, help='Name of output directory for Forge results')
+    parser.add_argument('--workers', type=int, default=None, help='Number of granules processed at the same time (default: from CPUs and memory)')
+    parser.add_argument('--no-worker', action='store_true', help='Start a JVM for every granule instead of one Forge worker per process')
     args = parser.parse_args()
 
-    process_workdir(args.workdir, None, args.output_dir_name, [process_granule_dir_forge])
+    ForgeWorker.enable({} if args.no_worker else {FORGE_JAR: ForgeWorker.compile()})
+
+    process_workdir(args.workdir, None, args.output_dir_name, [process_granule_dir_forge], args.workers)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,225 @@
+import argparse
+import functools
+import hashlib
+import logging
+import os
+import re
+import subprocess
+import sys
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from regression_base import DEFAULT_JOB_MEMORY_MB, Job, list_collection_dirs, list_granule_dirs, run_jobs
+from run_forge_py_regression import process_granule_dir_forge_py
+from run_forge_regression import FORGE_HEAP_ENV, ForgeWorker, process_granule_dir_forge
+from run_tig_regression import process_granule_dir_tig
+
+# Virtualenvs, Forge jars and Forge workers of every version run, reused by later runs
+DEFAULT_CACHE_DIR = os.environ.get('REGRESSION_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'tva-automation-tools', 'regression'))
+
+# pip package and console script of the Python tools
+PYTHON_TOOLS = {
+    'tig': ('podaac-thumbnail-generator', 'tig'),
+    'forge-py': ('podaac-forge-py', 'forge-py'),
+}
+
+TOOLS = tuple(PYTHON_TOOLS) + ('forge',)
+
+FORGE_JAR_URL = "https://github.com/podaac/forge/releases/download/{version}/footprint_{version}.jar"
+
+# Release candidates are published to TestPyPI
+PRERELEASE_INDEX = "https://test.pypi.org/simple"
+
+# (tool, version, processor) - the processor runs that version on a granule
+Version = Tuple[str, str, Callable]
+
+
+def parse_version_spec(spec: str) -> Tuple[str, str, str]:
+    """
+    Parse a TOOL==VERSION[:PIP_REQUIREMENT] version spec
+
+    Args:
+        spec: e.g. tig==0.15.0rc1, forge==0.13.0 or forge-py==0.4.0:forge-py==0.4.0
+
+    Returns:
+        Tuple of (tool, version, pip requirement)
+    """
+    spec, _, requirement = spec.partition(':')
+    tool, _, version = spec.partition('==')
+
+    if tool not in TOOLS or not version:
+        raise argparse.ArgumentTypeError(f"expected TOOL==VERSION with TOOL one of {', '.join(TOOLS)}, got {spec}")
+
+    if not requirement and tool in PYTHON_TOOLS:
+        requirement = f"{PYTHON_TOOLS[tool][0]}=={version}"
+
+    return tool, version, requirement
+
+
+def is_prerelease(version: str) -> bool:
+
+    return re.search(r'\d(a|b|rc|dev)\d*', version) is not None
+
+
+def install_python_tool(tool: str, version: str, requirement: str, cache_dir: str, python: str) -> str:
+    """
+    Install a Python tool version into its own virtualenv under cache_dir, once
+
+    Returns:
+        Path of the tool's console script in the virtualenv
+    """
+    env_dir = os.path.join(cache_dir, 'venvs', f"{tool}-{version}")
+    bin_dir = os.path.join(env_dir, 'Scripts' if os.name == 'nt' else 'bin')
+    script = os.path.join(bin_dir, PYTHON_TOOLS[tool][1])
+
+    if os.path.exists(script):
+        logging.info(f"Using cached {tool} {version} from {env_dir}")
+        return script
+
+    logging.info(f"Installing {requirement} into {env_dir}")
+    subprocess.run([python, '-m', 'venv', '--clear', env_dir], check=True)
+
+    pip = [os.path.join(bin_dir, 'python'), '-m', 'pip', 'install', '--quiet']
+    if is_prerelease(version):
+        pip += ['--extra-index-url', PRERELEASE_INDEX]
+
+    subprocess.run(pip + [requirement], check=True)
+
+    return script
+
+
+def install_forge(version: str, cache_dir: str) -> str:
+    """
+    Download a Forge release jar into cache_dir, once
+
+    Returns:
+        Path of the footprint jar
+    """
+    jar = os.path.join(cache_dir, 'forge', f"footprint_{version}.jar")
+
+    if os.path.exists(jar):
+        logging.info(f"Using cached Forge {version} from {jar}")
+        return jar
+
+    os.makedirs(os.path.dirname(jar), exist_ok=True)
+    url = FORGE_JAR_URL.format(version=version)
+    logging.info(f"Downloading {url}")
+
+    # Downloaded next to the jar and renamed, so an interrupted download is not cached
+    with urllib.request.urlopen(url) as response, open(jar + '.part', 'wb') as f:
+        while True:
+            chunk = response.read(1024 * 1024)
+            if not chunk:
+                break
+            f.write(chunk)
+    os.replace(jar + '.part', jar)
+
+    return jar
+
+
+def install_forge_worker(jar: str, cache_dir: str) -> Optional[str]:
+    """
+    Compile the Forge worker against a Forge jar into cache_dir, once per jar and version of ForgeWorker.java
+
+    Returns:
+        Directory holding ForgeWorker.class, None if it could not be compiled
+    """
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ForgeWorker.java'), 'rb') as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+
+    jar_name = os.path.splitext(os.path.basename(jar))[0]
+
+    return ForgeWorker.compile(jar, os.path.join(cache_dir, 'forge', f"worker_{jar_name}_{source_hash}"))
+
+
+def install_version(spec: Tuple[str, str, str], cache_dir: str, python: str) -> Version:
+    """
+    Install one tool version and bind its processor to it
+    """
+    tool, version, requirement = spec
+
+    if tool == 'forge':
+        return tool, version, functools.partial(process_granule_dir_forge, forge_jar=install_forge(version, cache_dir))
+
+    command = install_python_tool(tool, version, requirement, cache_dir, python)
+
+    if tool == 'tig':
+        return tool, version, functools.partial(process_granule_dir_tig, tig_command=command)
+
+    return tool, version, functools.partial(process_granule_dir_forge_py, forge_py_command=command)
+
+
+def matrix_jobs(workdir: str, versions: List[Version]) -> List[Job]:
+    """
+    One job per granule and version, with the Forge versions of a granule in one job
+
+    Forge writes its .wkt file into the granule directory before it is moved to the output
+    directory, so two Forge versions cannot run on the same granule at the same time.  TIG and
+    forge-py jobs run alongside it, find_data_file never picks up the .wkt.
+    """
+    jobs = []
+
+    for collection_dir in list_collection_dirs(workdir):
+        config_file, granule_dirs = list_granule_dirs(collection_dir)
+
+        for granule_dir in granule_dirs:
+            forge_steps = []
+
+            for tool, version, process_func in versions:
+                step = (process_func, f"{tool}_{version}")
+
+                if tool == 'forge':
+                    forge_steps.append(step)
+                else:
+                    jobs.append((granule_dir, config_file, (step,)))
+
+            if forge_steps:
+                jobs.append((granule_dir, config_file, tuple(forge_steps)))
+
+    return jobs
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(
+        description='Run several TIG, forge-py and Forge versions side by side over the regression workdir',
+        epilog='Example: run_regression_matrix.py tig==0.14.0 tig==0.15.0rc1 forge==0.13.0 forge==0.13.0-rc.1'
+    )
+    parser.add_argument('versions', nargs='+', type=parse_version_spec,
+                        help='TOOL==VERSION[:PIP_REQUIREMENT], TOOL one of ' + ', '.join(TOOLS))
+    parser.add_argument('--workdir', default='workdir', help='Working directory path (default: workdir)')
+    parser.add_argument('--palette_dir', default='../forge-tig-configuration/palettes', help='Directory containing TIG palette files')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Virtualenv and jar cache (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--python', default=sys.executable, help='Python interpreter the virtualenvs are created with')
+    parser.add_argument('--workers', type=int, default=None, help='Number of jobs run at the same time (default: from CPUs and memory)')
+    parser.add_argument('--no-worker', action='store_true', help='Start a JVM for every Forge run instead of one Forge worker per process and version')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.workdir):
+        logging.error(f"Working directory {args.workdir} does not exist")
+        sys.exit(1)
+
+    # Every version runs its own installed command, nothing is imported into the workers
+    os.environ['REGRESSION_BACKEND'] = 'subprocess'
+
+    with ThreadPoolExecutor() as executor:
+        versions = list(executor.map(lambda spec: install_version(spec, args.cache_dir, args.python), args.versions))
+
+    forge_jars = [process_func.keywords['forge_jar'] for tool, _, process_func in versions if tool == 'forge']
+    ForgeWorker.enable({} if args.no_worker else {jar: install_forge_worker(jar, args.cache_dir) for jar in forge_jars})
+
+    # Every worker process keeps one JVM per Forge version, they share the job's memory budget
+    if forge_jars and not os.environ.get(FORGE_HEAP_ENV):
+        os.environ[FORGE_HEAP_ENV] = str(max(256, DEFAULT_JOB_MEMORY_MB * 3 // 4 // len(forge_jars)))
+
+    jobs = matrix_jobs(args.workdir, versions)
+    logging.info(f"{len(jobs)} jobs for {', '.join(f'{tool}_{version}' for tool, version, _ in versions)}")
+
+    failed = run_jobs(jobs, args.palette_dir, args.workers)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
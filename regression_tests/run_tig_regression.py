@@ -3,10 +3,11 @@ import logging
 import subprocess
 import os
 import json
-from typing import Tuple
-from regression_base import process_workdir
+import sys
+from typing import Tuple, Optional
+from regression_base import BACKENDS, find_data_file, in_process_backend, process_workdir, run_in_process, tool_output
 
-def run_tig_process(input_file: str, output_dir: str, config_file: str, palette_dir: str) -> Tuple[str, int]:
+def run_tig_process(input_file: str, output_dir: str, config_file: str, palette_dir: str, tig_command: str = 'tig') -> Tuple[str, int]:
     """
     Run the TIG process on a single granule file and capture output
     
@@ -15,13 +16,14 @@ def run_tig_process(input_file: str, output_dir: str, config_file: str, palette_
         output_dir: Directory to store TIG output
         config_file: Path to config file
         palette_dir: Directory containing palette files
-        
+        tig_command: tig executable to run
+
     Returns:
         Tuple of (output string, return code) from TIG process
     """
     try:
         cmd = [
-            'tig',
+            tig_command,
             '--input_file', input_file,
             '--output_dir', output_dir, 
             '--config_file', config_file,
@@ -44,7 +46,42 @@ def run_tig_process(input_file: str, output_dir: str, config_file: str, palette_
         return output, e.returncode
 
 
-def process_granule_dir_tig(granule_dir: str, config_file: str, palette_dir: str, output_dir_name: str) -> None:
+def run_tig_in_process(input_file: str, output_dir: str, config_file: str, palette_dir: str) -> Optional[Tuple[str, int]]:
+    """
+    Run TIG on a single granule file through its Python API, in this worker process
+
+    TIG and its xarray/matplotlib stack are imported once per worker instead of once per granule.
+
+    Returns:
+        Tuple of (output string, return code) like run_tig_process, or None if TIG is not importable
+    """
+    try:
+        from podaac.tig import tig
+    except ImportError:
+        return None
+
+    print("\nRunning TIG in process:")
+    print(f"tig.TIG({input_file}, {output_dir}, {config_file}, {palette_dir})")
+    print()
+
+    def generate_images():
+        image_gen = tig.TIG(input_file, output_dir, config_file, palette_dir)
+        image_gen.generate_images(granule_id=input_file.split('/')[-1])
+
+    stdout, stderr, return_code = run_in_process(generate_images)
+
+    # Figures TIG leaves open would otherwise pile up across granules
+    if 'matplotlib.pyplot' in sys.modules:
+        sys.modules['matplotlib.pyplot'].close('all')
+
+    if return_code != 0:
+        logging.error(f"Error running TIG: {stderr}")
+
+    return tool_output(stdout, stderr, return_code), return_code
+
+
+def process_granule_dir_tig(granule_dir: str, config_file: str, palette_dir: str, output_dir_name: str,
+                            tig_command: Optional[str] = None) -> None:
     """
     Process a single granule directory for TIG
     
@@ -52,6 +89,7 @@ def process_granule_dir_tig(granule_dir: str, config_file: str, palette_dir: str
         granule_dir: Path to granule directory
         config_file: Path to config file
         palette_dir: Directory containing palette files
+        tig_command: tig executable of a specific TIG version, always run as a subprocess
     """
     # First check if we should run TIG based on config
     try:
@@ -68,15 +106,10 @@ def process_granule_dir_tig(granule_dir: str, config_file: str, palette_dir: str
         logging.error(f"Error reading config file {config_file}: {str(e)}")
         return
     
-    # Find the first data file in the granule directory that does not end in .txt and is not a directory
-    data_files = [f for f in os.listdir(granule_dir) if not f.endswith('.txt') and not os.path.isdir(os.path.join(granule_dir, f))]
-    if not data_files:
-        logging.warning(f"No data files found in {granule_dir}")
+    input_file = find_data_file(granule_dir)
+    if input_file is None:
         return
 
-    # Get the first data file
-    input_file = os.path.join(granule_dir, data_files[0])
-
     output_dir = os.path.join(granule_dir, output_dir_name)
     os.makedirs(output_dir, exist_ok=True)
 
@@ -87,7 +120,8 @@ def process_granule_dir_tig(granule_dir: str, config_file: str, palette_dir: str
         return
         
     # Run TIG and save output
-    tig_output, return_code = run_tig_process(input_file, output_dir, config_file, palette_dir)
+    result = run_tig_in_process(input_file, output_dir, config_file, palette_dir) if in_process_backend() and not tig_command else None
+    tig_output, return_code = result or run_tig_process(input_file, output_dir, config_file, palette_dir, tig_command or 'tig')
     print(f"tig_output: {tig_output}")
     print(f"Return code: {return_code}")
 
@@ -107,10 +141,14 @@ def main():
     parser = argparse.ArgumentParser(description='Process TIG regression tests')
     parser.add_argument('--workdir', default='workdir', help='Working directory path (default: workdir)')
     parser.add_argument('--output_dir_name', '-od', required=True, help='Name of output directory for TIG results')
+    parser.add_argument('--workers', type=int, default=None, help='Number of granules processed at the same time (default: from CPUs and memory)')
+    parser.add_argument('--backend', choices=BACKENDS, default='inprocess', help='Call TIG in the worker processes or run the tig command (default: inprocess)')
     args = parser.parse_args()
-    
+
+    os.environ['REGRESSION_BACKEND'] = args.backend
+
     palette_dir = "../forge-tig-configuration/palettes"  # Update this path as needed
-    process_workdir(args.workdir, palette_dir, args.output_dir_name, [process_granule_dir_tig])
+    process_workdir(args.workdir, palette_dir, args.output_dir_name, [process_granule_dir_tig], args.workers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
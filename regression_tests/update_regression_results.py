@@ -1,4 +1,5 @@
 import os
+import re
 import pytz
 from datetime import datetime
 import gspread
@@ -14,6 +15,9 @@ spreadsheet_id = os.environ['SPREADSHEET_ID']
 
 workbook = gc.open_by_key(spreadsheet_id)
 
+# Tools whose output directories are named <tool>_<version>
+TOOLS = ('tig', 'forge', 'forge-py')
+
 
 # Define a custom exception for retries
 class RetryError(Exception):
@@ -239,6 +243,76 @@ def process_granule(short_name: str, granule_id: str) -> dict:
     }
 
 
+def version_key(version: str) -> tuple:
+    """
+    Sort key ordering 0.9.0 before 0.13.0
+    """
+    return tuple((0, int(part)) if part.isdigit() else (1, part) for part in re.split(r'[.\-]', version))
+
+
+def discover_versions(workdir: str) -> dict:
+    """
+    Tool versions that have output directories (tig_0.14.0, forge_0.13.0, forge-py_0.7.0rc1...) in the workdir.
+
+    Args:
+        workdir (str): The base working directory path
+
+    Returns:
+        dict: Sorted version lists keyed by tool ('tig', 'forge', 'forge-py')
+    """
+    versions = {tool: set() for tool in TOOLS}
+
+    for short_name in os.listdir(workdir):
+        collection_dir = os.path.join(workdir, short_name)
+        if not os.path.isdir(collection_dir):
+            continue
+
+        for granule_id in os.listdir(collection_dir):
+            granule_dir = os.path.join(collection_dir, granule_id)
+            if not os.path.isdir(granule_dir):
+                continue
+
+            for dirname in os.listdir(granule_dir):
+                tool, _, version = dirname.partition('_')
+                if tool in versions and version and os.path.isdir(os.path.join(granule_dir, dirname)):
+                    versions[tool].add(version)
+
+    return {tool: sorted(found, key=version_key) for tool, found in versions.items()}
+
+
+def version_columns(versions: dict) -> list:
+    """
+    Result columns of the versions found in the workdir, in sheet order.
+    """
+    columns = []
+    columns += [f"Image Count ({version})" for version in versions['tig']]
+    columns += [f"TIG Status ({version})" for version in versions['tig']]
+    columns += [f"Forge Status ({version})" for version in versions['forge']]
+    columns += [f"Forge-py Status ({version})" for version in versions['forge-py']]
+
+    return columns
+
+
+def ensure_columns(collection_table: list, column_names: list) -> None:
+    """
+    Append the columns missing from the header row and pad every row to the header width.
+
+    Args:
+        collection_table (list): Sheet rows, header first
+        column_names (list): Columns that must be present
+    """
+    logger = logging.getLogger("regression_tests")
+
+    header_row = collection_table[0]
+    for column_name in column_names:
+        if column_name not in header_row:
+            logger.info(f"Adding column {column_name}")
+            header_row.append(column_name)
+
+    for row in collection_table[1:]:
+        row.extend([""] * (len(header_row) - len(row)))
+
+
 def get_value(row: list, column_name: str, header_row: list) -> str:
     """
     Get the value from a row for a specific column name.
@@ -295,6 +369,11 @@ def main(args=None):
     for row in collection_table:
         print(row)
 
+    # The result columns follow whatever versions were run
+    versions = discover_versions('workdir')
+    logger.info(f"Versions found: {versions}")
+    ensure_columns(collection_table, version_columns(versions))
+
     header_row = collection_table[0]
 
     for row in collection_table[1:]:
@@ -318,33 +397,25 @@ def main(args=None):
         # TIG columns
         config_image_count = get_value(row, "Config Image Count", header_row)
         image_counts = granule_data.get('image_counts', {})
-        tig_0_14_0_count = image_counts.get('tig_0.14.0', '-')
-        tig_0_15_0rc1_count = image_counts.get('tig_0.15.0rc1', '-')
-        insert_value_into_row(row, "Image Count (0.14.0)", header_row, str(tig_0_14_0_count))
-        insert_value_into_row(row, "Image Count (0.15.0rc1)", header_row, str(tig_0_15_0rc1_count))
 
-        logger.info(f"Config image count: {config_image_count}, Tig 0.14.0 count: {tig_0_14_0_count}, Tig 0.15.0rc1 count: {tig_0_15_0rc1_count}")
+        for version in versions['tig']:
+            tig_count = image_counts.get(f'tig_{version}', '-')
+            insert_value_into_row(row, f"Image Count ({version})", header_row, str(tig_count))
 
-        if config_image_count != '-' and tig_0_14_0_count != '-' and int(config_image_count) != int(tig_0_14_0_count):
-            insert_value_into_row(row, "TIG Status (0.14.0)", header_row, "FAIL")
-        else:
-            insert_value_into_row(row, "TIG Status (0.14.0)", header_row, granule_data.get('tig_status', {}).get('tig_0.14.0', '-'))
+            logger.info(f"Config image count: {config_image_count}, Tig {version} count: {tig_count}")
 
-        if config_image_count != '-' and tig_0_15_0rc1_count != '-' and int(config_image_count) != int(tig_0_15_0rc1_count):
-            insert_value_into_row(row, "TIG Status (0.15.0rc1)", header_row, "FAIL")
-        else:
-            insert_value_into_row(row, "TIG Status (0.15.0rc1)", header_row, granule_data.get('tig_status', {}).get('tig_0.15.0rc1', '-'))
+            if config_image_count != '-' and tig_count != '-' and int(config_image_count) != int(tig_count):
+                insert_value_into_row(row, f"TIG Status ({version})", header_row, "FAIL")
+            else:
+                insert_value_into_row(row, f"TIG Status ({version})", header_row, granule_data.get('tig_status', {}).get(f'tig_{version}', '-'))
 
         # Forge columns
-        insert_value_into_row(row, "Forge Status (0.11.0)", header_row, granule_data.get('forge_status', {}).get('forge_0.11.0', '-'))
-        insert_value_into_row(row, "Forge Status (0.12.1)", header_row, granule_data.get('forge_status', {}).get('forge_0.12.1', '-'))
-        insert_value_into_row(row, "Forge Status (0.13.0)", header_row, granule_data.get('forge_status', {}).get('forge_0.13.0', '-'))
-        insert_value_into_row(row, "Forge Status (0.13.0-rc.1)", header_row, granule_data.get('forge_status', {}).get('forge_0.13.0-rc.1', '-'))
+        for version in versions['forge']:
+            insert_value_into_row(row, f"Forge Status ({version})", header_row, granule_data.get('forge_status', {}).get(f'forge_{version}', '-'))
 
         # Forge-py columns
-        insert_value_into_row(row, "Forge-py Status (0.4.0)", header_row, granule_data.get('forge_py_status', {}).get('forge-py_0.4.0', '-'))
-        insert_value_into_row(row, "Forge-py Status (0.6.0)", header_row, granule_data.get('forge_py_status', {}).get('forge-py_0.6.0', '-'))
-        insert_value_into_row(row, "Forge-py Status (0.7.0rc1)", header_row, granule_data.get('forge_py_status', {}).get('forge-py_0.7.0rc1', '-'))
+        for version in versions['forge-py']:
+            insert_value_into_row(row, f"Forge-py Status ({version})", header_row, granule_data.get('forge_py_status', {}).get(f'forge-py_{version}', '-'))
 
         # Get errors
         errors = granule_data.get('errors', '')
@@ -362,6 +433,8 @@ def main(args=None):
 
     # Update the entire worksheet with the modified collection table
     worksheet = workbook.worksheet("Regression Tests")
+    if len(header_row) > worksheet.col_count:
+        worksheet.add_cols(len(header_row) - worksheet.col_count)
     update_sheet(worksheet, collection_table, 'A1')
 
     logger.info(f"Finished all collections: "                                 # pylint: disable=W1203
@@ -0,0 +1,121 @@
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LocalUrsServer:
+    """Stand-in for the URS token endpoints, served from a local thread.
+
+    Accepts any basic auth credentials, hands out one token per user and counts the requests
+    it received per path in `calls`.
+
+        with LocalUrsServer() as urs:
+            bearer_token('ops', logger, base_url=urs.url, cache=TokenCache(path))
+    """
+
+    def __init__(self, expiration_date: str = "12/31/2099", find_or_create: bool = True):
+        """Initialize LocalUrsServer.
+
+        Args:
+            expiration_date: expiration_date returned with every token
+            find_or_create: Serve find_or_create_token; when False it answers 404 like an older URS
+        """
+        self.expiration_date = expiration_date
+        self.find_or_create = find_or_create
+        self.calls = {}
+        self.tokens = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+
+    def __enter__(self):
+
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc):
+
+        self.stop()
+
+
+    @property
+    def url(self):
+
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+    def start(self):
+
+        urs = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                urs.handle(self, 'GET')
+
+            def do_POST(self):
+                urs.handle(self, 'POST')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+    def handle(self, handler, method):
+
+        path = handler.path.split('?')[0]
+        auth = handler.headers.get('Authorization', '')
+
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+        if not auth.startswith('Basic '):
+            self.respond(handler, 401, {'error': 'invalid_credentials'})
+            return
+
+        user = base64.b64decode(auth[6:]).decode('utf-8').split(':')[0]
+
+        with self._lock:
+            existing = self.tokens.get(user)
+
+            creates = path == '/api/users/token' or (path == '/api/users/find_or_create_token' and self.find_or_create)
+
+            if method == 'POST' and creates and existing is None:
+                existing = self.tokens[user] = f"local-token-{user}-{len(self.tokens) + 1}"
+
+        entry = {'access_token': existing, 'token_type': 'Bearer', 'expiration_date': self.expiration_date}
+
+        if path == '/api/users/find_or_create_token' and method == 'POST' and self.find_or_create:
+            self.respond(handler, 200, entry)
+        elif path == '/api/users/tokens' and method == 'GET':
+            self.respond(handler, 200, [entry] if existing else [])
+        elif path == '/api/users/token' and method == 'POST':
+            self.respond(handler, 200, entry)
+        else:
+            self.respond(handler, 404, {'error': 'not_found'})
+
+
+    @staticmethod
+    def respond(handler, status, body):
+
+        data = json.dumps(body).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
@@ -0,0 +1,192 @@
+import base64
+import json
+import logging
+import os
+import stat
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from local_urs import LocalUrsServer
+from tool_modules import load_tool_module
+
+earthdata_auth = load_tool_module('hitide_collections', 'earthdata_auth')
+
+logger = logging.getLogger("test_earthdata_auth")
+
+CREDENTIALS = {'CMR_USER': 'tva', 'CMR_PASS': 'secret'}
+
+
+def jwt(claims):
+
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode('utf-8')).decode('ascii').rstrip('=')
+    return f"header.{payload}.signature"
+
+
+class TokenExpiryTest(unittest.TestCase):
+
+    def test_expiration_date(self):
+
+        self.assertEqual(earthdata_auth.token_expiry({'expiration_date': '01/02/2030', 'access_token': 'x'}), 1893542400.0)
+
+
+    def test_jwt_exp_claim(self):
+
+        self.assertEqual(earthdata_auth.token_expiry({'access_token': jwt({'exp': 1900000000})}), 1900000000.0)
+
+
+    def test_fallback_ttl(self):
+
+        expiry = earthdata_auth.token_expiry({'expiration_date': 'soon', 'access_token': 'not-a-jwt'})
+
+        self.assertAlmostEqual(expiry, time.time() + earthdata_auth.FALLBACK_TTL_SECONDS, delta=60)
+
+
+class TokenCacheTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'edl_tokens.json')
+        self.cache = earthdata_auth.TokenCache(self.path)
+
+
+    def tearDown(self):
+
+        self.directory.cleanup()
+
+
+    def test_valid_token_is_returned(self):
+
+        self.cache.put('ops|tva', 'token', time.time() + 24 * 3600)
+
+        self.assertEqual(self.cache.get('ops|tva'), 'token')
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+
+    def test_token_expiring_within_margin_is_not_returned(self):
+
+        self.cache.put('ops|tva', 'token', time.time() + earthdata_auth.EXPIRY_MARGIN_SECONDS - 60)
+
+        self.assertIsNone(self.cache.get('ops|tva'))
+
+
+    def test_expired_tokens_are_dropped_on_write(self):
+
+        self.cache.put('uat|tva', 'old', time.time() - 1)
+        self.cache.put('ops|tva', 'new', time.time() + 24 * 3600)
+
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(list(json.load(f)), ['ops|tva'])
+
+
+    def test_invalidate_only_drops_the_given_token(self):
+
+        self.cache.put('ops|tva', 'token', time.time() + 24 * 3600)
+
+        self.cache.invalidate('ops|tva', 'older-token')
+        self.assertEqual(self.cache.get('ops|tva'), 'token')
+
+        self.cache.invalidate('ops|tva', 'token')
+        self.assertIsNone(self.cache.get('ops|tva'))
+
+
+    def test_empty_path_disables_cache(self):
+
+        cache = earthdata_auth.TokenCache('')
+        cache.put('ops|tva', 'token', time.time() + 24 * 3600)
+
+        self.assertIsNone(cache.get('ops|tva'))
+
+
+class BearerTokenTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = earthdata_auth.TokenCache(os.path.join(self.directory.name, 'edl_tokens.json'))
+
+        patcher = mock.patch.dict(os.environ, CREDENTIALS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def tearDown(self):
+
+        self.directory.cleanup()
+
+
+    def test_token_is_cached_between_calls(self):
+
+        with LocalUrsServer() as urs:
+            first = earthdata_auth.bearer_token('ops', logger, base_url=urs.url, cache=self.cache)
+            second = earthdata_auth.bearer_token('ops', logger, base_url=urs.url, cache=self.cache)
+
+        self.assertEqual(first, 'local-token-tva-1')
+        self.assertEqual(second, first)
+        self.assertEqual(urs.calls, {'/api/users/find_or_create_token': 1})
+
+
+    def test_token_close_to_expiry_is_refreshed(self):
+
+        with LocalUrsServer() as urs:
+            key = f"{urs.url}|tva"
+            self.cache.put(key, 'expiring', time.time() + 3600)
+
+            token = earthdata_auth.bearer_token('ops', logger, base_url=urs.url, cache=self.cache)
+
+        self.assertEqual(token, 'local-token-tva-1')
+        self.assertEqual(self.cache.get(key), token)
+
+
+    def test_short_lived_token_is_not_reused(self):
+
+        # Expires at midnight UTC today, so it is never handed out from the cache
+        today = time.strftime("%m/%d/%Y", time.gmtime())
+
+        with LocalUrsServer(expiration_date=today) as urs:
+            earthdata_auth.bearer_token('ops', logger, base_url=urs.url, cache=self.cache)
+            earthdata_auth.bearer_token('ops', logger, base_url=urs.url, cache=self.cache)
+
+        self.assertEqual(urs.calls, {'/api/users/find_or_create_token': 2})
+
+
+    def test_older_urs_lists_then_creates_tokens(self):
+
+        with LocalUrsServer(find_or_create=False) as urs:
+            token = earthdata_auth.bearer_token('ops', logger, base_url=urs.url, cache=self.cache)
+
+        self.assertEqual(token, 'local-token-tva-1')
+        self.assertEqual(urs.calls, {'/api/users/find_or_create_token': 1, '/api/users/tokens': 1, '/api/users/token': 1})
+
+
+    def test_rejected_token_is_replaced(self):
+
+        with LocalUrsServer() as urs, requests.Session() as session:
+            key = f"{urs.url}|tva"
+            self.cache.put(key, 'revoked', time.time() + 24 * 3600)
+
+            token = earthdata_auth.bearer_token('ops', logger, session=session, base_url=urs.url, cache=self.cache)
+            response = session.get(f"{urs.url}/search/collections", headers={'Authorization': f"Bearer {token}"})
+
+            fresh = earthdata_auth.bearer_token('ops', logger, session=session, base_url=urs.url, cache=self.cache)
+
+        self.assertEqual(token, 'revoked')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(fresh, 'local-token-tva-1')
+        self.assertEqual(self.cache.get(key), fresh)
+
+
+    def test_missing_credentials(self):
+
+        with mock.patch.dict(os.environ, {'CMR_USER': ''}), LocalUrsServer() as urs:
+            self.assertIsNone(earthdata_auth.bearer_token('ops', logger, base_url=urs.url, cache=self.cache))
+
+        self.assertEqual(urs.calls, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from tool_modules import load_tool_module
+
+shard_state = load_tool_module('hitide_granules', 'shard_state')
+
+HEADER = ['Collection Name', 'Date', 'Granules', 'No Image', 'No Footprint', 'Global BBox', 'Both FP & BBox',
+          'Updated', 'Expected']
+
+
+class CarryOverTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.state = shard_state.ShardStateStore("Monthly Counts 2026-10",
+                                                 os.path.join(self.directory.name, 'state.sqlite'))
+
+        # A new sheet, pending shards with their CMR hits
+        self.state.seed([HEADER,
+                         ['MUR', '2026-08', '', '', '', '', '', '', 31],
+                         ['MUR', '2026-09', '', '', '', '', '', '', 30],
+                         ['MUR', '2026-10', '', '', '', '', '', '', 18]])
+
+
+    def tearDown(self):
+
+        self.directory.cleanup()
+
+
+    def shards(self):
+
+        return {(row[0], row[1]): row for row in self.state.rows()}
+
+
+    def test_unchanged_month_is_carried_over(self):
+
+        carried = self.state.carry_over([HEADER, ['MUR', '2026-08', '30', '0', '1', '2', '0', '09/01/2026 03:00:00', '31']])
+
+        self.assertEqual(carried, 1)
+        self.assertEqual(self.shards()[('MUR', '2026-08')][2:8], [30, 0, 1, 2, 0, '09/01/2026 03:00:00'])
+        self.assertEqual([row[:2] for row in self.state.pending()], [('MUR', '2026-09'), ('MUR', '2026-10')])
+
+
+    def test_month_with_changed_hits_stays_pending(self):
+
+        carried = self.state.carry_over([HEADER, ['MUR', '2026-08', '29', '0', '0', '0', '0', '09/01/2026 03:00:00', '29']])
+
+        self.assertEqual(carried, 0)
+        self.assertEqual(len(self.state.pending()), 3)
+
+
+    def test_month_that_failed_last_month_stays_pending(self):
+
+        # Expected was filled in when the sheet was created, the scan of the month then failed
+        carried = self.state.carry_over([HEADER, ['MUR', '2026-09', '', '', '', '', '', '', '30'],
+                                         ['MUR', '2026-08', '30', '0', '', '2', '0', '09/01/2026 03:00:00', '31']])
+
+        self.assertEqual(carried, 0)
+        self.assertEqual(len(self.state.pending()), 3)
+        self.assertEqual(self.shards()[('MUR', '2026-09')][2:7], ['', '', '', '', ''])
+
+
+    def test_skipped_month_stays_pending(self):
+
+        carried = self.state.carry_over([HEADER, ['MUR', '2026-10', '18', '0', '0', '0', '0', '10/15/2026 03:00:00', '18']],
+                                        skip_month='2026-10')
+
+        self.assertEqual(carried, 0)
+        self.assertIn(('MUR', '2026-10'), [row[:2] for row in self.state.pending()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import filecmp
+import unittest
+
+from tool_modules import tool_module_path
+
+# Modules every tool directory keeps its own copy of, the tools import them by bare name from
+# their working directory and regression_tests runs from its own Poetry project.  The first
+# directory holds the copy that is edited, the others must match it.
+SHARED_MODULES = {
+    'earthdata_auth': ('hitide_collections', 'browse_image_collections', 'hitide_granules', 'regression_tests'),
+    'cmr_pager': ('hitide_collections', 'browse_image_collections', 'umm_v_auto'),
+    'sheet_sync': ('hitide_collections', 'browse_image_collections'),
+    'cmr_session': ('hitide_granules', 'regression_tests'),
+    'graphql_cache': ('hitide_collections', 'browse_image_collections'),
+    'graphql_query': ('hitide_collections', 'browse_image_collections'),
+}
+
+
+class SharedModulesTest(unittest.TestCase):
+
+    def test_copies_match(self):
+
+        for name, tool_dirs in SHARED_MODULES.items():
+            source = tool_module_path(tool_dirs[0], name)
+
+            for tool_dir in tool_dirs[1:]:
+                with self.subTest(module=name, tool_dir=tool_dir):
+                    self.assertTrue(filecmp.cmp(source, tool_module_path(tool_dir, name), shallow=False),
+                                    f"{tool_dir}/{name}.py differs from {tool_dirs[0]}/{name}.py, copy it over")
+
+
+if __name__ == '__main__':
+    unittest.main()
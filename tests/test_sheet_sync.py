@@ -0,0 +1,120 @@
+import unittest
+
+from gspread.utils import a1_range_to_grid_range
+
+from tool_modules import load_tool_module
+
+sheet_sync = load_tool_module('hitide_collections', 'sheet_sync')
+
+
+class LocalWorksheet:
+    """In-memory worksheet with the parts of the gspread Worksheet API sync_worksheet uses."""
+
+    title = "OPS"
+
+    def __init__(self, values, row_count=1000, col_count=26):
+
+        self.row_count = row_count
+        self.col_count = col_count
+        self.grid = [[""] * col_count for _ in range(row_count)]
+        self.resizes = []
+
+        for row_index, row in enumerate(values):
+            self.grid[row_index][:len(row)] = row
+
+
+    def get_all_values(self):
+
+        # Like the Sheets API, trailing empty rows and columns are left out
+        rows = [list(row) for row in self.grid]
+        while rows and not any(rows[-1]):
+            rows.pop()
+
+        width = max([max([i + 1 for i, value in enumerate(row) if value] + [0]) for row in rows] + [0])
+        return [row[:width] for row in rows]
+
+
+    def resize(self, rows, cols):
+
+        self.resizes.append((rows, cols))
+        self.grid = [(row + [""] * cols)[:cols] for row in (self.grid + [[]] * rows)[:rows]]
+        self.row_count, self.col_count = rows, cols
+
+
+    def batch_update(self, updates, value_input_option=None):
+
+        for update in updates:
+            grid_range = a1_range_to_grid_range(update['range'])
+            for col, value in enumerate(update['values'][0], start=grid_range['startColumnIndex']):
+                self.grid[grid_range['startRowIndex']][col] = sheet_sync.cell_text(value)
+
+
+class DiffRangesTest(unittest.TestCase):
+
+    def test_unchanged_rows_are_not_written(self):
+
+        current = [['Collection Name', 'Granules'], ['MUR', '31'], ['OSTIA', 'TRUE']]
+
+        self.assertEqual(sheet_sync.diff_ranges(current, [['Collection Name', 'Granules'], ['MUR', 31], ['OSTIA', True]]), [])
+
+
+    def test_consecutive_changed_cells_are_one_range(self):
+
+        current = [['MUR', '31', 'X', '', 'X']]
+
+        self.assertEqual(sheet_sync.diff_ranges(current, [['MUR', 30, None, 'X', 'X']]),
+                         [{'range': 'B1:D1', 'values': [[30, '', 'X']]}])
+
+
+    def test_added_rows_and_columns(self):
+
+        current = [['Collection Name'], ['MUR']]
+
+        self.assertEqual(sheet_sync.diff_ranges(current, [['Collection Name', 'Granules'], ['MUR', 31], ['OSTIA', 12]]),
+                         [{'range': 'B1:B1', 'values': [['Granules']]},
+                          {'range': 'B2:B2', 'values': [[31]]},
+                          {'range': 'A3:B3', 'values': [['OSTIA', 12]]}])
+
+
+    def test_rows_and_columns_no_longer_in_records_are_blanked(self):
+
+        current = [['Collection Name', 'Granules', 'Notes'], ['MUR', '31', 'late'], ['OSTIA', '12', '']]
+
+        self.assertEqual(sheet_sync.diff_ranges(current, [['Collection Name', 'Granules'], ['MUR', 31]]),
+                         [{'range': 'C1:C1', 'values': [['']]},
+                          {'range': 'C2:C2', 'values': [['']]},
+                          {'range': 'A3:B3', 'values': [['', '']]}])
+
+
+class SyncWorksheetTest(unittest.TestCase):
+
+    def test_shrinking_table_trims_the_grid(self):
+
+        worksheet = LocalWorksheet([['Collection Name', 'Granules', 'Notes'], ['MUR', '31', 'late'], ['OSTIA', '12', '']])
+
+        sheet_sync.sync_worksheet(worksheet, [['Collection Name', 'Granules'], ['MUR', 30]])
+
+        self.assertEqual((worksheet.row_count, worksheet.col_count), (2, 2))
+        self.assertEqual(worksheet.get_all_values(), [['Collection Name', 'Granules'], ['MUR', '30']])
+
+
+    def test_growing_table_resizes_before_writing(self):
+
+        worksheet = LocalWorksheet([['Collection Name'], ['MUR']], row_count=2, col_count=1)
+
+        sheet_sync.sync_worksheet(worksheet, [['Collection Name', 'Granules'], ['MUR', 31], ['OSTIA', 12]])
+
+        self.assertEqual(worksheet.resizes, [(3, 2)])
+        self.assertEqual(worksheet.get_all_values(), [['Collection Name', 'Granules'], ['MUR', '31'], ['OSTIA', '12']])
+
+
+    def test_unchanged_table_writes_nothing(self):
+
+        worksheet = LocalWorksheet([['Collection Name', 'Granules'], ['MUR', '31']], row_count=2, col_count=2)
+
+        self.assertEqual(sheet_sync.sync_worksheet(worksheet, [['Collection Name', 'Granules'], ['MUR', 31]]), 0)
+        self.assertEqual(worksheet.resizes, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import importlib.util
+import os
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tool_module_path(tool_dir, name):
+
+    return os.path.join(REPO_DIR, tool_dir, f"{name}.py")
+
+
+def load_tool_module(tool_dir, name):
+    """Import a module of one tool directory, which the tools run from and import by bare name."""
+
+    spec = importlib.util.spec_from_file_location(f"{tool_dir}.{name}", tool_module_path(tool_dir, name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
@@ -7,6 +7,8 @@ import requests
 from tqdm import tqdm
 import cmr
 
+from cmr_pager import iter_cmr_entries
+
 
 # Constants
 ops_collections = {}
@@ -160,11 +162,8 @@ def get_l2ss_associations(env, umm_name, headers):
     url = cmr.queries.CollectionQuery(
         mode=mode).service_concept_id(concept_id)._build_url()
 
-    collections_query = requests.get(url, headers=headers, params={
-                                     'page_size': 2000}).json()['feed']['entry']
-    collections = [(a.get('id'), a.get('short_name'))
-                   for a in collections_query]
-    collections = sorted(collections, key=lambda tup: tup[1])
+    collections = ((a.get('id'), a.get('short_name'))
+                   for a in iter_cmr_entries(url, headers))
 
     collection_concept_ids = []
     for collection in collections: